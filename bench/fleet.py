@@ -0,0 +1,101 @@
+# synthetic fleet of jenkins jobs, bugs and tickets served by the benchmark servers
+
+import random
+
+
+# stages every synthetic pipeline build runs through, in order
+STAGES = ['Provision', 'Undercloud', 'Overcloud', 'Run Tempest Tests', 'Cleanup']
+
+# OSP versions synthetic jobs are spread over
+VERSIONS = ['13', '16.1', '16.2']
+
+
+def generate_build(job_url, number, result, timestamp, rng):
+	''' returns build dict as jenkins returns it for a build at depth 0
+	'''
+	return {
+		'_class': 'org.jenkinsci.plugins.workflow.job.WorkflowRun',
+		'number': number,
+		'result': result,
+		'timestamp': timestamp,
+		'duration': rng.randint(600000, 7200000),
+		'url': '{}{}/'.format(job_url, number),
+		'actions': [
+			{'_class': 'hudson.model.CauseAction', 'causes': [{'shortDescription': 'Started by timer'}]},
+			{'_class': 'hudson.model.ParametersAction', 'parameters': [
+				{'_class': 'hudson.model.BooleanParameterValue', 'name': 'PUBLISH', 'value': number % 3 == 0},
+				{'_class': 'hudson.model.StringParameterValue', 'name': 'IR_PROVISION_HOST', 'value': 'host-{}.example.com'.format(number % 7)}
+			]},
+			{'_class': 'hudson.tasks.junit.TestResultAction', 'failCount': 0 if result == 'SUCCESS' else rng.randint(1, 40), 'skipCount': 3, 'totalCount': 1500},
+			{'_class': 'com.sonyericsson.hudson.plugins.rebuild.RebuildAction'},
+			{'_class': 'org.jenkinsci.plugins.buildnamesetter.BuildNameSetterAction', 'html': 'core_puddle: RHOS-16.1-RHEL-8-2021{:04d}.n.0<br>'.format(number)},
+			{'_class': 'hudson.plugins.git.util.BuildData', 'lastBuiltRevision': {'SHA1': '{:040x}'.format(rng.getrandbits(160))}, 'remoteUrls': ['https://git.example.com/ci.git']}
+		],
+		'changeSet': {'items': [], 'kind': None},
+		'artifacts': [{'fileName': 'tempest-results.xml', 'relativePath': 'tempest-results/tempest-results.xml'}]
+	}
+
+
+def generate_stages(result, rng):
+	''' returns stages dict as the pipeline REST API returns it for a build with the given result
+	'''
+	failed_stage = rng.randrange(len(STAGES)) if result == 'FAILURE' else None
+	stages = []
+	for i, name in enumerate(STAGES):
+		if failed_stage is not None and i > failed_stage:
+			break
+		stages.append({
+			'id': str(i + 6),
+			'name': name,
+			'status': 'FAILED' if i == failed_stage else 'SUCCESS',
+			'durationMillis': rng.randint(10000, 1800000),
+			'_links': {'self': {'href': '/stage/{}'.format(i)}}
+		})
+	return {'status': 'FAILED' if failed_stage is not None else 'SUCCESS', 'stages': stages}
+
+
+def generate_fleet(base_url, num_jobs=100, num_folders=0, num_builds=20, failure_ratio=0.3, num_bugs=50, num_tickets=50, num_owners=5, seed=0):
+	''' takes in jenkins base url, number of jobs, folders they are spread over and builds per job,
+		share of builds that fail, number of bugs and tickets used as blockers and number of owners
+		returns dict with 'jobs' (full job name to job dict with 'builds', newest first, and 'stages'),
+		'bugs' (id to bug dict), 'tickets' (key to ticket dict) and 'blockers' (blockers file contents)
+		the same arguments always generate the same fleet
+	'''
+	rng = random.Random(seed)
+	now = 1600000000000
+	jobs = {}
+	for i in range(num_jobs):
+		short_name = 'DFG-bench-rhos-{}-job-{}'.format(VERSIONS[i % len(VERSIONS)], i)
+		job_name = 'folder-{}/{}'.format(i % num_folders, short_name) if num_folders else short_name
+		job_url = '{}/{}/'.format(base_url.rstrip('/'), '/'.join('job/{}'.format(part) for part in job_name.split('/')))
+		builds = []
+		stages = {}
+		for number in range(num_builds, 0, -1):
+			roll = rng.random()
+			result = 'FAILURE' if roll < failure_ratio else 'UNSTABLE' if roll < failure_ratio * 1.2 else 'SUCCESS'
+			builds.append(generate_build(job_url, number, result, now - (num_builds - number) * 86400000, rng))
+			stages[number] = generate_stages(result, rng)
+		jobs[job_name] = {'name': short_name, 'url': job_url, 'builds': builds, 'stages': stages}
+
+	bugs = {
+		1000000 + i: {'id': 1000000 + i, 'status': rng.choice(['NEW', 'ASSIGNED', 'POST', 'MODIFIED']), 'summary': 'Synthetic bug {}'.format(i)}
+		for i in range(num_bugs)
+	}
+	tickets = {
+		'BENCH-{}'.format(i + 1): {'key': 'BENCH-{}'.format(i + 1), 'status': rng.choice(['To Do', 'In Progress', 'Done']), 'summary': 'Synthetic ticket {}'.format(i + 1)}
+		for i in range(num_tickets)
+	}
+
+	# every job gets a couple of blockers and an owner so both report and remind modes have work to do
+	bug_ids = list(bugs)
+	ticket_ids = list(tickets)
+	blockers = {}
+	for i, job_name in enumerate(jobs):
+		blockers[job_name] = {
+			'bz': rng.sample(bug_ids, min(2, len(bug_ids))) or [0],
+			'jira': rng.sample(ticket_ids, min(1, len(ticket_ids))) or [0]
+		}
+		if num_owners:
+			blockers[job_name]['owners'] = ['owner{}@example.com'.format(i % num_owners)]
+
+	return {'jobs': jobs, 'bugs': bugs, 'tickets': tickets, 'blockers': blockers}
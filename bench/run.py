@@ -0,0 +1,242 @@
+# benchmark of report and remind runs against local stand-in servers
+# run from the repository root: python -m bench.run --help
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import functools
+import statistics
+
+from collections import defaultdict
+
+from bench.fleet import generate_fleet
+from bench.servers import FakeJenkins, FakeBugzilla, FakeJira
+
+
+# functions timed as phases, by module they are looked up from by report and remind runs
+PHASES = {
+	'jeeves.report': [
+		'get_jenkins_jobs',
+		'get_bugs_dict',
+		'get_tickets_dict',
+		'get_jenkins_jobs_info',
+		'get_jenkins_jobs_info_incremental',
+		'get_jenkins_jobs_results',
+		'write_snapshot',
+		'deliver_report'
+	],
+	'jeeves.remind': [
+		'get_jenkins_jobs_info',
+		'get_bugs_dict',
+		'get_tickets_dict',
+		'get_template_environment'
+	]
+}
+
+
+class NullSMTP:
+	''' records messages instead of sending them
+	'''
+
+	def __init__(self, sent):
+		self.sent = sent
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.quit()
+
+	def sendmail(self, from_addr, to_addrs, msg):
+		self.sent.append(len(msg))
+		return {}
+
+	def quit(self):
+		pass
+
+	def close(self):
+		pass
+
+
+def instrument(timings, sent):
+	''' wraps the phase functions of report and remind modules to add their run time to timings
+		and replaces their SMTP sessions with ones recording message sizes in sent
+		returns function undoing the changes
+	'''
+	originals = []
+
+	def timed(name, function):
+		@functools.wraps(function)
+		def wrapper(*args, **kwargs):
+			start = time.perf_counter()
+			try:
+				return function(*args, **kwargs)
+			finally:
+				timings[name] += time.perf_counter() - start
+		return wrapper
+
+	for module_name, names in PHASES.items():
+		module = sys.modules[module_name]
+		for name in names:
+			if hasattr(module, name):
+				originals.append((module, name, getattr(module, name)))
+				setattr(module, name, timed(name, getattr(module, name)))
+		if hasattr(module, 'open_smtp_session'):
+			originals.append((module, 'open_smtp_session', module.open_smtp_session))
+			module.open_smtp_session = lambda config: NullSMTP(sent)
+
+	def restore():
+		for module, name, original in originals:
+			setattr(module, name, original)
+	return restore
+
+
+def run_once(mode, config, blockers, cache_dir, use_cache, incremental):
+	''' runs jeeves once in the given mode against the configured servers
+		returns tuple of wall time in seconds, dict of phase timings, list of sent message sizes
+		and the metrics jeeves recorded itself
+	'''
+	import jenkins
+	from jeeves import metrics
+	from jeeves.cache import JeevesCache
+	from jeeves.common import generate_header
+	from jeeves.remind import run_remind
+	from jeeves.report import run_report
+	from jeeves.transport import PooledJenkins
+
+	timings = defaultdict(float)
+	sent = []
+	restore = instrument(timings, sent)
+	metrics.reset()
+	try:
+		start = time.perf_counter()
+		cache = JeevesCache(cache_dir, config['jenkins_url']) if use_cache else None
+		if config.get('jenkins_transport', 'pooled') == 'stock':
+			server = jenkins.Jenkins(config['jenkins_url'])
+		else:
+			server = PooledJenkins(config['jenkins_url'], pool_size=config.get('max_workers', 8), cache=cache)
+		if mode == 'report':
+			header = generate_header(config['job_search_fields'])
+			run_report(config, blockers, False, 'report_template.html', False, False, server, header, cache, incremental)
+		else:
+			header = generate_header('blockers.yaml', remind=True)
+			run_remind(config, blockers, server, header, cache)
+		if cache is not None:
+			cache.close()
+		wall = time.perf_counter() - start
+	finally:
+		restore()
+	return wall, dict(timings), sent, metrics.get_metrics(mode)
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Benchmark Jeeves against local stand-in Jenkins, Bugzilla and Jira servers')
+	parser.add_argument('--mode', default='both', choices=['report', 'remind', 'both'], help='Run mode to benchmark')
+	parser.add_argument('--jobs', default=200, type=int, help='Number of synthetic jobs')
+	parser.add_argument('--folders', default=4, type=int, help='Number of folders jobs are spread over, 0 for none')
+	parser.add_argument('--builds', default=20, type=int, help='Number of builds per job')
+	parser.add_argument('--failure-ratio', default=0.3, type=float, help='Share of builds that fail')
+	parser.add_argument('--bugs', default=100, type=int, help='Number of bugs used as blockers')
+	parser.add_argument('--tickets', default=100, type=int, help='Number of tickets used as blockers')
+	parser.add_argument('--owners', default=10, type=int, help='Number of job owners for remind mode')
+	parser.add_argument('--latency-ms', default=20, type=float, help='Latency added to every response of the stand-in servers')
+	parser.add_argument('--error-rate', default=0, type=float, help='Share of responses the stand-in servers fail with a 500')
+	parser.add_argument('--repeat', default=3, type=int, help='Number of runs per mode, the cache is kept between runs')
+	parser.add_argument('--no-cache', default=False, action='store_true', help='Run without the local cache')
+	parser.add_argument('--incremental', default=False, action='store_true', help='Run reports in incremental mode')
+	parser.add_argument('--config', default=None, type=str, help='YAML file with config options to apply on top of the benchmark config, e.g. max_workers or bulk_fetch')
+	parser.add_argument('--seed', default=0, type=int, help='Seed of the synthetic fleet and injected errors')
+	parser.add_argument('--output', default=None, type=str, help='File to write results to as JSON')
+	args = parser.parse_args()
+
+	repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	servers_options = {'latency': args.latency_ms / 1000, 'error_rate': args.error_rate, 'seed': args.seed}
+
+	# the jenkins server needs its own url to generate job urls, so bind it before generating the fleet
+	jenkins_server = FakeJenkins(**servers_options)
+	fleet = generate_fleet(
+		jenkins_server.url,
+		num_jobs=args.jobs,
+		num_folders=args.folders,
+		num_builds=args.builds,
+		failure_ratio=args.failure_ratio,
+		num_bugs=args.bugs,
+		num_tickets=args.tickets,
+		num_owners=args.owners,
+		seed=args.seed
+	)
+	jenkins_server.load(fleet)
+	servers = {
+		'jenkins': jenkins_server.start(),
+		'bugzilla': FakeBugzilla(fleet, **servers_options).start(),
+		'jira': FakeJira(fleet, **servers_options).start()
+	}
+
+	config = {
+		'jenkins_url': servers['jenkins'].url,
+		'job_search_fields': 'DFG-bench-',
+		'folder_depth': 1 if args.folders else 0,
+		'bz_url': servers['bugzilla'].url + '/rest',
+		'jira_url': servers['jira'].url,
+		'jira_username': 'bench',
+		'jira_password': 'bench',
+		'certificate': False,
+		'smtp_host': 'localhost',
+		'email_subject': 'Jeeves benchmark',
+		'email_from': 'jeeves@example.com',
+		'email_to': 'report@example.com',
+		'email_to_test': 'report@example.com',
+		'chart_renderer': 'svg'
+	}
+	if args.config:
+		import yaml
+		with open(args.config, 'r') as file:
+			config.update(yaml.safe_load(file) or {})
+
+	modes = ['report', 'remind'] if args.mode == 'both' else [args.mode]
+	results = {'fleet': vars(args), 'runs': []}
+
+	# run in a scratch directory so archive files and the cache do not end up in the repository
+	work_dir = tempfile.mkdtemp(prefix='jeeves-bench-')
+	os.symlink(os.path.join(repo_dir, 'templates'), os.path.join(work_dir, 'templates'))
+	os.chdir(work_dir)
+	config['cache_dir'] = os.path.join(work_dir, 'cache')
+	try:
+		for mode in modes:
+			for i in range(args.repeat):
+				for server in servers.values():
+					server.reset_counts()
+				wall, timings, sent, jeeves_metrics = run_once(mode, config, fleet['blockers'], config['cache_dir'], not args.no_cache, args.incremental)
+				run = {
+					'mode': mode,
+					'run': i + 1,
+					'wall_seconds': round(wall, 4),
+					'phases': {name: round(seconds, 4) for name, seconds in timings.items()},
+					'calls': {endpoint: count for server in servers.values() for endpoint, count in sorted(server.calls.items())},
+					'bytes': {endpoint: size for server in servers.values() for endpoint, size in sorted(server.bytes.items())},
+					'emails': len(sent),
+					'cache': jeeves_metrics['cache']
+				}
+				results['runs'].append(run)
+				print('{} run {}: {:.3f}s, {} API calls, {} emails'.format(mode, i + 1, wall, sum(run['calls'].values()), run['emails']))
+				for name, seconds in sorted(run['phases'].items(), key=lambda phase: -phase[1]):
+					print('    {:<36} {:.3f}s'.format(name, seconds))
+				for endpoint, count in run['calls'].items():
+					print('    {:<36} {} calls, {} bytes'.format(endpoint, count, run['bytes'][endpoint]))
+			walls = [run['wall_seconds'] for run in results['runs'] if run['mode'] == mode]
+			print('{}: median {:.3f}s over {} runs'.format(mode, statistics.median(walls), len(walls)))
+	finally:
+		for server in servers.values():
+			server.stop()
+
+	if args.output:
+		with open(os.path.join(repo_dir, args.output) if not os.path.isabs(args.output) else args.output, 'w') as file:
+			json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+	sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+	main()
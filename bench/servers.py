@@ -0,0 +1,292 @@
+# local stand-in HTTP servers for jenkins, bugzilla and jira used by the benchmark
+
+import re
+import json
+import time
+import random
+import threading
+
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+def parse_tree(spec):
+	''' takes in value of a jenkins 'tree' query parameter, e.g. jobs[name,builds[number]{0,5}]
+		returns dict of field name to (subtree dict or None, (start, end) range or None)
+	'''
+	tree, position = parse_tree_fields(spec, 0)
+	return tree
+
+
+def parse_tree_fields(spec, position):
+	''' parses comma separated fields of a tree query starting at position
+		returns tuple of parsed fields and position after them
+	'''
+	fields = {}
+	while position < len(spec) and spec[position] != ']':
+		name = re.match(r'[^,\[\]{}]*', spec[position:]).group(0)
+		position += len(name)
+		subtree = None
+		bounds = None
+		if position < len(spec) and spec[position] == '[':
+			subtree, position = parse_tree_fields(spec, position + 1)
+			position += 1
+		if position < len(spec) and spec[position] == '{':
+			end = spec.index('}', position)
+			parts = spec[position + 1:end].split(',')
+			if len(parts) == 1:
+				bounds = (int(parts[0]), int(parts[0]) + 1)
+			else:
+				bounds = (int(parts[0]) if parts[0] else None, int(parts[1]) if parts[1] else None)
+			position = end + 1
+		if name:
+			fields[name] = (subtree, bounds)
+		if position < len(spec) and spec[position] == ',':
+			position += 1
+	return fields, position
+
+
+def apply_tree(data, tree):
+	''' takes in JSON data and tree parsed by parse_tree
+		returns data with only the fields selected by the tree, as jenkins would
+	'''
+	if isinstance(data, list):
+		return [apply_tree(item, tree) for item in data]
+	if not isinstance(data, dict):
+		return data
+	filtered = {}
+	for name, (subtree, bounds) in tree.items():
+		if name not in data:
+			continue
+		value = data[name]
+		if bounds is not None and isinstance(value, list):
+			value = value[bounds[0]:bounds[1]]
+		filtered[name] = apply_tree(value, subtree) if subtree is not None else value
+	return filtered
+
+
+def shallow(data):
+	''' returns reference to a nested jenkins object as it appears in a depth 0 response
+	'''
+	return {key: data[key] for key in ('_class', 'name', 'number', 'url') if key in data}
+
+
+class FakeServer(ThreadingHTTPServer):
+	''' threaded HTTP server on a free local port answering GET requests with JSON
+		sleeps latency seconds before every response and fails error_rate of requests with a 500
+		counts requests and response bytes per endpoint
+	'''
+	daemon_threads = True
+
+	def __init__(self, latency=0, error_rate=0, seed=0):
+		super().__init__(('127.0.0.1', 0), FakeRequestHandler)
+		self.latency = latency
+		self.error_rate = error_rate
+		self.rng = random.Random(seed)
+		self.lock = threading.Lock()
+		self.calls = Counter()
+		self.bytes = Counter()
+		self.thread = None
+
+	@property
+	def url(self):
+		return 'http://127.0.0.1:{}'.format(self.server_address[1])
+
+	def start(self):
+		self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+		self.thread.start()
+		return self
+
+	def stop(self):
+		self.shutdown()
+		self.server_close()
+
+	def reset_counts(self):
+		with self.lock:
+			self.calls.clear()
+			self.bytes.clear()
+
+	def record(self, endpoint, size):
+		with self.lock:
+			self.calls[endpoint] += 1
+			self.bytes[endpoint] += size
+
+	def should_fail(self):
+		with self.lock:
+			return self.rng.random() < self.error_rate
+
+	def respond(self, path, query):
+		''' takes in request path and dict of query parameters
+			returns tuple of endpoint name, status code and response data
+		'''
+		raise NotImplementedError
+
+
+class FakeRequestHandler(BaseHTTPRequestHandler):
+
+	def do_GET(self):
+		url = urlparse(self.path)
+		endpoint, status, data = self.server.respond(url.path, parse_qs(url.query))
+		if self.server.latency:
+			time.sleep(self.server.latency)
+		if status == 200 and self.server.should_fail():
+			status, data = 500, {'error': 'injected failure'}
+		body = json.dumps(data).encode()
+		self.server.record(endpoint, len(body))
+		self.send_response(status)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args):
+		pass
+
+
+class FakeJenkins(FakeServer):
+	''' serves the JSON API, tree queries and pipeline stages of the jobs of a fleet
+		the fleet can be loaded after start so its job urls can be generated from the server url
+	'''
+
+	def __init__(self, fleet=None, **kwargs):
+		super().__init__(**kwargs)
+		self.root = {'_class': 'hudson.model.Hudson', 'jobs': []}
+		self.folders = {}
+		self.jobs = {}
+		if fleet is not None:
+			self.load(fleet)
+
+	def load(self, fleet):
+		''' serves the jobs of the given fleet - job urls of the fleet should point to this server
+		'''
+		for job_name, job in fleet['jobs'].items():
+			builds = job['builds']
+			completed = [build for build in builds if build['result'] is not None]
+			job_data = {
+				'_class': 'org.jenkinsci.plugins.workflow.job.WorkflowJob',
+				'name': job['name'],
+				'url': job['url'],
+				'buildable': True,
+				'color': 'red' if completed and completed[0]['result'] == 'FAILURE' else 'blue',
+				'builds': builds[:100],
+				'allBuilds': builds,
+				'lastBuild': builds[0] if builds else None,
+				'lastCompletedBuild': completed[0] if completed else None,
+				'nextBuildNumber': builds[0]['number'] + 1 if builds else 1,
+				'property': [{'_class': 'hudson.model.ParametersDefinitionProperty'}]
+			}
+			self.jobs[job_name] = (job_data, {build['number']: build for build in builds}, job['stages'])
+			folder, _, short_name = job_name.rpartition('/')
+			if folder:
+				if folder not in self.folders:
+					self.folders[folder] = {
+						'_class': 'com.cloudbees.hudson.plugins.folder.Folder',
+						'name': folder,
+						'url': job['url'].rsplit('/job/', 1)[0] + '/',
+						'jobs': []
+					}
+					self.root['jobs'].append(self.folders[folder])
+				self.folders[folder]['jobs'].append(job_data)
+			else:
+				self.root['jobs'].append(job_data)
+
+	def respond(self, path, query):
+		parts = [part for part in path.split('/') if part]
+		names = []
+		while len(parts) >= 2 and parts[0] == 'job':
+			names.append(parts[1])
+			parts = parts[2:]
+		name = '/'.join(names)
+		tree = parse_tree(query['tree'][0]) if 'tree' in query else None
+
+		# build info or stages
+		if parts and parts[0].isdigit():
+			if name not in self.jobs or int(parts[0]) not in self.jobs[name][1]:
+				return 'jenkins:not_found', 404, {}
+			if parts[1:] == ['wfapi', 'describe']:
+				return 'jenkins:stages', 200, self.jobs[name][2][int(parts[0])]
+			return 'jenkins:build', 200, self.jobs[name][1][int(parts[0])]
+
+		if parts != ['api', 'json']:
+			return 'jenkins:not_found', 404, {}
+		if name == '':
+			data = self.root
+		elif name in self.folders:
+			data = self.folders[name]
+		elif name in self.jobs:
+			data = self.jobs[name][0]
+		else:
+			return 'jenkins:not_found', 404, {}
+
+		if tree is not None:
+			return 'jenkins:tree', 200, apply_tree(data, tree)
+
+		# without a tree query nested objects are only referenced
+		depth_0 = {}
+		for key, value in data.items():
+			if isinstance(value, dict):
+				value = shallow(value)
+			elif isinstance(value, list):
+				value = [shallow(item) if isinstance(item, dict) else item for item in value]
+			depth_0[key] = value
+		depth_0.pop('allBuilds', None)
+		return 'jenkins:job' if name in self.jobs else 'jenkins:folder', 200, depth_0
+
+
+class FakeBugzilla(FakeServer):
+	''' serves the bugzilla REST API for the bugs of a fleet under /rest
+	'''
+
+	def __init__(self, fleet, **kwargs):
+		super().__init__(**kwargs)
+		self.bugs = fleet['bugs']
+
+	def respond(self, path, query):
+		if path.rstrip('/') == '/rest/version':
+			return 'bugzilla:version', 200, {'version': '5.0.6'}
+		if path.startswith('/rest/bug'):
+			bug_ids = [bug_id for value in query.get('id', []) for bug_id in value.split(',')]
+			if path.rstrip('/') != '/rest/bug':
+				bug_ids.append(path.rstrip('/').rsplit('/', 1)[1])
+			bugs = [self.bugs[int(bug_id)] for bug_id in bug_ids if bug_id.isdigit() and int(bug_id) in self.bugs]
+			return 'bugzilla:bug', 200, {'bugs': bugs, 'faults': []}
+		return 'bugzilla:other', 200, {}
+
+
+class FakeJira(FakeServer):
+	''' serves the jira REST API for the tickets of a fleet
+		JQL searches are only understood in the 'key in (...)' form jeeves sends
+	'''
+
+	def __init__(self, fleet, **kwargs):
+		super().__init__(**kwargs)
+		self.tickets = fleet['tickets']
+
+	def issue(self, ticket):
+		return {
+			'id': ticket['key'].split('-')[1],
+			'key': ticket['key'],
+			'self': '{}/rest/api/2/issue/{}'.format(self.url, ticket['key']),
+			'fields': {
+				'status': {'name': ticket['status'], 'self': '{}/rest/api/2/status/1'.format(self.url)},
+				'summary': ticket['summary']
+			}
+		}
+
+	def respond(self, path, query):
+		path = path.rstrip('/')
+		if path == '/rest/api/2/serverInfo':
+			return 'jira:server_info', 200, {'baseUrl': self.url, 'version': '8.13.0', 'versionNumbers': [8, 13, 0], 'deploymentType': 'Server'}
+		if path == '/rest/api/2/field':
+			return 'jira:field', 200, []
+		if path == '/rest/api/2/search':
+			keys = re.findall(r'"([^"]+)"', query.get('jql', [''])[0])
+			issues = [self.issue(self.tickets[key]) for key in keys if key in self.tickets]
+			return 'jira:search', 200, {'startAt': 0, 'maxResults': len(keys), 'total': len(issues), 'issues': issues}
+		if path.startswith('/rest/api/2/issue/'):
+			key = path.rsplit('/', 1)[1]
+			if key not in self.tickets:
+				return 'jira:issue', 404, {'errorMessages': ['Issue does not exist'], 'errors': {}}
+			return 'jira:issue', 200, self.issue(self.tickets[key])
+		return 'jira:other', 200, {}
@@ -0,0 +1,102 @@
+# benchmark of CLI startup time - how long each mode spends importing before doing any work
+# run from the repository root: python -m bench.startup --help
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+
+# modules jeeves.py imports before starting each mode
+MODE_IMPORTS = {
+	'report': ['jenkins', 'jeeves.cache', 'jeeves.transport', 'jeeves.report'],
+	'remind': ['jenkins', 'jeeves.cache', 'jeeves.transport', 'jeeves.remind'],
+	'serve': ['jenkins', 'jeeves.cache', 'jeeves.transport', 'jeeves.serve'],
+	'snapshot': ['jeeves.report', 'jeeves.snapshot']
+}
+
+
+def get_commands(repo_dir):
+	''' returns dict of case name to command line of the startup cases
+		--help and an invalid config exit before any mode is started, the mode cases
+		import what jeeves.py imports for that mode without connecting to anything
+	'''
+	commands = {
+		'help': [sys.executable, os.path.join(repo_dir, 'jeeves.py'), '--help'],
+		'config_error': [sys.executable, os.path.join(repo_dir, 'jeeves.py'), '--config', os.path.join(repo_dir, 'missing.yaml')]
+	}
+	for mode, modules in MODE_IMPORTS.items():
+		commands[mode] = [sys.executable, '-c', 'import jeeves.common, jeeves.metrics, yaml, argparse; import {}'.format(', '.join(modules))]
+	return commands
+
+
+def time_command(command, cwd):
+	''' runs command once
+		returns tuple of wall time in seconds and exit code
+	'''
+	start = time.perf_counter()
+	process = subprocess.run(command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+	return time.perf_counter() - start, process.returncode
+
+
+def get_slowest_imports(command, cwd, count):
+	''' runs command with -X importtime
+		returns list of (cumulative microseconds, module name) of the count slowest top level imports
+	'''
+	process = subprocess.run(command[:1] + ['-X', 'importtime'] + command[1:], cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+	imports = []
+	for line in process.stderr.splitlines():
+		if not line.startswith('import time:') or '|' not in line:
+			continue
+		parts = line[len('import time:'):].split('|')
+		if not parts[1].strip().isdigit():
+			continue
+
+		# top level imports are not indented beyond the single space after the separator
+		name = parts[2]
+		if name.startswith(' ') and not name.startswith('  '):
+			imports.append((int(parts[1]), name.strip()))
+	return sorted(imports, reverse=True)[:count]
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Benchmark startup time of the Jeeves CLI for --help, config errors and each mode')
+	parser.add_argument('--case', default=None, type=str, action='append', help='Case to run, may be given more than once - all cases by default')
+	parser.add_argument('--repeat', default=10, type=int, help='Number of runs per case')
+	parser.add_argument('--importtime', default=0, type=int, help='Also list this many slowest top level imports per case')
+	parser.add_argument('--output', default=None, type=str, help='File to write results to as JSON')
+	args = parser.parse_args()
+
+	repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	commands = get_commands(repo_dir)
+	results = {}
+	for case in args.case or list(commands):
+		if case not in commands:
+			print('Unknown case {}, choose from {}'.format(case, ', '.join(commands)))
+			sys.exit(1)
+		walls = []
+		for i in range(args.repeat):
+			wall, returncode = time_command(commands[case], repo_dir)
+			walls.append(wall)
+
+		# a mode whose client libraries are missing fails on import, which is not a startup time
+		if case in MODE_IMPORTS and returncode != 0:
+			print('{:<14} failed - are the requirements installed?'.format(case))
+			continue
+		results[case] = {'median_seconds': round(statistics.median(walls), 4), 'min_seconds': round(min(walls), 4), 'runs': len(walls)}
+		print('{:<14} median {:.3f}s, min {:.3f}s over {} runs'.format(case, statistics.median(walls), min(walls), len(walls)))
+		if args.importtime:
+			results[case]['slowest_imports'] = get_slowest_imports(commands[case], repo_dir, args.importtime)
+			for microseconds, name in results[case]['slowest_imports']:
+				print('    {:<36} {:.3f}s'.format(name, microseconds / 1000000))
+
+	if args.output:
+		with open(os.path.join(repo_dir, args.output) if not os.path.isabs(args.output) else args.output, 'w') as file:
+			json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+	main()
@@ -3,12 +3,10 @@
 import os
 import sys
 import yaml
-import jenkins
 import argparse
 
-from jeeves.report import run_report
-from jeeves.remind import run_remind
 from jeeves.common import generate_header, validate_config
+from jeeves.metrics import save_metrics
 
 os.environ['PYTHONHTTPSVERIFY'] = '0'
 
@@ -25,9 +23,14 @@ if __name__ == '__main__':
 	parser.add_argument("--template", default="report_template.html", type=str, help='Template HTML file to use (must be in "templates" directory)')
 
 	# set configuration flags
-	parser.add_argument("--mode", default="report", type=str, choices=['report', 'remind'], help='Flag to specify which mode to run Jeeves in')
+	parser.add_argument("--mode", default="report", type=str, choices=['report', 'remind', 'serve'], help='Flag to specify which mode to run Jeeves in')
 	parser.add_argument("--no-email", default=False, action='store_true', help='Flag to not send an email of the report')
 	parser.add_argument("--test-email", default=False, action='store_true', help='Flag to send email to test email address')
+	parser.add_argument("--no-cache", default=False, action='store_true', help='Flag to not read or write the local cache of Jenkins data')
+	parser.add_argument("--from-snapshot", default=False, type=str, help='Snapshot file to render and/or email a report from without any API calls')
+	parser.add_argument("--incremental", default=False, action='store_true', help='Flag to only fetch jobs whose last completed build changed since the previous incremental run')
+	parser.add_argument("--shard", default=None, type=str, help='Fetch only shard i of N of the report jobs, given as i/N, and save the partial result to shard_dir')
+	parser.add_argument("--merge", default=False, action='store_true', help='Flag to combine the partial results of all shards in shard_dir into a report')
 
 	# parse arguments
 	args = parser.parse_args()
@@ -38,16 +41,48 @@ if __name__ == '__main__':
 	mode = args.mode
 	no_email = args.no_email
 	test_email = args.test_email
+	no_cache = args.no_cache
+	incremental = args.incremental
+	snapshot_file = args.from_snapshot
+	merge = args.merge
+
+	# shards and merges only apply to reports
+	shard = None
+	if args.shard or merge:
+		from jeeves.shard import parse_shard
+
+		try:
+			if mode != 'report' or snapshot_file or (args.shard and merge):
+				raise ValueError('--shard and --merge can only be used separately in report mode')
+			if args.shard:
+				shard = parse_shard(args.shard)
+		except ValueError as e:
+			print("Error: ", e)
+			sys.exit(1)
 
 	# load configuration data - if YAML format is invalid, log and end program execution
 	try:
 		with open(config_file, 'r') as file:
 			config = yaml.safe_load(file)
-			validate_config(config, no_email, test_email)
+			validate_config(config, no_email or shard is not None, test_email)
 	except Exception as e:
 		print("Error loading configuration data: ", e)
 		sys.exit(1)
 
+	# render report from snapshot if given - no other data needs to be loaded
+	if snapshot_file:
+		from jeeves.report import deliver_report
+		from jeeves.snapshot import read_snapshot
+
+		try:
+			header, rows, summary, summary_per_version = read_snapshot(snapshot_file)
+		except Exception as e:
+			print("Error loading snapshot: ", e)
+			sys.exit(1)
+		deliver_report(config, header, rows, summary, summary_per_version, preamble_file, template_file, no_email, test_email, use_cache=not no_cache)
+		save_metrics(config, 'snapshot')
+		sys.exit(0)
+
 	# load blocker data - if YAML format is invalid, log and end program execution
 	try:
 		with open(blocker_file, 'r') as file:
@@ -56,26 +91,75 @@ if __name__ == '__main__':
 		print("Error loading blocker configuration data: ", e)
 		sys.exit(1)
 
+	# fetch optional config options, return None if not present
+	fpn = config.get('filter_param_name', None)
+	fpv = config.get('filter_param_value', None)
+
+	# merge partial results of shards into a report - no clients are needed
+	if merge:
+		from jeeves.report import run_merge
+		header = generate_header(config['job_search_fields'], filter_param_name=fpn, filter_param_value=fpv)
+		run_merge(config, blockers, preamble_file, template_file, no_email, test_email, header, use_cache=not no_cache)
+		save_metrics(config, 'merge')
+		sys.exit(0)
+
+	# client modules are imported only once a mode needs them, keeping --help and config errors fast
+	import jenkins
+	from jeeves.cache import JeevesCache
+	from jeeves.transport import PooledJenkins
+	from jeeves.blockers import close_tracker_clients
+
+	# open local cache of previously fetched data unless disabled
+	cache = None
+	if not no_cache:
+		try:
+			cache = JeevesCache(
+				config.get('cache_dir', '.jeeves_cache'),
+				config['jenkins_url'],
+				max_age_days=config.get('cache_max_age_days', 30),
+				max_size_mb=config.get('cache_max_size_mb', 100)
+			)
+		except Exception as e:
+			print("Error opening cache, continuing without it: ", e)
+
 	# connect to jenkins server - if not possible, log and end program execution
+	# the pooled transport can be switched off to compare against the stock python-jenkins one
 	try:
-		server = jenkins.Jenkins(config['jenkins_url'])
+		if config.get('jenkins_transport', 'pooled') == 'stock':
+			server = jenkins.Jenkins(config['jenkins_url'])
+		else:
+			server = PooledJenkins(config['jenkins_url'], pool_size=config.get('max_workers', 8), cache=cache)
 	except Exception as e:
 		print("Error connecting to Jenkins server: ", e)
 		sys.exit(1)
 
-	# fetch optional config options, return None if not present
-	fpn = config.get('filter_param_name', None)
-	fpv = config.get('filter_param_value', None)
+	# serve mode runs reports and reminders itself until interrupted
+	if mode == 'serve':
+		from jeeves.serve import run_serve
+		run_serve(config, blocker_file, preamble_file, template_file, no_email, test_email, server, cache)
+		close_tracker_clients()
+		sys.exit(0)
 
 	# generate header and execute Jeeves in either 'remind' or 'report' mode
 	# if remind, header source should be blocker_file
 	# if report, header source should be job_search_fields
-	if mode == 'report':
+	if mode == 'report' and shard is not None:
+		from jeeves.report import run_shard
 		header = generate_header(config['job_search_fields'], filter_param_name=fpn, filter_param_value=fpv)
-		run_report(config, blockers, preamble_file, template_file, no_email, test_email, server, header)
+		run_shard(config, blockers, server, header, shard, cache, incremental)
+		mode = 'shard_{}_of_{}'.format(*shard)
+	elif mode == 'report':
+		from jeeves.report import run_report
+		header = generate_header(config['job_search_fields'], filter_param_name=fpn, filter_param_value=fpv)
+		run_report(config, blockers, preamble_file, template_file, no_email, test_email, server, header, cache, incremental)
 	elif mode == 'remind':
+		from jeeves.remind import run_remind
 		header = generate_header(blocker_file, filter_param_name=fpn, filter_param_value=fpv, remind=True)
-		run_remind(config, blockers, server, header)
+		run_remind(config, blockers, server, header, cache)
 	else:
 		print("Invalid mode selected: ", mode)
 		sys.exit(1)
+	close_tracker_clients()
+
+	# write timings, API calls and cache hit rates of the run for monitoring
+	save_metrics(config, mode)
@@ -0,0 +1,128 @@
+# single pass aggregation of report rows into result counts, overall and per group
+
+import re
+
+from jeeves.common import generate_summary, percent
+
+# counter incremented for each row result
+RESULT_COUNTERS = {
+	'SUCCESS': 'num_success',
+	'UNSTABLE': 'num_unstable',
+	'FAILURE': 'num_failure',
+	'ABORTED': 'num_aborted',
+	'NO_KNOWN_BUILDS': 'num_missing',
+	'ERROR': 'num_error'
+}
+
+# DFG part of a job name, e.g. 'DFG-ceph' in 'DFG-ceph-rhos-16.1-...'
+DFG_PATTERN = re.compile(r'DFG-[^-/]+')
+
+
+def get_dfg(job_name):
+	''' returns DFG of a job, e.g. 'DFG-ceph' for 'DFG-ceph-rhos-16.1-...', or None if the job name has none
+	'''
+	match = DFG_PATTERN.search(job_name.rsplit('/', 1)[-1])
+	return match.group(0) if match else None
+
+
+def get_version_keys(row, blockers):
+	return [row.osp_version]
+
+
+def get_dfg_keys(row, blockers):
+	dfg = get_dfg(row.job_name)
+	return [dfg] if dfg else []
+
+
+def get_owner_keys(row, blockers):
+	return (blockers.get(row.job_name) or {}).get('owners') or []
+
+
+def get_stage_keys(row, blockers):
+	return [row.stage_name] if row.stage_name and row.stage_name != 'N/A' else []
+
+
+# functions returning the groups a row belongs to for each group-by key - a row may belong to any number of groups
+GROUP_KEYS = {
+	'osp_version': get_version_keys,
+	'dfg': get_dfg_keys,
+	'owner': get_owner_keys,
+	'stage': get_stage_keys
+}
+
+
+def new_stats():
+	''' returns dict of zeroed counters of a group
+	'''
+	stats = {'num_jobs': 0, 'num_covered': 0, 'num_bugs': 0, 'num_tickets': 0, 'bug_ids': set(), 'ticket_ids': set()}
+	for counter in RESULT_COUNTERS.values():
+		stats[counter] = 0
+	return stats
+
+
+def aggregate_rows(rows, group_by=(), blockers=None):
+	''' takes in list of JobRow, list of GROUP_KEYS names and blockers object
+		returns tuple of overall stats and dict of group-by key to dict of group to stats of that group,
+		computed in a single pass over the rows
+		stats hold the number of jobs with each result, covered jobs and blocker ids
+	'''
+	blockers = blockers or {}
+	key_functions = [(key, GROUP_KEYS[key]) for key in group_by]
+	groups = {key: {} for key in group_by}
+	totals = new_stats()
+	for row in rows:
+		counter = RESULT_COUNTERS.get(row.lcb_result, 'num_error')
+		targets = [totals]
+		for key, get_keys in key_functions:
+			key_groups = groups[key]
+			for group in get_keys(row, blockers):
+				stats = key_groups.get(group)
+				if stats is None:
+					stats = key_groups[group] = new_stats()
+				targets.append(stats)
+
+		for stats in targets:
+			stats['num_jobs'] += 1
+			stats[counter] += 1
+			if row.covered:
+				stats['num_covered'] += 1
+			if row.bug_ids:
+				stats['num_bugs'] += len(row.bug_ids)
+				stats['bug_ids'].update(row.bug_ids)
+			if row.ticket_ids:
+				stats['num_tickets'] += len(row.ticket_ids)
+				stats['ticket_ids'].update(row.ticket_ids)
+	return totals, groups
+
+
+def summarize(stats):
+	''' takes in stats of a group
+		returns summary generated by generate_summary
+	'''
+	return generate_summary(
+		stats['num_success'],
+		stats['num_unstable'],
+		stats['num_failure'],
+		stats['num_aborted'],
+		stats['num_missing'],
+		stats['num_error'],
+		stats['num_jobs']
+	)
+
+
+def get_breakdown(key_groups):
+	''' takes in dict of group to stats of one group-by key
+		returns list of dicts with the group name, job counts per result, pass rate and blocker coverage of each group,
+		groups with the most jobs first
+	'''
+	breakdown = []
+	for group, stats in key_groups.items():
+		num_failing = stats['num_jobs'] - stats['num_success']
+		entry = {'group': group, 'num_jobs': stats['num_jobs']}
+		for counter in RESULT_COUNTERS.values():
+			entry[counter] = stats[counter]
+		entry['pass_rate'] = percent(stats['num_success'], stats['num_jobs'])
+		entry['coverage'] = percent(stats['num_covered'], num_failing) if num_failing else None
+		breakdown.append(entry)
+	breakdown.sort(key=lambda entry: (-entry['num_jobs'], str(entry['group'])))
+	return breakdown
@@ -1,53 +1,175 @@
 # library functions for handling blocker data
 
-import bugzilla
-from jira import JIRA
+import time
+import threading
 
+from concurrent.futures import ThreadPoolExecutor
 
-def get_bugs_dict(bug_ids, config):
-	''' takes in set of bug_ids and returns dictionary with
-		bug_ids as keys and API data as values
-		a bug_id value of 0 will be ignored
+from jeeves.metrics import record_cache, timed_request
+
+# tracker clients kept for the lifetime of the process, keyed by tracker URL
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_tracker_client(tracker_url, connect):
+	''' returns the client for the given tracker URL, calling connect to create it on first use
+		so repeated queries, e.g. by a long running jeeves, reuse one authenticated session
 	'''
+	with _clients_lock:
+		if tracker_url not in _clients:
+			_clients[tracker_url] = connect()
+		return _clients[tracker_url]
 
-	# initialize bug dictionary
-	bug_dict = {}
 
-	bug_ids_to_query = [str(bug_id) for bug_id in bug_ids if bug_id != 0]
-	if len(bug_ids_to_query) == 0:
-		return bug_dict
+def _close_client(client):
+	''' closes the HTTP session of a JIRA or Bugzilla client
+	'''
+	try:
+		if hasattr(client, 'get_requests_session'):
+			client.get_requests_session().close()
+			client.disconnect()
+		else:
+			client.close()
+	except Exception as e:
+		print("Error closing tracker client: ", e)
+
+
+def drop_tracker_client(tracker_url):
+	''' closes and forgets the client for the given tracker URL so the next query connects again
+	'''
+	with _clients_lock:
+		client = _clients.pop(tracker_url, None)
+	if client is not None:
+		_close_client(client)
+
+
+def close_tracker_clients():
+	''' closes and forgets all tracker clients, called once a run no longer queries the trackers
+	'''
+	with _clients_lock:
+		clients = list(_clients.values())
+		_clients.clear()
+	for client in clients:
+		_close_client(client)
+
+
+def get_tracker_info(item_ids, tracker_url, query, config, cache=None):
+	''' takes in list of bug or ticket ids, URL of their tracker and a function querying
+		the tracker for a list of ids, returning dictionary of id to (status, summary)
+		optionally takes a JeevesCache object - entries younger than tracker_cache_ttl seconds are served from it
+		only expired entries are queried; if all of them have stale values and the query
+		fails or takes longer than tracker_refresh_timeout seconds, the stale values are used
+		returns dictionary with ids as keys and (status, summary) tuples as values for each id found
+	'''
+	if cache is None:
+		return query(item_ids)
+
+	entries = cache.get_tracker_entries(tracker_url, item_ids)
+	tracker_info = {item_id: (entry['status'], entry['summary']) for item_id, entry in entries.items()}
+	expired_before = time.time() - config.get('tracker_cache_ttl', 3600)
+	expired = [item_id for item_id in item_ids if item_id not in entries or entries[item_id]['fetched_at'] < expired_before]
+	record_cache('tracker', len(item_ids) - len(expired), len(expired))
+	if not expired:
+		return tracker_info
+
+	refreshed = {}
+
+	def refresh():
+		refreshed.update(query(expired))
+		cache.set_tracker_entries(tracker_url, refreshed)
+
+	# ids never fetched before must be waited for
+	if any(item_id not in entries for item_id in expired):
+		refresh()
+
+	# otherwise refresh in the background and serve stale values if the tracker is slow
+	else:
+		refresh_thread = threading.Thread(target=refresh, daemon=True)
+		refresh_thread.start()
+		refresh_thread.join(config.get('tracker_refresh_timeout', 30))
+		if refresh_thread.is_alive():
+			print("Tracker {} is slow to respond - using cached data for {} items".format(tracker_url, len(expired)))
+			return tracker_info
+
+	tracker_info.update(refreshed)
+	return tracker_info
+
+
+def get_bugs_info(bz_api, bug_ids, retries=2):
+	''' takes in Bugzilla API object and list of bug ids
+		fetches status and summary of all bugs with a single ids-based query, retrying on failure
+		returns dictionary with bug ids as keys and (status, summary) tuples as values for each bug found
+	'''
+	for attempt in range(retries + 1):
+		try:
+			with timed_request('bugzilla getbugs'):
+				bugs = bz_api.getbugs(bug_ids, include_fields=['id', 'status', 'summary'], permissive=True)
+			return {bug.id: (bug.status, bug.summary) for bug in bugs if bug is not None}
+		except Exception as e:
+			print("Bugzilla API Call Error (attempt {} of {}): {}".format(attempt + 1, retries + 1, e))
+	return {}
+
+
+def query_bugs(bug_ids, config):
+	''' takes in list of bug_ids and config
+		queries Bugzilla in chunks run in parallel so no single request grows with the size of the blockers file
+		returns dictionary with bug ids as keys and (status, summary) tuples as values for each bug found
+	'''
+	import bugzilla
+
+	query_bz_dict = {}
 
 	# API connection does not work if '/' present at end of URL string
 	parsed_bz_url = config['bz_url'].rstrip('/')
-	bz_api = bugzilla.Bugzilla(parsed_bz_url)
-
-	# Amend the quicksearch operation in order to aggregate search of multiple bug IDs from bugzilla
-	quicksearch_bz_url = parsed_bz_url + "/buglist.cgi?quicksearch="
-	bugs_query_url = quicksearch_bz_url + '+'.join(bug_ids_to_query)
-	bz_query = bz_api.url_to_query(bugs_query_url)
-	# Restrict return values to just id, status, and summary
-	bz_query['include_fields'] = ['id', 'status', 'summary']
 
+	chunk_size = config.get('bz_chunk_size', 100)
+	chunks = [bug_ids[i:i + chunk_size] for i in range(0, len(bug_ids), chunk_size)]
 	try:
-		bugs = bz_api.query(bz_query)
-		# Create a dictionary based on returned bug ids
-		query_bz_dict = {bug.id: (bug.status, bug.summary) for bug in bugs}
+		bz_api = get_tracker_client(parsed_bz_url, lambda: bugzilla.Bugzilla(parsed_bz_url))
+		with ThreadPoolExecutor(max_workers=max(1, config.get('max_workers', 8))) as executor:
+			for chunk_info in executor.map(lambda chunk: get_bugs_info(bz_api, chunk, retries=config.get('bz_retries', 2)), chunks):
+				query_bz_dict.update(chunk_info)
 	except Exception as e:
 		print("Bugzilla API Call Error:", e)
-		query_bz_dict = {}
+		drop_tracker_client(parsed_bz_url)
+	return query_bz_dict
 
-	# iterate through bug ids from set
+
+def get_bugs_dict(bug_ids, config, cache=None):
+	''' takes in set of bug_ids and returns dictionary with
+		bug_ids as keys and API data as values
+		optionally takes a JeevesCache object to serve bug data from
+		a bug_id value of 0 will be ignored
+	'''
+
+	# initialize bug dictionary
+	bug_dict = {}
+
+	# normalise ids once so the query and the lookup use the same int keys - ids that are not numbers are not queried
+	numeric_ids = {}
 	for bug_id in bug_ids:
 
 		# a bug_id value of 0 is used as a placeholder, not a valid bug
-		# skip as there is no API data to be fetched in this case
 		if bug_id == 0:
 			continue
+		try:
+			numeric_ids[bug_id] = int(bug_id)
+		except (TypeError, ValueError):
+			print("Invalid bug ID {} in blockers file - not querying Bugzilla for it".format(bug_id))
+			numeric_ids[bug_id] = None
 
+	bug_ids_to_query = sorted({numeric_id for numeric_id in numeric_ids.values() if numeric_id is not None})
+	query_bz_dict = {}
+	if bug_ids_to_query:
+		query_bz_dict = get_tracker_info(bug_ids_to_query, config['bz_url'], lambda ids: query_bugs(ids, config), config, cache=cache)
+
+	# iterate through bug ids from set
+	for bug_id, numeric_id in numeric_ids.items():
 		bug_url = config['bz_url'] + "/show_bug.cgi?id=" + str(bug_id)
-		if query_bz_dict.get(bug_id):
-			bug_status = '[' + query_bz_dict[bug_id][0] + ']'
-			bug_summary = query_bz_dict[bug_id][1]
+		if query_bz_dict.get(numeric_id):
+			bug_status = '[' + query_bz_dict[numeric_id][0] + ']'
+			bug_summary = query_bz_dict[numeric_id][1]
 			bug_name = ' '.join([bug_status, bug_summary])
 		else:
 			bug_name = "BZ#" + str(bug_id)
@@ -80,14 +202,47 @@ def get_bugs_set(blockers):
 	return bug_set
 
 
-def get_tickets_dict(ticket_ids, config):
-	''' takes in set of ticket_ids and returns dictionary with
-		ticket_ids as keys and API data as values
-		a ticket_id with a value of 0 will be ignored
+def get_tickets_info(jira, ticket_ids):
+	''' takes in JIRA client and list of ticket ids
+		fetches status and summary of all tickets with a single JQL search
+		if the search fails, e.g. because one of the keys does not exist, tickets are fetched one at a time
+		returns dictionary with ticket ids as keys and (status, summary) tuples as values for each ticket found
 	'''
+	tickets_info = {}
+	try:
+		jql = 'key in ({})'.format(', '.join('"{}"'.format(ticket_id) for ticket_id in ticket_ids))
+		with timed_request('jira search'):
+			issues = jira.search_issues(jql, fields='status,summary', maxResults=len(ticket_ids))
+		issues_by_key = {issue.key.upper(): issue for issue in issues}
+		for ticket_id in ticket_ids:
+			issue = issues_by_key.get(str(ticket_id).upper())
+			if issue is not None:
+				tickets_info[ticket_id] = (str(issue.fields.status), issue.fields.summary)
+	except Exception as e:
+		print("Jira API Search Error: {} - fetching tickets individually...".format(e))
 
-	# initialize ticket dictionary
-	ticket_dict = {}
+	# tickets missing from search results (e.g. moved tickets or a failed search) are fetched individually
+	for ticket_id in ticket_ids:
+		if ticket_id in tickets_info:
+			continue
+		try:
+			with timed_request('jira issue'):
+				issue = jira.issue(ticket_id, fields='status,summary')
+			tickets_info[ticket_id] = (str(issue.fields.status), issue.fields.summary)
+		except Exception as e:
+			print("Jira API Call Error: ", e)
+
+	return tickets_info
+
+
+def query_tickets(ticket_ids, config):
+	''' takes in list of ticket_ids and config
+		queries Jira in chunks run in parallel with one JQL search each
+		returns dictionary with ticket ids as keys and (status, summary) tuples as values for each ticket found
+	'''
+	from jira import JIRA
+
+	query_jira_dict = {}
 
 	# initialize jira variable and config options
 	auth = (config['jira_username'], config['jira_password'])
@@ -95,41 +250,49 @@ def get_tickets_dict(ticket_ids, config):
 		"server": config['jira_url'],
 		"verify": config['certificate']
 	}
-	jira = None
 
-	# iterate through ticket ids from set
-	for ticket_id in ticket_ids:
+	chunk_size = config.get('jira_chunk_size', 50)
+	chunks = [ticket_ids[i:i + chunk_size] for i in range(0, len(ticket_ids), chunk_size)]
+	try:
+		jira = get_tracker_client(config['jira_url'], lambda: JIRA(auth=auth, options=options))
+		with ThreadPoolExecutor(max_workers=max(1, config.get('max_workers', 8))) as executor:
+			for chunk_info in executor.map(lambda chunk: get_tickets_info(jira, chunk), chunks):
+				query_jira_dict.update(chunk_info)
+	except Exception as e:
+		print("Jira API Call Error: ", e)
+		drop_tracker_client(config['jira_url'])
+	return query_jira_dict
 
-		# a ticket_id value of 0 is used as a placeholder, not a valid ticket
-		# skip as there is no API data to be fetched in this case
-		if ticket_id == 0:
-			continue
 
-		# get ticket info from jira API
-		try:
+def get_tickets_dict(ticket_ids, config, cache=None):
+	''' takes in set of ticket_ids and returns dictionary with
+		ticket_ids as keys and API data as values
+		optionally takes a JeevesCache object to serve ticket data from
+		a ticket_id with a value of 0 will be ignored
+	'''
+
+	# initialize ticket dictionary
+	ticket_dict = {}
 
-			# initialize connection if it has not yet been done (either first iteration or previously failed)
-			if jira is None:
-				jira = JIRA(auth=auth, options=options)
+	ticket_ids_to_query = [ticket_id for ticket_id in ticket_ids if ticket_id != 0]
+	if len(ticket_ids_to_query) == 0:
+		return ticket_dict
 
-			issue = jira.issue(ticket_id)
-			ticket_status = '[' + str(issue.fields.status) + ']'
-			ticket_summary = issue.fields.summary
+	query_jira_dict = get_tracker_info(ticket_ids_to_query, config['jira_url'], lambda ids: query_tickets(ids, config), config, cache=cache)
+
+	# iterate through ticket ids from set
+	for ticket_id in ticket_ids_to_query:
+		if ticket_id in query_jira_dict:
+			ticket_status = '[' + query_jira_dict[ticket_id][0] + ']'
+			ticket_summary = query_jira_dict[ticket_id][1]
 			ticket_name = ' '.join([ticket_status.upper(), ticket_summary])
-		except Exception as e:
-			print("Jira API Call Error: ", e)
+		else:
 			ticket_name = ticket_id
-			jira = None
-		finally:
-			ticket_url = config['jira_url'] + "/browse/" + str(ticket_id)
-			ticket_dict[ticket_id] = {
-				'ticket_name': ticket_name,
-				'ticket_url': ticket_url
-			}
-
-	# close Jira connection if open
-	if jira is not None:
-		jira.close()
+		ticket_url = config['jira_url'] + "/browse/" + str(ticket_id)
+		ticket_dict[ticket_id] = {
+			'ticket_name': ticket_name,
+			'ticket_url': ticket_url
+		}
 
 	return ticket_dict
 
@@ -157,6 +320,21 @@ def get_tickets_set(blockers):
 	return jira_set
 
 
+def get_owner_jobs(blockers):
+	''' takes in blockers object and generates a dict of owner to list of jobs they own
+		jobs keep the order they have in the blockers object
+		passing an empty dict will result in an empty dict
+	'''
+	owner_jobs = {}
+	for job_name in blockers:
+		owners = blockers[job_name].get('owners', False)
+		if not owners:
+			continue
+		for owner in owners:
+			owner_jobs.setdefault(owner, []).append(job_name)
+	return owner_jobs
+
+
 def get_other_blockers(blockers, job_name):
 	''' takes in blockers object and job name
 		returns list of 'other' blockers
@@ -0,0 +1,237 @@
+# persistent local cache of data fetched by jeeves
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+
+class JeevesCache:
+	''' SQLite backed store kept in the configured cache directory
+		entries are keyed by jenkins url so one cache directory can serve several servers
+		a single connection is shared between worker threads and guarded by a lock
+		build, HTTP response and param index entries are evicted by the time they were last read or written
+	'''
+
+	def __init__(self, cache_dir, jenkins_url, max_age_days=30, max_size_mb=100):
+		os.makedirs(cache_dir, exist_ok=True)
+		self.jenkins_url = jenkins_url.rstrip('/')
+		self.lock = threading.Lock()
+		self.db = sqlite3.connect(os.path.join(cache_dir, 'cache.db'), check_same_thread=False)
+		with self.lock, self.db:
+			self.db.execute('''CREATE TABLE IF NOT EXISTS param_index (
+				jenkins_url TEXT,
+				job_name TEXT,
+				param_name TEXT,
+				build_number INTEGER,
+				param_value TEXT,
+				accessed_at REAL,
+				PRIMARY KEY (jenkins_url, job_name, param_name, build_number)
+			)''')
+			self.db.execute('''CREATE TABLE IF NOT EXISTS builds (
+				jenkins_url TEXT,
+				job_name TEXT,
+				build_number INTEGER,
+				kind TEXT,
+				data TEXT,
+				stored_at REAL,
+				accessed_at REAL,
+				PRIMARY KEY (jenkins_url, job_name, build_number, kind)
+			)''')
+			self.db.execute('''CREATE TABLE IF NOT EXISTS job_state (
+				jenkins_url TEXT,
+				job_name TEXT,
+				state TEXT,
+				PRIMARY KEY (jenkins_url, job_name)
+			)''')
+			self.db.execute('''CREATE TABLE IF NOT EXISTS tracker_entries (
+				tracker_url TEXT,
+				item_id TEXT,
+				status TEXT,
+				summary TEXT,
+				fetched_at REAL,
+				PRIMARY KEY (tracker_url, item_id)
+			)''')
+			self.db.execute('''CREATE TABLE IF NOT EXISTS inventory (
+				jenkins_url TEXT,
+				folder_depth INTEGER,
+				jobs TEXT,
+				fetched_at REAL,
+				PRIMARY KEY (jenkins_url, folder_depth)
+			)''')
+			self.db.execute('''CREATE TABLE IF NOT EXISTS http_responses (
+				url TEXT PRIMARY KEY,
+				etag TEXT,
+				last_modified TEXT,
+				body BLOB,
+				encoding TEXT,
+				stored_at REAL,
+				accessed_at REAL
+			)''')
+
+			# caches created before entries kept their last access time start counting from when they were stored
+			for table, column in [('param_index', 'NULL'), ('builds', 'stored_at'), ('http_responses', 'stored_at')]:
+				if 'accessed_at' not in [info[1] for info in self.db.execute('PRAGMA table_info({})'.format(table))]:
+					self.db.execute('ALTER TABLE {} ADD COLUMN accessed_at REAL'.format(table))
+					self.db.execute('UPDATE {} SET accessed_at = coalesce({}, ?)'.format(table, column), (time.time(),))
+		self.evict(max_age_days, max_size_mb)
+
+	def evict(self, max_age_days, max_size_mb):
+		''' removes tracker entries fetched more than max_age_days ago and build, HTTP response and param index entries
+			not accessed for max_age_days, then removes the least recently accessed build, HTTP response and param index entries
+			until each fits in max_size_mb
+		'''
+		with self.lock, self.db:
+			self.db.execute('DELETE FROM tracker_entries WHERE fetched_at < ?', (time.time() - max_age_days * 86400,))
+			for table, column in [('builds', 'data'), ('http_responses', 'body'), ('param_index', 'param_value')]:
+				self.db.execute('DELETE FROM {} WHERE accessed_at < ?'.format(table), (time.time() - max_age_days * 86400,))
+				cursor = self.db.execute('SELECT rowid, length({}) FROM {} ORDER BY accessed_at DESC'.format(column, table))
+				total_size = 0
+				expired = []
+				for rowid, size in cursor.fetchall():
+					total_size += size
+					if total_size > max_size_mb * 1024 * 1024:
+						expired.append((rowid,))
+				self.db.executemany('DELETE FROM {} WHERE rowid = ?'.format(table), expired)
+
+	def get_build(self, job_name, build_number, kind):
+		''' returns cached data of the given kind ('info' or 'stages') for a build
+			returns None if the build is not cached
+		'''
+		with self.lock, self.db:
+			row = self.db.execute(
+				'SELECT rowid, data FROM builds WHERE jenkins_url = ? AND job_name = ? AND build_number = ? AND kind = ?',
+				(self.jenkins_url, job_name, build_number, kind)
+			).fetchone()
+			if row is not None:
+				self.db.execute('UPDATE builds SET accessed_at = ? WHERE rowid = ?', (time.time(), row[0]))
+		if row is None:
+			return None
+		return json.loads(row[1])
+
+	def set_build(self, job_name, build_number, kind, data):
+		''' stores data of the given kind ('info' or 'stages') for a build
+			only completed builds should be stored as their data can no longer change
+		'''
+		with self.lock, self.db:
+			self.db.execute(
+				'INSERT OR REPLACE INTO builds VALUES (?, ?, ?, ?, ?, ?, ?)',
+				(self.jenkins_url, job_name, build_number, kind, json.dumps(data), time.time(), time.time())
+			)
+
+	def get_http_response(self, url):
+		''' returns dict with 'etag', 'last_modified', 'body' and 'encoding' of the response stored for a URL
+			returns None if no response is stored
+		'''
+		with self.lock, self.db:
+			row = self.db.execute('SELECT etag, last_modified, body, encoding FROM http_responses WHERE url = ?', (url,)).fetchone()
+			if row is not None:
+				self.db.execute('UPDATE http_responses SET accessed_at = ? WHERE url = ?', (time.time(), url))
+		if row is None:
+			return None
+		return {'etag': row[0], 'last_modified': row[1], 'body': row[2], 'encoding': row[3]}
+
+	def set_http_response(self, url, etag, last_modified, body, encoding):
+		''' stores body of a response to a GET request along with the validators the server sent for it
+		'''
+		with self.lock, self.db:
+			self.db.execute(
+				'INSERT OR REPLACE INTO http_responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+				(url, etag, last_modified, body, encoding, time.time(), time.time())
+			)
+
+	def get_inventory(self, folder_depth, max_age):
+		''' returns list of jobs stored by set_inventory for the given folder depth
+			returns None if there is none or it is older than max_age seconds
+		'''
+		with self.lock:
+			row = self.db.execute(
+				'SELECT jobs FROM inventory WHERE jenkins_url = ? AND folder_depth = ? AND fetched_at >= ?',
+				(self.jenkins_url, folder_depth, time.time() - max_age)
+			).fetchone()
+		if row is None:
+			return None
+		return json.loads(row[0])
+
+	def set_inventory(self, folder_depth, jobs):
+		''' stores list of all jobs fetched from jenkins with the given folder depth
+		'''
+		with self.lock, self.db:
+			self.db.execute(
+				'INSERT OR REPLACE INTO inventory VALUES (?, ?, ?, ?)',
+				(self.jenkins_url, folder_depth, json.dumps(jobs), time.time())
+			)
+
+	def get_job_states(self, job_names):
+		''' takes in list of job names
+			returns dict of job name to the state stored for it by the previous incremental run
+		'''
+		job_names = set(job_names)
+		with self.lock:
+			cursor = self.db.execute('SELECT job_name, state FROM job_state WHERE jenkins_url = ?', (self.jenkins_url,))
+			return {job_name: json.loads(state) for job_name, state in cursor if job_name in job_names}
+
+	def set_job_states(self, job_states):
+		''' takes in dict of job name to state and stores it for the next incremental run
+		'''
+		with self.lock, self.db:
+			self.db.executemany(
+				'INSERT OR REPLACE INTO job_state VALUES (?, ?, ?)',
+				[(self.jenkins_url, job_name, json.dumps(state)) for job_name, state in job_states.items()]
+			)
+
+	def get_tracker_entries(self, tracker_url, item_ids):
+		''' takes in tracker url and list of bug or ticket ids
+			returns dict of id to cached entry with 'status', 'summary' and 'fetched_at' keys
+			ids without a cached entry are missing from the dict
+		'''
+		item_ids = {str(item_id): item_id for item_id in item_ids}
+		with self.lock:
+			cursor = self.db.execute(
+				'SELECT item_id, status, summary, fetched_at FROM tracker_entries WHERE tracker_url = ?',
+				(tracker_url.rstrip('/'),)
+			)
+			return {
+				item_ids[item_id]: {'status': status, 'summary': summary, 'fetched_at': fetched_at}
+				for item_id, status, summary, fetched_at in cursor if item_id in item_ids
+			}
+
+	def set_tracker_entries(self, tracker_url, tracker_info):
+		''' takes in tracker url and dict of bug or ticket id to (status, summary) tuple
+			stores the entries as fetched now
+		'''
+		with self.lock, self.db:
+			self.db.executemany(
+				'INSERT OR REPLACE INTO tracker_entries VALUES (?, ?, ?, ?, ?)',
+				[(tracker_url.rstrip('/'), str(item_id), status, summary, time.time()) for item_id, (status, summary) in tracker_info.items()]
+			)
+
+	def get_param_values(self, job_name, param_name):
+		''' returns dict of build number to value of the given param for all indexed builds of a job
+			a value of None means the build does not have the param
+		'''
+		with self.lock, self.db:
+			self.db.execute(
+				'UPDATE param_index SET accessed_at = ? WHERE jenkins_url = ? AND job_name = ? AND param_name = ?',
+				(time.time(), self.jenkins_url, job_name, param_name)
+			)
+			cursor = self.db.execute(
+				'SELECT build_number, param_value FROM param_index WHERE jenkins_url = ? AND job_name = ? AND param_name = ?',
+				(self.jenkins_url, job_name, param_name)
+			)
+			return {build_number: json.loads(param_value) for build_number, param_value in cursor}
+
+	def set_param_values(self, job_name, param_name, param_values):
+		''' takes in job name, param name and dict of build number to param value
+			only completed builds should be stored as their parameters can no longer change
+		'''
+		with self.lock, self.db:
+			self.db.executemany(
+				'INSERT OR REPLACE INTO param_index VALUES (?, ?, ?, ?, ?, ?)',
+				[(self.jenkins_url, job_name, param_name, build_number, json.dumps(param_value), time.time()) for build_number, param_value in param_values.items()]
+			)
+
+	def close(self):
+		with self.lock:
+			self.db.close()
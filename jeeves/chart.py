@@ -0,0 +1,82 @@
+# library functions for rendering summary charts locally
+
+import math
+
+from xml.sax.saxutils import escape
+
+
+def get_chart_segments(num_success, num_unstable, num_failure, num_aborted, num_missing, num_error):
+	''' takes in number of jobs with each result
+		returns list of (color, job count, label) tuples for every result with at least one job
+	'''
+	segments = [
+		('#3465a4', num_success, 'Success'),
+		('#515151', num_aborted, 'Aborted'),
+		('#ef2929', num_failure, 'Failure'),
+		('#704426', num_error, 'Error'),
+		('#ffb738', num_unstable, 'Unstable'),
+		('#bbbbbb', num_missing, 'Missing')
+	]
+	return [segment for segment in segments if segment[1] != 0]
+
+
+def polar_point(center, radius, angle):
+	''' returns 'x,y' string of the point at given angle in degrees, measured clockwise from 12 o'clock
+	'''
+	radians = math.radians(angle - 90)
+	return '{:.2f},{:.2f}'.format(center + radius * math.cos(radians), center + radius * math.sin(radians))
+
+
+def generate_doughnut_svg(segments, size=300):
+	''' takes in list of (color, count, label) tuples and diameter of the chart in pixels
+		returns inline SVG markup of a doughnut chart with a legend and the total in its center
+		needs no network access, unlike the quickchart.io image
+	'''
+	total = sum(count for color, count, label in segments)
+	legend_height = 20 * math.ceil(len(segments) / 3)
+	center = size / 2
+	outer_radius = size / 2 - 2
+	inner_radius = outer_radius * 0.55
+	label_radius = (outer_radius + inner_radius) / 2
+
+	svg = ['<svg xmlns="http://www.w3.org/2000/svg" width="{0}" height="{1}" viewBox="0 0 {0} {1}">'.format(size, size + legend_height)]
+
+	# legend above the chart, three entries per line
+	for i, (color, count, label) in enumerate(segments):
+		x = (i % 3) * size / 3
+		y = (i // 3) * 20
+		svg.append('<rect x="{:.0f}" y="{}" width="12" height="12" fill="{}"/>'.format(x + 4, y + 4, color))
+		svg.append('<text x="{:.0f}" y="{}" font-family="sans-serif" font-size="12">{}</text>'.format(x + 20, y + 14, escape(label)))
+
+	svg.append('<g transform="translate(0,{})">'.format(legend_height))
+	start = 0.0
+	for color, count, label in segments:
+		sweep = 360.0 * count / total
+
+		# a single segment covering the whole ring cannot be drawn as an arc
+		if sweep >= 360:
+			svg.append('<circle cx="{0}" cy="{0}" r="{1:.2f}" fill="none" stroke="{2}" stroke-width="{3:.2f}"/>'.format(center, label_radius, color, outer_radius - inner_radius))
+		else:
+			end = start + sweep
+			large_arc = 1 if sweep > 180 else 0
+			svg.append('<path d="M{} A{r},{r} 0 {l} 1 {} L{} A{ri},{ri} 0 {l} 0 {} Z" fill="{}" stroke="#fff"/>'.format(
+				polar_point(center, outer_radius, start),
+				polar_point(center, outer_radius, end),
+				polar_point(center, inner_radius, end),
+				polar_point(center, inner_radius, start),
+				color,
+				r='{:.2f}'.format(outer_radius),
+				ri='{:.2f}'.format(inner_radius),
+				l=large_arc
+			))
+
+		# job count label in the middle of the segment
+		x, y = polar_point(center, label_radius, start + sweep / 2).split(',')
+		svg.append('<text x="{}" y="{}" text-anchor="middle" dominant-baseline="middle" font-family="sans-serif" font-size="{}" font-weight="bold">{}</text>'.format(x, y, max(10, size // 25), count))
+		start += sweep
+
+	# total number of jobs in the center of the ring
+	svg.append('<text x="{0}" y="{0}" text-anchor="middle" font-family="sans-serif" font-size="{1}">{2}</text>'.format(center, max(12, size // 15), total))
+	svg.append('<text x="{}" y="{}" text-anchor="middle" font-family="sans-serif" font-size="{}">Total Jobs</text>'.format(center, center + max(12, size // 15), max(10, size // 20)))
+	svg.append('</g></svg>')
+	return ''.join(svg)
@@ -1,6 +1,8 @@
 # common functions used throughout jeeves
 
 import os
+import re
+import uuid
 import datetime
 
 
@@ -61,21 +63,95 @@ def generate_summary(num_success, num_unstable, num_failure, num_aborted, num_mi
 	return summary
 
 
-def generate_html_file(htmlcode, remind=False):
-	''' generates HTML file of reminder
+def generate_html_file(htmlcode, remind=False, suffix=None):
+	''' generates HTML file of report or reminder
+		htmlcode can be a string or an iterable of string chunks, e.g. from template.generate()
+		suffix, e.g. the owner of a reminder, keeps files generated within the same second apart
 	'''
 	try:
 		os.makedirs('archive')
 	except FileExistsError:
 		pass
 	reportType = 'reminder' if remind else 'report'
-	filename = './archive/{}_{:%Y-%m-%d_%H-%M-%S}.html'.format(
-		reportType, datetime.datetime.now())
-	with open(filename, 'w') as file:
-		file.write(htmlcode)
+	filename = './archive/{}_{:%Y-%m-%d_%H-%M-%S}'.format(reportType, datetime.datetime.now())
+	if suffix:
+		filename += '_' + re.sub(r'[^\w.@+-]', '_', str(suffix))
+	filename += '.html'
+	with open(filename, 'w', encoding='utf-8') as file:
+		if isinstance(htmlcode, str):
+			file.write(htmlcode)
+		else:
+			file.writelines(htmlcode)
 	return filename
 
 
+def open_smtp_session(config):
+	''' opens SMTP session to configured SMTP host with TLS started
+		logs in if smtp_username and smtp_password are configured
+		returns SMTP object - caller is responsible for closing it
+	'''
+	from smtplib import SMTP
+
+	smtp = SMTP(config['smtp_host'])
+	try:
+
+		# start TLS for security
+		smtp.starttls()
+
+		# use ehlo or helo if needed
+		smtp.ehlo_or_helo_if_needed()
+
+		# authenticate if credentials are configured
+		if config.get('smtp_username') and config.get('smtp_password'):
+			smtp.login(config['smtp_username'], config['smtp_password'])
+	except Exception:
+		smtp.close()
+		raise
+	return smtp
+
+
+def generate_email(from_addr, to_addrs, subject, html_chunks):
+	''' takes in sender, list of recipients, subject and an iterable of HTML chunks as bytes, e.g. read from a file
+		returns email message with the HTML base64 encoded as bytearray, built chunk by chunk so the message
+		is the only full copy of the HTML held in memory
+	'''
+	from base64 import encodebytes
+	from email.header import Header
+	from email.utils import formatdate, make_msgid
+
+	boundary = '=' * 15 + uuid.uuid4().hex
+	headers = [
+		'Content-Type: multipart/mixed; boundary="{}"'.format(boundary),
+		'MIME-Version: 1.0',
+		'From: {}'.format(from_addr),
+		'Subject: {}'.format(Header(subject, 'utf-8').encode()),
+		'To: {}'.format(', '.join(to_addrs)),
+		'Date: {}'.format(formatdate(localtime=True)),
+		'Message-ID: {}'.format(make_msgid()),
+		'',
+		'--' + boundary,
+		'Content-Type: text/html; charset="utf-8"',
+		'MIME-Version: 1.0',
+		'Content-Transfer-Encoding: base64',
+		'',
+		''
+	]
+	message = bytearray('\r\n'.join(headers).encode())
+
+	# base64 encode whole lines of 57 bytes at a time, carrying the rest over to the next chunk
+	carry = b''
+	for chunk in html_chunks:
+		data = carry + chunk
+		cut = len(data) - len(data) % 57
+		carry = data[cut:]
+		if cut:
+			message += encodebytes(data[:cut]).replace(b'\n', b'\r\n')
+	if carry:
+		message += encodebytes(carry).replace(b'\n', b'\r\n')
+	message += '\r\n--{}--\r\n'.format(boundary).encode()
+	return message
+
+
 def percent(part, whole):
 	''' basic percent function
 	'''
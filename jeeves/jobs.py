@@ -3,6 +3,10 @@
 import re
 import datetime
 
+from concurrent.futures import ThreadPoolExecutor
+
+from jeeves.metrics import record_cache
+
 
 def get_stage_failure(build_stages):
 	''' takes in build stages dict
@@ -14,6 +18,23 @@ def get_stage_failure(build_stages):
 	return 'N/A'
 
 
+def get_stage_durations(build_stages):
+	''' takes in build stages dict
+		returns list of dicts with name, status and duration of every stage in the order they ran
+		duration is formatted as H:MM:SS, duration_millis holds the raw value
+	'''
+	stage_durations = []
+	for stage in build_stages['stages']:
+		duration_millis = stage.get('durationMillis', 0)
+		stage_durations.append({
+			'name': stage.get('name', 'N/A'),
+			'status': stage.get('status'),
+			'duration': str(datetime.timedelta(seconds=duration_millis // 1000)),
+			'duration_millis': duration_millis
+		})
+	return stage_durations
+
+
 def generate_failure_stage_log_urls(config, err_stage, job_url, lcb_num):
 	''' generates list of urls for failed build stages
 	'''
@@ -26,9 +47,288 @@ def generate_failure_stage_log_urls(config, err_stage, job_url, lcb_num):
 	return stage_urls
 
 
-def get_jenkins_job_info(server, job_name, filter_param_name=None, filter_param_value=None):
+# action classes jenkins uses to publish build parameters
+PARAMETERS_ACTION_CLASSES = ['com.tikal.jenkins.plugins.multijob.MultiJobParametersAction', 'hudson.model.ParametersAction']
+
+# tree query returning only the last completed build fields jeeves reports on for every job in a folder
+BULK_TREE_QUERY = '?tree=jobs[name,url,lastCompletedBuild[number,result,timestamp,url,actions[_class,parameters[name,value],failCount,html]]]'
+
+
+# tree query returning name and url of every item in a folder - only folders have a 'jobs' field
+FOLDER_TREE_QUERY = '?tree=jobs[name,url,jobs[name]]'
+
+# tree query returning only the last completed build number of every job in a folder
+INVENTORY_TREE_QUERY = '?tree=jobs[name,lastCompletedBuild[number]]'
+
+# tree query returning a window of the build history of a job - formatted with the window bounds
+HISTORY_TREE_QUERY = '?tree=allBuilds[number,result,timestamp,url,actions[_class,parameters[name,value],failCount,html]]{{{},{}}}'
+
+# number of builds fetched per request when scanning build history
+HISTORY_WINDOW_SIZE = 25
+
+# tree query returning the results of the latest builds of every job in a folder - formatted with the number of builds
+RESULTS_TREE_QUERY = '?tree=jobs[name,builds[number,result]{{0,{}}}]'
+
+
+def get_job_path(job_name):
+	''' takes in full job name, e.g. folder/subfolder/job
+		returns API path of the job, e.g. job/folder/job/subfolder/job/job
+	'''
+	return '/'.join('job/{}'.format(part) for part in job_name.split('/'))
+
+
+def get_job_folder(job_name):
+	''' takes in full job name, e.g. folder/subfolder/job
+		returns tuple of API path of the folder containing the job and the short job name
+	'''
+	folder, _, short_name = job_name.rpartition('/')
+	return get_job_path(folder) if folder else '', short_name
+
+
+def group_jobs_by_folder(job_names):
+	''' takes in list of full job names
+		returns dict of folder API path to dict of short job names to full job names
+	'''
+	folders = {}
+	for job_name in job_names:
+		folder, short_name = get_job_folder(job_name)
+		folders.setdefault(folder, {})[short_name] = job_name
+	return folders
+
+
+def get_build_days_ago(build_timestamp):
+	''' takes in build timestamp in milliseconds as returned by jenkins API
+		returns number of days since the build
+	'''
+	return (datetime.datetime.now() - datetime.datetime.fromtimestamp(build_timestamp / 1000)).days
+
+
+def get_build_param_value(build_info, param_name):
+	''' takes in build info dict and name of a build parameter
+		returns value of the parameter, raises IndexError if the build does not have it
+	'''
+	build_parameters = []
+	for action in build_info['actions']:
+		if action.get('_class') in PARAMETERS_ACTION_CLASSES:
+			build_parameters = action['parameters']
+			break
+	return [param['value'] for param in build_parameters if param_name == param.get('name', '')][0]
+
+
+def trim_build_info(build_info):
+	''' takes in build info dict from jenkins API
+		returns copy of the dict with only the fields jeeves reports on
+	'''
+	actions = []
+	for action in build_info.get('actions', []):
+		trimmed_action = {key: action[key] for key in ('_class', 'parameters', 'failCount', 'html') if key in action}
+		if trimmed_action:
+			actions.append(trimmed_action)
+	trimmed_build_info = {key: build_info.get(key) for key in ('number', 'result', 'timestamp', 'url')}
+	trimmed_build_info['actions'] = actions
+	return trimmed_build_info
+
+
+def get_build_info(server, job_name, build_number, cache=None):
+	''' takes in jenkins server object, job name and build number
+		optionally takes a JeevesCache object consulted before calling the jenkins API
+		returns trimmed build info dict of the build, completed builds are stored in the cache
+	'''
+	if cache:
+		build_info = cache.get_build(job_name, build_number, 'info')
+		record_cache('builds', int(build_info is not None), int(build_info is None))
+		if build_info is not None:
+			return build_info
+	build_info = trim_build_info(server.get_build_info(job_name, build_number))
+	if cache and build_info['result'] is not None:
+		cache.set_build(job_name, build_number, 'info', build_info)
+	return build_info
+
+
+def get_build_stages(server, job_name, build_number, cache=None):
+	''' takes in jenkins server object, job name and number of a completed build
+		optionally takes a JeevesCache object consulted before calling the jenkins API
+		returns build stages dict of the build, which is stored in the cache
+	'''
+	if cache:
+		build_stages = cache.get_build(job_name, build_number, 'stages')
+		record_cache('builds', int(build_stages is not None), int(build_stages is None))
+		if build_stages is not None:
+			return build_stages
+	build_stages = server.get_build_stages(job_name, build_number)
+
+	# keep only the fields jeeves reports on
+	build_stages = {'stages': [
+		{key: stage[key] for key in ('name', 'status', 'durationMillis') if key in stage}
+		for stage in build_stages.get('stages', [])
+	]}
+	if cache:
+		cache.set_build(job_name, build_number, 'stages', build_stages)
+	return build_stages
+
+
+def get_build_param_value_or_none(build_info, param_name):
+	''' takes in build info dict and name of a build parameter
+		returns value of the parameter or None if the build does not have it
+	'''
+	try:
+		return get_build_param_value(build_info, param_name)
+	except (IndexError, KeyError):
+		return None
+
+
+def find_filtered_build(server, job_name, build_numbers, lcb_num, filter_param_name, filter_param_value, max_lookback=100, cache=None):
+	''' takes in jenkins server object, job name, list of known build numbers ordered newest first,
+		last completed build number and name and value of jenkins param to filter builds by
+		scans at most max_lookback builds starting at lcb_num, fetching HISTORY_WINDOW_SIZE builds per request
+		builds already recorded in the param index of the cache are not fetched again
+		returns build info dict of the newest completed build with the given param value
+		returns None if no such build was found
+	'''
+	numbers = list(build_numbers)
+	position = numbers.index(lcb_num) if lcb_num in numbers else 0
+	known = cache.get_param_values(job_name, filter_param_name) if cache else {}
+	fetched = {}
+	running = set()
+	new_values = {}
+	match = None
+	scanned = 0
+	index_hits = 0
+
+	while scanned < max_lookback:
+
+		# skip builds newer than the last completed build
+		if position < len(numbers) and numbers[position] > lcb_num:
+			position += 1
+			continue
+
+		# fetch a window of build history if the build at this position is not known yet
+		if position >= len(numbers) or (numbers[position] not in known and numbers[position] not in fetched and numbers[position] not in running):
+			window = server.get_info(item=get_job_path(job_name), query=HISTORY_TREE_QUERY.format(position, position + HISTORY_WINDOW_SIZE))
+			builds = window.get('allBuilds', [])
+			if not builds:
+				break
+			numbers[position:position + len(builds)] = [build['number'] for build in builds]
+			for build in builds:
+
+				# running builds have no result yet and may still change - do not record those
+				if build.get('result') is None:
+					running.add(build['number'])
+					continue
+				fetched[build['number']] = build
+				new_values[build['number']] = get_build_param_value_or_none(build, filter_param_name)
+			continue
+
+		number = numbers[position]
+		position += 1
+
+		# skip builds that are still running
+		if number > lcb_num or number in running:
+			continue
+		scanned += 1
+
+		if number in fetched:
+			param_value = new_values[number]
+		else:
+			param_value = known[number]
+			index_hits += 1
+		if param_value == filter_param_value:
+			match = number
+			break
+
+	if cache:
+		record_cache('param_index', index_hits, scanned - index_hits)
+	if cache and new_values:
+		cache.set_param_values(job_name, filter_param_name, new_values)
+
+	if match is None:
+		return None
+	if match in fetched:
+		return fetched[match]
+	return get_build_info(server, job_name, match, cache=cache)
+
+
+def generate_jenkins_api_info(server, job_name, job_url, build_info, cache=None, fetch_stages=True):
+	''' takes in jenkins server object, job name, job url and build info dict of the build to report on
+		optionally takes a JeevesCache object
+		returns dict of API info for the build
+		fetches build stages if the build failed, unless fetch_stages is false - in which case
+		they should be added afterwards with get_jenkins_jobs_stages
+	'''
+	lcb_num = build_info['number']
+	tempest_tests_failed = None
+	stage_failure = 'N/A'
+	stage_durations = None
+
+	build_actions = build_info['actions']
+	for action in build_actions:
+		if action.get('_class') == 'hudson.tasks.junit.TestResultAction':
+			tempest_tests_failed = action['failCount']
+
+	build_time = build_info.get('timestamp')
+	build_days_ago = get_build_days_ago(build_time)
+	lcb_url = build_info['url']
+	lcb_result = build_info['result']
+	composes = [str(action['html']).split('core_puddle:')[1].split('<')[0].strip() for action in build_actions if 'core_puddle' in action.get('html', '')]
+	if lcb_result == 'FAILURE' and fetch_stages:
+		build_stages = get_build_stages(server, job_name, lcb_num, cache=cache)
+		stage_failure = get_stage_failure(build_stages)
+		stage_durations = get_stage_durations(build_stages)
+
+	# No composes could be found; likely a failed job where the 'core_puddle' var was never calculated
+	if composes == []:
+		compose = "Could not find compose"
+		second_compose = None
+	# Two composes found - job is likely Update or Upgrade
+	elif len(composes) == 2:
+		compose = composes[0]
+		second_compose = composes[1]
+	# One compose found
+	else:
+		compose = composes[0]
+		second_compose = None
+
+	jenkins_api_info = {
+		'job_url': job_url,
+		'lcb_num': lcb_num,
+		'lcb_url': lcb_url,
+		'compose': compose,
+		'second_compose': second_compose,
+		'lcb_result': lcb_result,
+		'build_days_ago': build_days_ago,
+		'build_timestamp': build_time,
+		'tempest_tests_failed': tempest_tests_failed,
+		'stage_failure': stage_failure,
+		'stage_durations': stage_durations
+	}
+	return jenkins_api_info
+
+
+def generate_missing_jenkins_api_info(job_url):
+	''' takes in job url of a job with no last completed build
+		returns dict of API info reporting the job as NO_KNOWN_BUILDS
+	'''
+	jenkins_api_info = {
+		'job_url': job_url,
+		'lcb_num': None,
+		'lcb_url': None,
+		'compose': "N/A",
+		'second_compose': None,
+		'lcb_result': "NO_KNOWN_BUILDS",
+		'build_days_ago': "N/A",
+		'build_timestamp': None,
+		'tempest_tests_failed': None,
+		'stage_failure': 'N/A',
+		'stage_durations': None
+	}
+	return jenkins_api_info
+
+
+def get_jenkins_job_info(server, job_name, filter_param_name=None, filter_param_value=None, max_lookback=100, cache=None, fetch_stages=True):
 	''' takes in jenkins server object and job name
 		optionally takes name and value of jenkins param to filter builds by
+		optionally takes maximum number of builds to scan for the filter and a JeevesCache object
+		if fetch_stages is false, stages of a failed build are left to get_jenkins_jobs_stages
 		returns dict of API info for given job if success
 		returns False if failure
 	'''
@@ -40,115 +340,360 @@ def get_jenkins_job_info(server, job_name, filter_param_name=None, filter_param_
 		job_info = server.get_job_info(job_name)
 		job_url = job_info['url']
 		lcb_num = job_info['lastCompletedBuild']['number']
-		tempest_tests_failed = None
-		stage_failure = 'N/A'
-		build_info = server.get_build_info(job_name, lcb_num)
-
-		build_actions = build_info['actions']
-		for action in build_actions:
-			if action.get('_class') in ['com.tikal.jenkins.plugins.multijob.MultiJobParametersAction', 'hudson.model.ParametersAction']:
-				build_parameters = action['parameters']
-			elif action.get('_class') == 'hudson.tasks.junit.TestResultAction':
-				tempest_tests_failed = action['failCount']
+		build_info = get_build_info(server, job_name, lcb_num, cache=cache)
 
 		# if desired, get last completed build with custom parameter and value
 		if filter_param_name is not None and filter_param_value is not None:
-			api_param_value = [param['value'] for param in build_parameters if filter_param_name == param.get('name', '')][0]
-			while api_param_value != filter_param_value:
-				lcb_num = lcb_num - 1
-				build_info = server.get_build_info(job_name, lcb_num)
-				build_actions = build_info['actions']
-				for action in build_actions:
-					if action.get('_class') in ['com.tikal.jenkins.plugins.multijob.MultiJobParametersAction', 'hudson.model.ParametersAction']:
-						build_parameters = action['parameters']
-						break
-				api_param_value = [param['value'] for param in build_parameters if filter_param_name == param.get('name', '')][0]
-
-		build_time = build_info.get('timestamp')
-		build_days_ago = (datetime.datetime.now() - datetime.datetime.fromtimestamp(build_time / 1000)).days
-		lcb_url = build_info['url']
-		lcb_result = build_info['result']
-		composes = [str(action['html']).split('core_puddle:')[1].split('<')[0].strip() for action in build_actions if 'core_puddle' in action.get('html', '')]
-		if lcb_result == 'FAILURE':
-			build_stages = server.get_build_stages(job_name, lcb_num)
-			stage_failure = get_stage_failure(build_stages)
-
-		# No composes could be found; likely a failed job where the 'core_puddle' var was never calculated
-		if composes == []:
-			compose = "Could not find compose"
-			second_compose = None
-		# Two composes found - job is likely Update or Upgrade
-		elif len(composes) == 2:
-			compose = composes[0]
-			second_compose = composes[1]
-		# One compose found
-		else:
-			compose = composes[0]
-			second_compose = None
+			if get_build_param_value(build_info, filter_param_name) != filter_param_value:
+				build_numbers = [build['number'] for build in job_info['builds']]
+				build_info = find_filtered_build(server, job_name, build_numbers, lcb_num, filter_param_name, filter_param_value, max_lookback=max_lookback, cache=cache)
+				if build_info is None:
+					raise Exception("no build with {}={} found in last {} builds".format(filter_param_name, filter_param_value, max_lookback))
+
+		jenkins_api_info = generate_jenkins_api_info(server, job_name, job_url, build_info, cache=cache, fetch_stages=fetch_stages)
 
 	except Exception as e:
 
 		# No "Last Completed Build" found
 		# Checks for len <= 1 as running builds are included in the below query
 		if len(job_info.get('builds')) <= 1:
-			lcb_num = None
-			lcb_url = None
-			compose = "N/A"
-			second_compose = None
-			build_days_ago = "N/A"
-			lcb_result = "NO_KNOWN_BUILDS"
-			stage_failure = 'N/A'
-			tempest_tests_failed = None
+			jenkins_api_info = generate_missing_jenkins_api_info(job_url)
 
 		# Unknown error, skip job
 		else:
 			print("Jenkins API call error on job {}: {} - skipping...".format(job_name, e))
 			return False
 
-	jenkins_api_info = {
-		'job_url': job_url,
-		'lcb_num': lcb_num,
-		'lcb_url': lcb_url,
-		'compose': compose,
-		'second_compose': second_compose,
-		'lcb_result': lcb_result,
-		'build_days_ago': build_days_ago,
-		'tempest_tests_failed': tempest_tests_failed,
-		'stage_failure': stage_failure
-	}
 	return jenkins_api_info
 
 
-def get_jenkins_jobs(server, job_search_fields, supported_versions):
-	''' takes in a Jenkins server object, job_search_fields string, and supported_versions list
-		returns list of jobs with given search field as part of their name
+def get_jenkins_folder_bulk_info(server, folder, folder_jobs, filter_param_name=None, filter_param_value=None, cache=None):
+	''' takes in jenkins server object, folder API path and dict of short job names to full job names
+		optionally takes name and value of jenkins param to filter builds by and a JeevesCache object
+		fetches the last completed build of every job in the folder with a single tree query
+		returns dict of full job name to API info for each job resolved from the query
 	'''
+	bulk_info = {}
+	try:
+		folder_info = server.get_info(item=folder, query=BULK_TREE_QUERY)
+	except Exception as e:
+		print("Jenkins API bulk call error on folder '{}': {} - falling back to per-job calls...".format(folder, e))
+		return bulk_info
 
-	# parse list of search fields
-	fields = job_search_fields.split(',')
-	fields_length = len(fields)
+	for job in folder_info.get('jobs', []):
+		job_name = folder_jobs.get(job.get('name'))
+		if job_name is None:
+			continue
+		try:
+			build_info = job.get('lastCompletedBuild')
+			if build_info is None:
+				bulk_info[job_name] = generate_missing_jenkins_api_info(job['url'])
+				continue
 
-	# remove spacing from strings
-	for i in range(fields_length):
-		fields[i] = fields[i].strip(' ')
+			# builds not matching the filter need a history scan - leave those to per-job calls
+			if filter_param_name is not None and filter_param_value is not None:
+				if get_build_param_value(build_info, filter_param_name) != filter_param_value:
+					continue
 
-	# check for fields that contain valid regex
-	relevant_jobs = []
-	for field in fields:
+			bulk_info[job_name] = generate_jenkins_api_info(server, job_name, job['url'], build_info, cache=cache, fetch_stages=False)
+		except Exception as e:
+			print("Jenkins API bulk data error on job {}: {} - falling back to per-job calls...".format(job_name, e))
+
+	return bulk_info
+
+
+def get_jenkins_jobs_bulk_info(server, job_names, max_workers=1, filter_param_name=None, filter_param_value=None, cache=None):
+	''' takes in jenkins server object and list of job names
+		optionally takes name and value of jenkins param to filter builds by and a JeevesCache object
+		issues one tree query per folder instead of per-job job and build info calls
+		returns dict of job name to API info for each job resolved from the bulk data
+		jobs missing from the dict must be fetched with get_jenkins_job_info
+	'''
+
+	# group jobs by the folder containing them
+	folders = group_jobs_by_folder(job_names)
+
+	def fetch(folder):
+		return get_jenkins_folder_bulk_info(server, folder, folders[folder], filter_param_name=filter_param_name, filter_param_value=filter_param_value, cache=cache)
+
+	bulk_info = {}
+	with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+		for folder_info in executor.map(fetch, folders):
+			bulk_info.update(folder_info)
+	return bulk_info
+
+
+def get_jenkins_jobs_stages(server, job_names, all_jenkins_api_info, max_workers=1, cache=None):
+	''' takes in jenkins server object, list of job names and list of their API info
+		optionally takes number of worker threads and a JeevesCache object
+		fetches build stages of every failed build concurrently and adds the failed stage
+		and per-stage durations to its API info in place
+	'''
+	failed = [
+		(job_name, jenkins_api_info) for job_name, jenkins_api_info in zip(job_names, all_jenkins_api_info)
+		if jenkins_api_info and jenkins_api_info['lcb_result'] == 'FAILURE'
+	]
+
+	def fetch(failed_job):
+		job_name, jenkins_api_info = failed_job
+		try:
+			build_stages = get_build_stages(server, job_name, jenkins_api_info['lcb_num'], cache=cache)
+			jenkins_api_info['stage_failure'] = get_stage_failure(build_stages)
+			jenkins_api_info['stage_durations'] = get_stage_durations(build_stages)
+		except Exception as e:
+			print("Jenkins API call error fetching stages of job {}: {}".format(job_name, e))
+
+	with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+		list(executor.map(fetch, failed))
+
+
+def get_jenkins_jobs_info(server, job_names, max_workers=1, filter_param_name=None, filter_param_value=None, bulk=False, max_lookback=100, cache=None):
+	''' takes in jenkins server object and list of job names
+		optionally takes name and value of jenkins param to filter builds by
+		optionally takes maximum number of builds to scan for the filter and a JeevesCache object
+		if bulk is true, jobs are first resolved with one tree query per folder
+		fetches API info for every remaining job using a bounded pool of worker threads
+		returns list of get_jenkins_job_info results in the same order as job_names
+	'''
+	bulk_info = {}
+	if bulk:
+		bulk_info = get_jenkins_jobs_bulk_info(server, job_names, max_workers=max_workers, filter_param_name=filter_param_name, filter_param_value=filter_param_value, cache=cache)
+
+	def fetch(job_name):
+		if job_name in bulk_info:
+			return bulk_info[job_name]
+		return get_jenkins_job_info(server, job_name, filter_param_name=filter_param_name, filter_param_value=filter_param_value, max_lookback=max_lookback, cache=cache, fetch_stages=False)
+
+	# executor.map yields results in submission order, keeping output deterministic
+	with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+		all_jenkins_api_info = list(executor.map(fetch, job_names))
+
+	# fetch stages of all failed builds as one batch once the main fetch is done
+	get_jenkins_jobs_stages(server, job_names, all_jenkins_api_info, max_workers=max_workers, cache=cache)
+	return all_jenkins_api_info
+
+
+def get_jenkins_jobs_lcb_nums(server, job_names, max_workers=1):
+	''' takes in jenkins server object and list of job names
+		issues one tree query per folder for the last completed build number of every job
+		returns dict of job name to last completed build number, None if the job has no completed build
+		jobs that could not be found are missing from the dict
+	'''
+	folders = group_jobs_by_folder(job_names)
+
+	def fetch(folder):
+		lcb_nums = {}
 		try:
+			folder_info = server.get_info(item=folder, query=INVENTORY_TREE_QUERY)
+		except Exception as e:
+			print("Jenkins API inventory call error on folder '{}': {}".format(folder, e))
+			return lcb_nums
+		for job in folder_info.get('jobs', []):
+			job_name = folders[folder].get(job.get('name'))
+			if job_name is not None:
+				lcb = job.get('lastCompletedBuild')
+				lcb_nums[job_name] = lcb['number'] if lcb else None
+		return lcb_nums
+
+	all_lcb_nums = {}
+	with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+		for lcb_nums in executor.map(fetch, folders):
+			all_lcb_nums.update(lcb_nums)
+	return all_lcb_nums
 
-			# fetch all jobs from server that match the given regex or search
-			all_jobs = server.get_job_info_regex(field)
 
-			# parse out all jobs that do not contain any search field and/or are not a supported version
-			for job in all_jobs:
-				job_name = job['name']
-				if any(supported_version in job_name for supported_version in supported_versions):
-					relevant_jobs.append(job)
+def get_jenkins_jobs_results(server, job_names, num_builds, max_workers=1):
+	''' takes in jenkins server object, list of job names and number of builds
+		issues one tree query per folder for the results of the latest builds of every job
+		returns dict of job name to list of results of its latest completed builds, newest first
+		builds still running are left out, jobs that could not be found are missing from the dict
+	'''
+	folders = group_jobs_by_folder(job_names)
+	query = RESULTS_TREE_QUERY.format(num_builds)
 
+	def fetch(folder):
+		results = {}
+		try:
+			folder_info = server.get_info(item=folder, query=query)
+		except Exception as e:
+			print("Jenkins API build history call error on folder '{}': {}".format(folder, e))
+			return results
+		for job in folder_info.get('jobs', []):
+			job_name = folders[folder].get(job.get('name'))
+			if job_name is not None:
+				results[job_name] = [build['result'] for build in job.get('builds') or [] if build.get('result') is not None]
+		return results
+
+	all_results = {}
+	with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+		for results in executor.map(fetch, folders):
+			all_results.update(results)
+	return all_results
+
+
+def get_jenkins_jobs_info_incremental(server, job_names, cache, max_workers=1, filter_param_name=None, filter_param_value=None, bulk=False, max_lookback=100, trust_states=False):
+	''' takes in jenkins server object, list of job names and a JeevesCache object
+		optionally takes name and value of jenkins param to filter builds by
+		compares the last completed build of every job with the state stored by the previous run
+		only jobs whose last completed build changed are fetched again with get_jenkins_jobs_info
+		if trust_states is true, stored states are kept current by update_jenkins_job_state and used
+		as they are - only jobs without a state are looked up
+		returns list of job API info in the same order as job_names
+	'''
+	job_filter = [filter_param_name, filter_param_value]
+	stored_states = cache.get_job_states(job_names)
+	lookup = job_names
+	if trust_states:
+		lookup = [job_name for job_name in job_names if job_name not in stored_states or stored_states[job_name]['filter'] != job_filter]
+	lcb_nums = get_jenkins_jobs_lcb_nums(server, lookup, max_workers=max_workers)
+
+	# a job is unchanged only if the stored state was built from the same build and the same filter
+	unchanged = {}
+	for job_name in job_names:
+		stored_state = stored_states.get(job_name)
+		if stored_state is None or stored_state['filter'] != job_filter:
+			continue
+		if trust_states or (job_name in lcb_nums and stored_state['lcb_num'] == lcb_nums[job_name]):
+			unchanged[job_name] = stored_state['info']
+	changed = [job_name for job_name in job_names if job_name not in unchanged]
+	print("Incremental run: {} of {} jobs changed since the last run".format(len(changed), len(job_names)))
+	record_cache('job_state', len(unchanged), len(changed))
+
+	changed_info = get_jenkins_jobs_info(
+		server,
+		changed,
+		max_workers=max_workers,
+		filter_param_name=filter_param_name,
+		filter_param_value=filter_param_value,
+		bulk=bulk,
+		max_lookback=max_lookback,
+		cache=cache
+	)
+	new_states = {}
+	for job_name, jenkins_api_info in zip(changed, changed_info):
+		if jenkins_api_info and job_name in lcb_nums:
+			new_states[job_name] = {'lcb_num': lcb_nums[job_name], 'filter': job_filter, 'info': jenkins_api_info}
+	cache.set_job_states(new_states)
+
+	# only the age of unchanged builds needs to be recomputed
+	for jenkins_api_info in unchanged.values():
+		if jenkins_api_info.get('build_timestamp') is not None:
+			jenkins_api_info['build_days_ago'] = get_build_days_ago(jenkins_api_info['build_timestamp'])
+
+	changed_info = dict(zip(changed, changed_info))
+	return [unchanged[job_name] if job_name in unchanged else changed_info[job_name] for job_name in job_names]
+
+
+def update_jenkins_job_state(server, job_name, build_number, cache, filter_param_name=None, filter_param_value=None):
+	''' takes in jenkins server object, job name, number of a build that just completed and a JeevesCache object
+		optionally takes name and value of jenkins param to filter builds by
+		fetches only that build and stores it as the job state used by get_jenkins_jobs_info_incremental
+		a build not matching the filter only moves the stored last completed build number
+		returns True if the stored state was updated
+	'''
+	job_filter = [filter_param_name, filter_param_value]
+	stored_state = cache.get_job_states([job_name]).get(job_name)
+	if stored_state is not None and stored_state['filter'] != job_filter:
+		stored_state = None
+
+	# ignore notifications of builds older than the stored one, e.g. ones delivered out of order
+	if stored_state is not None and (stored_state['lcb_num'] or 0) >= build_number:
+		return False
+
+	build_info = get_build_info(server, job_name, build_number, cache=cache)
+	if build_info['result'] is None:
+		return False
+
+	if filter_param_name is not None and filter_param_value is not None:
+		if get_build_param_value_or_none(build_info, filter_param_name) != filter_param_value:
+			if stored_state is None:
+				return False
+			cache.set_job_states({job_name: dict(stored_state, lcb_num=build_number)})
+			return True
+
+	job_url = build_info['url'].rstrip('/').rsplit('/', 1)[0] + '/'
+	jenkins_api_info = generate_jenkins_api_info(server, job_name, job_url, build_info, cache=cache)
+	cache.set_job_states({job_name: {'lcb_num': build_number, 'filter': job_filter, 'info': jenkins_api_info}})
+	return True
+
+
+def get_jenkins_inventory(server, max_workers=1, folder_depth=0):
+	''' takes in jenkins server object
+		optionally takes number of worker threads and how many levels of folders to descend into
+		fetches the name and url of every job with one tree query per folder, querying folders of each level in parallel
+		returns list of job dicts with full job name as 'name' and 'url'
+	'''
+	inventory = []
+	folders = ['']
+	depth = 0
+	while folders:
+
+		def fetch(folder):
+			try:
+				return folder, server.get_info(item=get_job_path(folder) if folder else '', query=FOLDER_TREE_QUERY).get('jobs', [])
+			except Exception as e:
+				print("Jenkins API inventory call error on folder '{}': {} - skipping...".format(folder, e))
+				return folder, []
+
+		with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+			folder_contents = list(executor.map(fetch, folders))
+
+		folders = []
+		for folder, items in folder_contents:
+			for item in items:
+				full_name = '/'.join((folder, item['name'])) if folder else item['name']
+
+				# only folders have a 'jobs' field - descend into them if allowed
+				if 'jobs' in item:
+					if depth < folder_depth:
+						folders.append(full_name)
+				else:
+					inventory.append({'name': full_name, 'url': item.get('url')})
+		depth += 1
+
+	return inventory
+
+
+def get_jenkins_jobs(server, job_search_fields, supported_versions, max_workers=1, folder_depth=0, cache=None, inventory_ttl=0):
+	''' takes in a Jenkins server object, job_search_fields string, and supported_versions list
+		optionally takes number of worker threads, folder depth, a JeevesCache object and how
+		many seconds a cached inventory may be reused for
+		returns list of jobs with given search field as part of their name
+	'''
+
+	# parse list of search fields and remove spacing from strings
+	fields = [field.strip(' ') for field in job_search_fields.split(',')]
+
+	# compile all fields that contain valid regex - fields may match anywhere in the job name
+	patterns = []
+	for field in fields:
+		try:
+			patterns.append(re.compile(field))
 		except Exception as e:
 			print("Error compiling regex: {} - skipping this search field...".format(e))
 
+	# fetch all jobs from server once, reusing a recent cached inventory if allowed
+	inventory = None
+	if cache and inventory_ttl > 0:
+		inventory = cache.get_inventory(folder_depth, inventory_ttl)
+		record_cache('inventory', int(inventory is not None), int(inventory is None))
+	if inventory is None:
+		inventory = get_jenkins_inventory(server, max_workers=max_workers, folder_depth=folder_depth)
+		if cache and inventory_ttl > 0:
+			cache.set_inventory(folder_depth, inventory)
+
+	# parse out all jobs that do not match any search field and/or are not a supported version
+	# jobs matching several search fields are only included once
+	relevant_jobs = []
+	seen = set()
+	for job in inventory:
+		job_name = job['name']
+		if job_name in seen:
+			continue
+		if any(pattern.search(job_name) for pattern in patterns) and any(supported_version in job_name for supported_version in supported_versions):
+			relevant_jobs.append(job)
+			seen.add(job_name)
+
 	return relevant_jobs
 
 
@@ -0,0 +1,208 @@
+# run instrumentation - phase timings, API calls and cache hit rates
+
+import os
+import json
+import time
+import threading
+
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# upper bounds in seconds of the API request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# metrics of the current run, shared by every thread in the process
+_metrics_lock = threading.Lock()
+_phases = {}
+_requests = {}
+_cache = {}
+_started = time.time()
+
+
+def reset():
+	''' clears all metrics and restarts the run clock
+	'''
+	global _started
+	with _metrics_lock:
+		_phases.clear()
+		_requests.clear()
+		_cache.clear()
+		_started = time.time()
+
+
+@contextmanager
+def phase(name):
+	''' context manager adding the wall time spent inside it to the given phase
+	'''
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		elapsed = time.perf_counter() - start
+		with _metrics_lock:
+			_phases[name] = _phases.get(name, 0) + elapsed
+
+
+def get_endpoint(service, url):
+	''' takes in service name and URL of a request
+		returns endpoint name with job names and build numbers replaced, e.g. 'jenkins /job/*/{number}/api/json'
+		tree queries are kept apart from plain requests to the same path
+	'''
+	parsed = urlparse(url)
+	parts = parsed.path.rstrip('/').split('/')
+	for i, part in enumerate(parts):
+		if i > 0 and parts[i - 1] == 'job':
+			parts[i] = '*'
+		elif part.isdigit():
+			parts[i] = '{number}'
+	endpoint = '{} {}'.format(service, '/'.join(parts) or '/')
+	if 'tree=' in parsed.query:
+		endpoint += '?tree'
+	return endpoint
+
+
+def record_request(endpoint, seconds, num_bytes=None, error=False):
+	''' records an API request to the given endpoint that took the given number of seconds
+		num_bytes is the size of the response body, if known
+	'''
+	with _metrics_lock:
+		stats = _requests.setdefault(endpoint, {
+			'count': 0,
+			'errors': 0,
+			'bytes': 0,
+			'seconds': 0.0,
+			'buckets': [0] * len(LATENCY_BUCKETS)
+		})
+		stats['count'] += 1
+		stats['seconds'] += seconds
+		if error:
+			stats['errors'] += 1
+		if num_bytes:
+			stats['bytes'] += num_bytes
+		for i, bound in enumerate(LATENCY_BUCKETS):
+			if seconds <= bound:
+				stats['buckets'][i] += 1
+
+
+@contextmanager
+def timed_request(endpoint):
+	''' context manager recording an API request to the given endpoint, or an error if it raises
+		for clients whose response sizes are not available
+	'''
+	start = time.perf_counter()
+	try:
+		yield
+	except Exception:
+		record_request(endpoint, time.perf_counter() - start, error=True)
+		raise
+	record_request(endpoint, time.perf_counter() - start)
+
+
+def record_cache(name, hits, misses=0):
+	''' records number of lookups of the given cache that were served from it and that were not
+	'''
+	with _metrics_lock:
+		stats = _cache.setdefault(name, {'hits': 0, 'misses': 0})
+		stats['hits'] += hits
+		stats['misses'] += misses
+
+
+def get_metrics(mode):
+	''' returns dict of all metrics of the current run in the given mode
+	'''
+	with _metrics_lock:
+		return {
+			'mode': mode,
+			'started': _started,
+			'run_seconds': round(time.time() - _started, 3),
+			'phases': {name: round(seconds, 3) for name, seconds in _phases.items()},
+			'requests': {endpoint: dict(stats, buckets=list(stats['buckets'])) for endpoint, stats in sorted(_requests.items())},
+			'cache': {
+				name: dict(stats, hit_rate=round(stats['hits'] / (stats['hits'] + stats['misses']), 3) if stats['hits'] + stats['misses'] else None)
+				for name, stats in sorted(_cache.items())
+			}
+		}
+
+
+def escape_label(value):
+	''' returns value escaped for use as a prometheus label value
+	'''
+	return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_prometheus(metrics):
+	''' takes in dict returned by get_metrics
+		returns the metrics in the prometheus text exposition format
+	'''
+	mode = escape_label(metrics['mode'])
+	lines = [
+		'# HELP jeeves_run_seconds Wall time of the last run.',
+		'# TYPE jeeves_run_seconds gauge',
+		'jeeves_run_seconds{{mode="{}"}} {}'.format(mode, metrics['run_seconds']),
+		'# HELP jeeves_run_timestamp_seconds Start time of the last run.',
+		'# TYPE jeeves_run_timestamp_seconds gauge',
+		'jeeves_run_timestamp_seconds{{mode="{}"}} {}'.format(mode, round(metrics['started'], 3)),
+		'# HELP jeeves_phase_seconds Wall time spent in each phase of the last run.',
+		'# TYPE jeeves_phase_seconds gauge'
+	]
+	for name, seconds in metrics['phases'].items():
+		lines.append('jeeves_phase_seconds{{mode="{}",phase="{}"}} {}'.format(mode, escape_label(name), seconds))
+
+	lines.append('# HELP jeeves_api_request_duration_seconds Latency of API requests made in the last run.')
+	lines.append('# TYPE jeeves_api_request_duration_seconds histogram')
+	for endpoint, stats in metrics['requests'].items():
+		labels = 'mode="{}",endpoint="{}"'.format(mode, escape_label(endpoint))
+		for bound, count in zip(LATENCY_BUCKETS, stats['buckets']):
+			lines.append('jeeves_api_request_duration_seconds_bucket{{{},le="{}"}} {}'.format(labels, bound, count))
+		lines.append('jeeves_api_request_duration_seconds_bucket{{{},le="+Inf"}} {}'.format(labels, stats['count']))
+		lines.append('jeeves_api_request_duration_seconds_sum{{{}}} {}'.format(labels, round(stats['seconds'], 6)))
+		lines.append('jeeves_api_request_duration_seconds_count{{{}}} {}'.format(labels, stats['count']))
+	for name, key, help_text in [('jeeves_api_request_errors', 'errors', 'Failed API requests'), ('jeeves_api_response_bytes', 'bytes', 'Size of API response bodies')]:
+		lines.append('# HELP {} {} in the last run.'.format(name, help_text))
+		lines.append('# TYPE {} gauge'.format(name))
+		for endpoint, stats in metrics['requests'].items():
+			lines.append('{}{{mode="{}",endpoint="{}"}} {}'.format(name, mode, escape_label(endpoint), stats[key]))
+
+	for name, key, help_text in [('jeeves_cache_hits', 'hits', 'Lookups served from the cache'), ('jeeves_cache_misses', 'misses', 'Lookups not served from the cache')]:
+		lines.append('# HELP {} {} in the last run.'.format(name, help_text))
+		lines.append('# TYPE {} gauge'.format(name))
+		for cache_name, stats in metrics['cache'].items():
+			lines.append('{}{{mode="{}",cache="{}"}} {}'.format(name, mode, escape_label(cache_name), stats[key]))
+	return '\n'.join(lines) + '\n'
+
+
+def write_file(filename, content):
+	''' writes content to a temporary file first so readers never see a partially written file
+	'''
+	temp_filename = filename + '.tmp'
+	with open(temp_filename, 'w') as file:
+		file.write(content)
+	os.replace(temp_filename, filename)
+
+
+def write_metrics(metrics_dir, mode):
+	''' writes metrics of the current run to jeeves_<mode>.json and to jeeves_<mode>.prom
+		for the prometheus node exporter textfile collector in metrics_dir
+		returns tuple of both filenames
+	'''
+	os.makedirs(metrics_dir, exist_ok=True)
+	metrics = get_metrics(mode)
+	json_filename = os.path.join(metrics_dir, 'jeeves_{}.json'.format(mode))
+	prom_filename = os.path.join(metrics_dir, 'jeeves_{}.prom'.format(mode))
+	write_file(json_filename, json.dumps(metrics, indent=2))
+	write_file(prom_filename, format_prometheus(metrics))
+	return json_filename, prom_filename
+
+
+def save_metrics(config, mode):
+	''' writes metrics of the current run to the configured metrics_dir, unless it is set to null
+		logs instead of raising on failure so monitoring never breaks a run
+	'''
+	metrics_dir = config.get('metrics_dir', 'metrics')
+	if not metrics_dir:
+		return
+	try:
+		json_filename, prom_filename = write_metrics(metrics_dir, mode)
+		print('Metrics saved as {} and {}'.format(json_filename, prom_filename))
+	except Exception as e:
+		print('Error saving metrics: {}'.format(e))
@@ -1,26 +1,20 @@
-import jinja2
+from concurrent.futures import ThreadPoolExecutor
 
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from smtplib import SMTP
+from jeeves.common import generate_html_file, open_smtp_session
+from jeeves.metrics import phase
+from jeeves.render import get_template_environment
+from jeeves.jobs import get_jenkins_jobs_info, get_osp_version
+from jeeves.rows import build_row
+from jeeves.blockers import get_bugs_dict, get_tickets_dict, get_owner_jobs
 
-from jeeves.common import generate_html_file
-from jeeves.jobs import get_jenkins_job_info, get_osp_version, generate_failure_stage_log_urls
-from jeeves.blockers import get_bugs_dict, get_tickets_dict, get_other_blockers
 
+def run_remind(config, blockers, server, header, cache=None):
 
-def run_remind(config, blockers, server, header):
-
-	# get list of all owners in blocker file
-	owner_list = []
-	for job in blockers:
-		owners = blockers[job].get('owners', False)
-		if not owners:
-			continue
-		owner_list.extend(owners)
+	# build index of owner to owned jobs from blocker file
+	owner_jobs = get_owner_jobs(blockers)
 
 	# exit if no owners are found for any jobs in blockers file
-	if owner_list == []:
+	if owner_jobs == {}:
 		print("No owners found in blocker file")
 		return None
 
@@ -28,110 +22,89 @@ def run_remind(config, blockers, server, header):
 	fpn = config.get('filter_param_name', None)
 	fpv = config.get('filter_param_value', None)
 
-	# find each job with no blockers including the owner and send email with agg'd list
-	owner_set = set(owner_list)
-	for owner in owner_set:
-		rows = []
-		for job_name in blockers:
-			owners = blockers[job_name].get('owners', [])
-			osp_version = get_osp_version(job_name)
-
-			# skip if current owner is not owner of this job
-			if owner not in owners:
-				continue
-
-			# get job info from jenkins API - will return False if an unmanageable error occured
-			jenkins_api_info = get_jenkins_job_info(server, job_name, filter_param_name=fpn, filter_param_value=fpv)
-
-			# if jeeves was unable to collect any good jenkins API info, skip job
-			if jenkins_api_info:
-
-				# only care about jobs without SUCCESS status
-				if jenkins_api_info['lcb_result'] != "SUCCESS":
-
-					# get all related bugs to job
-					try:
-						bug_ids = blockers[job_name]['bz']
-						if 0 in bug_ids:
-							bug_ids.remove(0)
-						bugs_dict = get_bugs_dict(bug_ids, config)
-						bugs = list(map(bugs_dict.get, bug_ids))
-					except Exception as e:
-						print("Error fetching bugs for job {}: {}".format(job_name, e))
-						bugs = []
-
-					# get all related tickets to job
-					try:
-						ticket_ids = blockers[job_name]['jira']
-						if 0 in ticket_ids:
-							ticket_ids.remove(0)
-						tickets_dict = get_tickets_dict(ticket_ids, config)
-						tickets = list(map(tickets_dict.get, ticket_ids))
-					except Exception as e:
-						print("Error fetching ticket for job {}: {}".format(job_name, e))
-						tickets = []
-
-					# get any "other" artifact for job
-					try:
-						other = get_other_blockers(blockers, job_name)
-					except Exception as e:
-						print("Error fetching other blockers for job {}: {}".format(job_name, e))
-						other = []
-
-					# check if row contains any valid blockers for reporting
-					blocker_bool = True
-					if (len(bugs) == 0) and (len(tickets) == 0) and (len(other) == 0):
-						blocker_bool = False
-
-					stage_urls = []
-					if jenkins_api_info['stage_failure'] != 'N/A':
-						stage_urls = generate_failure_stage_log_urls(
-							config,
-							jenkins_api_info['stage_failure'],
-							jenkins_api_info['job_url'],
-							jenkins_api_info['lcb_num']
-						)
-
-					# build row
-					row = {
-						'osp_version': osp_version,
-						'job_name': job_name,
-						'build_days_ago': jenkins_api_info['build_days_ago'],
-						'job_url': jenkins_api_info['job_url'],
-						'lcb_num': jenkins_api_info['lcb_num'],
-						'lcb_url': jenkins_api_info['lcb_url'],
-						'compose': jenkins_api_info['compose'],
-						'second_compose': jenkins_api_info['second_compose'],
-						'lcb_result': jenkins_api_info['lcb_result'],
-						'blocker_bool': blocker_bool,
-						'bugs': bugs,
-						'tickets': tickets,
-						'other': other,
-						'tempest_tests_failed': jenkins_api_info['tempest_tests_failed'],
-						'tempest_tests_url': jenkins_api_info['job_url'] + str(jenkins_api_info['lcb_num']) + '/testReport',
-						'stage_name': jenkins_api_info['stage_failure'],
-						'stage_urls': stage_urls
-					}
-
-					# append row to rows
-					rows.append(row)
-
-		# if no rows were generated, owner has all passing jobs
+	# fetch job info from jenkins API once for every owned job, regardless of how many owners it has
+	owned_jobs = [job_name for job_name in blockers if blockers[job_name].get('owners', False)]
+	with phase('jenkins_fetch'):
+		all_jenkins_api_info = get_jenkins_jobs_info(
+			server,
+			owned_jobs,
+			max_workers=config.get('max_workers', 8),
+			filter_param_name=fpn,
+			filter_param_value=fpv,
+			bulk=config.get('bulk_fetch', False),
+			max_lookback=config.get('filter_max_lookback', 100),
+			cache=cache
+		)
+
+	# only care about jobs without SUCCESS status - if jeeves was unable to collect any good jenkins API info, skip job
+	failing_jobs = {}
+	for job_name, jenkins_api_info in zip(owned_jobs, all_jenkins_api_info):
+		if jenkins_api_info and jenkins_api_info['lcb_result'] != "SUCCESS":
+			failing_jobs[job_name] = jenkins_api_info
+
+	# fetch all bugs and tickets referenced by failing jobs in one batch each
+	bug_ids = set()
+	ticket_ids = set()
+	for job_name in failing_jobs:
+		bug_ids.update(blockers[job_name].get('bz') or [])
+		ticket_ids.update(blockers[job_name].get('jira') or [])
+	bug_ids.discard(0)
+	ticket_ids.discard(0)
+	with phase('tracker_fetch'):
+		all_bugs_dict = get_bugs_dict(bug_ids, config, cache=cache)
+		all_tickets_dict = get_tickets_dict(ticket_ids, config, cache=cache)
+
+	# build row for each failing job once
+	job_rows = {}
+	for job_name, jenkins_api_info in failing_jobs.items():
+		job_rows[job_name] = build_row(config, blockers, job_name, get_osp_version(job_name), jenkins_api_info, all_bugs_dict, all_tickets_dict, remind=True)
+
+	# load template once for all owners from shared environment
+	env = get_template_environment(config.get('cache_dir', '.jeeves_cache') if cache is not None else None)
+	template = env.get_template('remind_template.html')
+
+	# collect each owner's failing jobs - if no rows were generated, owner has all passing jobs
+	owner_rows = []
+	for owner in sorted(owner_jobs):
+		rows = [job_rows[job_name] for job_name in owner_jobs[owner] if job_name in job_rows]
 		if rows != []:
 
 			# sort rows by descending OSP version
-			rows = sorted(rows, key=lambda row: row['osp_version'], reverse=True)
+			rows.sort(key=lambda row: row.osp_version, reverse=True)
+			owner_rows.append((owner, rows))
+		else:
+			print("Owner {} has all passing jobs!".format(owner))
+
+	# generate HTML reminders for all owners in parallel
+	def render(owner_row):
+		owner, rows = owner_row
+		return owner, ''.join(template.generate(
+			header=header,
+			rows=rows
+		))
+
+	with phase('render'):
+		with ThreadPoolExecutor(max_workers=max(1, config.get('max_workers', 8))) as executor:
+			reminders = list(executor.map(render, owner_rows))
+
+	if reminders == []:
+		return None
 
-			# initialize jinja2 vars
-			loader = jinja2.FileSystemLoader('./templates')
-			env = jinja2.Environment(loader=loader)
-			template = env.get_template('remind_template.html')
+	# mail modules are only needed when there is something to send
+	from email.mime.multipart import MIMEMultipart
+	from email.mime.text import MIMEText
+	from smtplib import SMTPServerDisconnected
 
-			# generate HTML report
-			htmlcode = template.render(
-				header=header,
-				rows=rows
-			)
+	with phase('email'):
+		# create a single SMTP session shared by all reminders
+		try:
+			smtp = open_smtp_session(config)
+		except Exception as e:
+			print("Error creating SMTP session: {}".format(e))
+			smtp = None
+
+		# send reminders - failure to send one only affects that reminder, for which an HTML file will be generated
+		for owner, htmlcode in reminders:
 
 			# construct email
 			msg = MIMEMultipart()
@@ -140,28 +113,30 @@ def run_remind(config, blockers, server, header):
 			msg['To'] = owner
 			msg.attach(MIMEText(htmlcode, 'html'))
 
-			# create SMTP session - if jeeves is unable to do so an HTML file will be generated
 			try:
-				with SMTP(config['smtp_host']) as smtp:
-
-					# start TLS for security
-					smtp.starttls()
+				if smtp is None:
+					raise Exception("No SMTP session available")
 
-					# use ehlo or helo if needed
-					smtp.ehlo_or_helo_if_needed()
-
-					# send email to all addresses
+				# reconnect once if the server dropped the session
+				try:
+					response = smtp.sendmail(msg['From'], msg['To'], msg.as_string())
+				except SMTPServerDisconnected:
+					smtp = open_smtp_session(config)
 					response = smtp.sendmail(msg['From'], msg['To'], msg.as_string())
 
-					# log success if all recipients recieved reminder, otherwise raise exception
-					if response == {}:
-						print("Reminder for {} successfully accepted by mail server for delivery".format(owner))
-					else:
-						raise Exception("Mail server cannot deliver reminder to following recipients: {}".format(response))
+				# log success if all recipients recieved reminder, otherwise raise exception
+				if response == {}:
+					print("Reminder for {} successfully accepted by mail server for delivery".format(owner))
+				else:
+					raise Exception("Mail server cannot deliver reminder to following recipients: {}".format(response))
 
 			except Exception as e:
-				print("Error sending email reminder: {}\nHTML file generated".format(e))
-				generate_html_file(htmlcode, remind=True)
+				filename = generate_html_file(htmlcode, remind=True, suffix=owner)
+				print("Error sending email reminder: {}\nHTML file generated as {}".format(e, filename))
 
-		else:
-			print("Owner {} has all passing jobs!".format(owner))
+		# close SMTP session
+		if smtp is not None:
+			try:
+				smtp.quit()
+			except Exception:
+				smtp.close()
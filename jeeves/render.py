@@ -0,0 +1,28 @@
+# shared template rendering for reports and reminders
+
+import os
+import threading
+
+# environment shared by every render in the process - created on first use
+_environment = None
+_environment_lock = threading.Lock()
+
+
+def get_template_environment(cache_dir=None):
+	''' returns the jinja2 environment for the templates directory, creating it on first call
+		if cache_dir is given, compiled templates are kept in a bytecode cache inside it
+		so later runs skip parsing and compiling the templates
+	'''
+	global _environment
+	with _environment_lock:
+		if _environment is None:
+			import jinja2
+
+			bytecode_cache = None
+			if cache_dir:
+				bytecode_cache_dir = os.path.join(cache_dir, 'templates')
+				os.makedirs(bytecode_cache_dir, exist_ok=True)
+				bytecode_cache = jinja2.FileSystemBytecodeCache(bytecode_cache_dir)
+			loader = jinja2.FileSystemLoader('./templates')
+			_environment = jinja2.Environment(loader=loader, bytecode_cache=bytecode_cache)
+		return _environment
@@ -1,23 +1,65 @@
+import os
 import sys
 import json
-import jinja2
 
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from smtplib import SMTP
 from urllib.parse import quote
 
-from jeeves.common import generate_html_file, generate_summary, percent
-from jeeves.jobs import get_jenkins_job_info, get_jenkins_jobs, get_osp_version, generate_failure_stage_log_urls
-from jeeves.blockers import get_bugs_dict, get_bugs_set, get_tickets_dict, get_tickets_set, get_other_blockers, has_blockers
+from jeeves.common import generate_email, generate_html_file, open_smtp_session, percent
+from jeeves.aggregate import GROUP_KEYS, aggregate_rows, get_breakdown, summarize
+from jeeves.chart import generate_doughnut_svg, get_chart_segments
+from jeeves.metrics import phase
+from jeeves.render import get_template_environment
+from jeeves.snapshot import write_snapshot
+from jeeves.jobs import get_jenkins_jobs_info, get_jenkins_jobs_info_incremental, get_jenkins_jobs, get_jenkins_jobs_results, get_osp_version
+from jeeves.rows import build_row
+from jeeves.shard import in_shard, read_partials, write_partial
+from jeeves.trends import get_jobs_trends, get_top_flaky
+from jeeves.blockers import get_bugs_dict, get_bugs_set, get_tickets_dict, get_tickets_set
+
+
+def get_fetch_options(config):
+	''' returns dict of config options for get_jenkins_jobs_info and get_jenkins_jobs_info_incremental
+	'''
+	return {
+		'max_workers': config.get('max_workers', 8),
+		'filter_param_name': config.get('filter_param_name', None),
+		'filter_param_value': config.get('filter_param_value', None),
+		'bulk': config.get('bulk_fetch', False),
+		'max_lookback': config.get('filter_max_lookback', 100)
+	}
+
+
+def get_group_by(config):
+	''' returns list of the valid summary_group_by keys from config, skipping unknown ones
+	'''
+	group_by = []
+	for key in config.get('summary_group_by') or []:
+		if key not in GROUP_KEYS:
+			print("Unknown summary_group_by key {}, choose from {}. Skipping...".format(key, ', '.join(GROUP_KEYS)))
+		elif key != 'osp_version' and key not in group_by:
+			group_by.append(key)
+	return group_by
 
 
-def run_report(config, blockers, preamble_file, template_file, no_email, test_email, server, header):
+def get_report_rows(config, blockers, server, cache=None, incremental=False, trust_job_states=False, shard=None):
+	''' fetches all relevant jobs with their jenkins API info, blocker bugs and tickets
+		returns list of JobRow sorted by descending OSP version, None if no jobs were found
+		if shard is given as tuple of (index, count), only the jobs of that shard are fetched
+	'''
 
 	# get supported versions from config or use default one
 	supported_versions = list(map(str, config.get('supported_versions', ['13', '16.1', '16.2'])))
 	# fetch all relevant jobs
-	jobs = get_jenkins_jobs(server, config['job_search_fields'], supported_versions)
+	with phase('inventory'):
+		jobs = get_jenkins_jobs(
+			server,
+			config['job_search_fields'],
+			supported_versions,
+			max_workers=config.get('max_workers', 8),
+			folder_depth=config.get('folder_depth', 0),
+			cache=cache,
+			inventory_ttl=config.get('inventory_cache_ttl', 0)
+		)
 
 	# log and exit if no jobs found - no reason to send empty report
 	num_jobs_fetched = len(jobs)
@@ -25,275 +67,266 @@ def run_report(config, blockers, preamble_file, template_file, no_email, test_em
 		print("No jobs found with given search field. Exiting...")
 		return None
 
-	# Get set from the list of all bugs in all jobs
-	all_bugs_set = get_bugs_set(blockers) if blockers else {}
-
-	# Create dictionary the set of all bugs with bug id as key and name and link as value
-	all_bugs_dict = get_bugs_dict(all_bugs_set, config)
-
-	# Get set from the list of all jira-tickets in all jobs
-	all_tickets_set = get_tickets_set(blockers) if blockers else {}
-
-	# Create dictionary from the set of all jira tickets with ticket id as key and name and link as value
-	all_tickets_dict = get_tickets_dict(all_tickets_set, config)
-
-	# fetch optional config options, return None if not present
-	fpn = config.get('filter_param_name', None)
-	fpv = config.get('filter_param_value', None)
-
-	# iterate through all relevant jobs and build report rows
-	num_success = 0
-	num_unstable = 0
-	num_failure = 0
-	num_missing = 0
-	num_aborted = 0
-	num_error = 0
-	num_covered = 0
-	rows = []
-	all_bugs = []
-	all_tickets = []
-	stats_per_version = {}
+	# skip jobs without an OSP version before fetching anything from jenkins
+	versioned_jobs = []
 	for job in jobs:
-
-		# get name and osp version from job object
 		job_name = job['name']
 		osp_version = get_osp_version(job_name)
-
-		# skip if no OSP version could be found
 		if osp_version is None:
 			print('No OSP version could be found in job {}. Skipping...'.format(job_name))
 			continue
+		versioned_jobs.append((job_name, osp_version))
+
+	# keep only the jobs of the given shard - blockers are fetched for these jobs only
+	if shard is not None:
+		versioned_jobs = [(job_name, osp_version) for job_name, osp_version in versioned_jobs if in_shard(job_name, shard)]
+		print('Shard {}/{} has {} jobs'.format(shard[0], shard[1], len(versioned_jobs)))
+		if blockers:
+			blockers = {job_name: blockers[job_name] for job_name, osp_version in versioned_jobs if job_name in blockers}
+
+	# fetch all blocker bugs and tickets
+	with phase('tracker_fetch'):
+
+		# Get set from the list of all bugs in all jobs
+		all_bugs_set = get_bugs_set(blockers) if blockers else {}
+
+		# Create dictionary the set of all bugs with bug id as key and name and link as value
+		all_bugs_dict = get_bugs_dict(all_bugs_set, config, cache=cache)
+
+		# Get set from the list of all jira-tickets in all jobs
+		all_tickets_set = get_tickets_set(blockers) if blockers else {}
+
+		# Create dictionary from the set of all jira tickets with ticket id as key and name and link as value
+		all_tickets_dict = get_tickets_dict(all_tickets_set, config, cache=cache)
+
+	# fetch job info from jenkins API for all jobs concurrently - results keep the order of versioned_jobs
+	# in incremental mode only jobs with a new last completed build since the previous run are fetched
+	fetch_options = get_fetch_options(config)
+	with phase('jenkins_fetch'):
+		job_names = [job_name for job_name, osp_version in versioned_jobs]
+		if incremental and cache is not None:
+			all_jenkins_api_info = get_jenkins_jobs_info_incremental(server, job_names, cache, trust_states=trust_job_states, **fetch_options)
+		else:
+			if incremental:
+				print("Incremental mode requires the cache - fetching all jobs...")
+			all_jenkins_api_info = get_jenkins_jobs_info(server, job_names, cache=cache, **fetch_options)
+
+		# fetch results of the last builds of all jobs with one query per folder if a history window is configured
+		history_window = config.get('history_window', 0)
+		all_trends = {}
+		if history_window:
+			all_results = get_jenkins_jobs_results(server, job_names, history_window, max_workers=fetch_options['max_workers'])
+			all_trends = get_jobs_trends(all_results)
 
-		if osp_version not in stats_per_version:
-			stats_per_version[osp_version] = {
-				'num_jobs': 0,
-				'num_success': 0,
-				'num_unstable': 0,
-				'num_failure': 0,
-				'num_missing': 0,
-				'num_aborted': 0,
-				'num_error': 0
-			}
-
-		# get job info from jenkins API - will return False if an unmanageable error occured
-		jenkins_api_info = get_jenkins_job_info(server, job_name, filter_param_name=fpn, filter_param_value=fpv)
-
-		# if jeeves was unable to collect any good jenkins api info, skip job
-		if jenkins_api_info:
-			stats_per_version[osp_version]['num_jobs'] += 1
-
-			# take action based on last completed build result
-			if jenkins_api_info['lcb_result'] == "SUCCESS":
-				num_success += 1
-				stats_per_version[osp_version]['num_success'] += 1
-				bugs = []
-				tickets = []
-				other = []
-
-			elif jenkins_api_info['lcb_result'] in ["UNSTABLE", "FAILURE", "ABORTED", "NO_KNOWN_BUILDS"]:
-				if jenkins_api_info['lcb_result'] == "UNSTABLE":
-					num_unstable += 1
-					stats_per_version[osp_version]['num_unstable'] += 1
-				elif jenkins_api_info['lcb_result'] == "FAILURE":
-					num_failure += 1
-					stats_per_version[osp_version]['num_failure'] += 1
-				elif jenkins_api_info['lcb_result'] == "ABORTED":
-					num_aborted += 1
-					stats_per_version[osp_version]['num_aborted'] += 1
-				else:
-					num_missing += 1
-					stats_per_version[osp_version]['num_missing'] += 1
-
-				# get all related bugs to job
-				try:
-					bug_ids = blockers[job_name]['bz']
-					if 0 in bug_ids:
-						bug_ids.remove(0)
-					all_bugs.extend(bug_ids)
-					bugs = list(map(all_bugs_dict.get, bug_ids))
-				except Exception as e:
-					print("Error fetching bugs for job {}: {}".format(job_name, e))
-					bugs = []
-
-				# get all related tickets to job
-				try:
-					ticket_ids = blockers[job_name]['jira']
-					if 0 in ticket_ids:
-						ticket_ids.remove(0)
-					all_tickets.extend(ticket_ids)
-					tickets = list(map(all_tickets_dict.get, ticket_ids))
-				except Exception as e:
-					print("Error fetching tickets for job {}: {}".format(job_name, e))
-					tickets = []
-
-				# get any "other" artifact for job
-				try:
-					other = get_other_blockers(blockers, job_name)
-				except Exception as e:
-					print("Error fetching other blockers for job {}: {}".format(job_name, e))
-					other = []
-
-				# check if job is covered by any of jira/bz/other
-				if has_blockers(blockers, job_name):
-					num_covered += 1
-			else:
-				print("job {} had lcb_result {}: reporting as error job".format(job_name, jenkins_api_info['lcb_result']))
-				jenkins_api_info['lcb_result'] = "ERROR"
-				num_error += 1
-				stats_per_version[osp_version]['num_error'] += 1
-				bugs = []
-				tickets = []
-				other = []
-
-			# check if row contains any valid blockers for reporting
-			blocker_bool = True
-			if (len(bugs) == 0) and (len(tickets) == 0) and (len(other) == 0):
-				blocker_bool = False
-
-			stage_urls = []
-			if jenkins_api_info['stage_failure'] != 'N/A':
-				stage_urls = generate_failure_stage_log_urls(
-					config,
-					jenkins_api_info['stage_failure'],
-					jenkins_api_info['job_url'],
-					jenkins_api_info['lcb_num']
-				)
-
-			# build row
-			row = {
-				'osp_version': osp_version,
-				'job_name': job_name,
-				'build_days_ago': jenkins_api_info['build_days_ago'],
-				'job_url': jenkins_api_info['job_url'],
-				'lcb_num': jenkins_api_info['lcb_num'],
-				'lcb_url': jenkins_api_info['lcb_url'],
-				'compose': jenkins_api_info['compose'],
-				'second_compose': jenkins_api_info['second_compose'],
-				'lcb_result': jenkins_api_info['lcb_result'],
-				'blocker_bool': blocker_bool,
-				'bugs': bugs,
-				'tickets': tickets,
-				'other': other,
-				'tempest_tests_failed': jenkins_api_info['tempest_tests_failed'],
-				'tempest_tests_url': jenkins_api_info['job_url'] + str(jenkins_api_info['lcb_num']) + '/testReport',
-				'stage_name': jenkins_api_info['stage_failure'],
-				'stage_urls': stage_urls
-			}
-
-			# append row to rows
-			rows.append(row)
+	# iterate through all relevant jobs and build report rows
+	# if jeeves was unable to collect any good jenkins api info, skip job
+	rows = [
+		build_row(config, blockers, job_name, osp_version, jenkins_api_info, all_bugs_dict, all_tickets_dict, all_trends.get(job_name))
+		for (job_name, osp_version), jenkins_api_info in zip(versioned_jobs, all_jenkins_api_info)
+		if jenkins_api_info
+	]
 
 	# sort rows by descending OSP version
-	rows = sorted(rows, key=lambda row: row['osp_version'], reverse=True)
+	rows.sort(key=lambda row: row.osp_version, reverse=True)
+	return rows
 
-	# log and exit if no rows built - otherwise program will crash on summary generation
+
+def generate_report_summary(config, rows, blockers):
+	''' takes in config, non-empty list of JobRow and blockers object
+		returns tuple of summary with blocker, trend and chart metrics and summary per version
+	'''
 	num_jobs = len(rows)
-	if num_jobs == 0:
-		print("No rows could be built with data for any of the jobs found with given search field. Exiting...")
-		return None
+	history_window = config.get('history_window', 0)
 
-	# initialize job summary
-	summary = generate_summary(
-		num_success,
-		num_unstable,
-		num_failure,
-		num_aborted,
-		num_missing,
-		num_error,
-		num_jobs
-	)
+	# count jobs by result overall, per version and per configured group-by key in one pass
+	group_by = get_group_by(config)
+	totals, groups = aggregate_rows(rows, ['osp_version'] + group_by, blockers)
+	stats_per_version = groups['osp_version']
 
-	# initialize job summary per version
-	summary_per_version = {}
-	for version, stats in stats_per_version.items():
-		summary_per_version[version] = generate_summary(
-			stats['num_success'],
-			stats['num_unstable'],
-			stats['num_failure'],
-			stats['num_aborted'],
-			stats['num_missing'],
-			stats['num_error'],
-			stats['num_jobs']
-		)
+	# initialize job summary and job summary per version
+	summary = summarize(totals)
+	summary_per_version = {version: summarize(stats) for version, stats in stats_per_version.items()}
 
 	# generate metrics and append to overall summary
 	# bug metrics
-	all_bugs = [bug_id for bug_id in all_bugs if bug_id != 0]
-	if len(all_bugs) == 0:
+	if totals['num_bugs'] == 0:
 		summary['total_bugs'] = "Blocker Bugs: 0 total"
 	else:
-		unique_bugs = set(all_bugs)
-		summary['total_bugs'] = "Blocker Bugs: {} total, {} unique".format(len(all_bugs), len(unique_bugs))
+		summary['total_bugs'] = "Blocker Bugs: {} total, {} unique".format(totals['num_bugs'], len(totals['bug_ids']))
 
 	# ticket metrics
-	all_tickets = [ticket_id for ticket_id in all_tickets if ticket_id != 0]
-	if len(all_tickets) == 0:
+	if totals['num_tickets'] == 0:
 		summary['total_tickets'] = "Blocker Tickets: 0 total"
 	else:
-		unique_tickets = set(all_tickets)
-		summary['total_tickets'] = "Blocker Tickets: {} total, {} unique".format(len(all_tickets), len(unique_tickets))
+		summary['total_tickets'] = "Blocker Tickets: {} total, {} unique".format(totals['num_tickets'], len(totals['ticket_ids']))
 
 	# blocker metrics
-	summary['total_coverage'] = "Total Blocker Coverage:  {}/{} = {}%".format(num_covered, num_jobs - num_success, percent(num_covered, num_jobs - num_success))
+	num_covered = totals['num_covered']
+	num_failing = num_jobs - totals['num_success']
+	summary['total_coverage'] = "Total Blocker Coverage:  {}/{} = {}%".format(num_covered, num_failing, percent(num_covered, num_failing))
+
+	# breakdowns by the configured group-by keys
+	if group_by:
+		summary['breakdowns'] = {key: get_breakdown(groups[key]) for key in group_by}
+
+	# trend metrics
+	if history_window:
+		summary['history_window'] = history_window
+		summary['top_flaky'] = [
+			{'job_name': row.job_name, 'job_url': row.job_url, 'trend': row.trend}
+			for row in get_top_flaky(rows, config.get('top_flaky_count', 10))
+		]
 
 	# generate chart and append to overall summary
-	# Map color codes with job count and type
-	jobs_dict = {
-		'#3465a4': (num_success, 'Success'),
-		'#515151': (num_aborted, 'Aborted'),
-		'#ef2929': (num_failure, 'Failure'),
-		'#704426': (num_error, 'Error'),
-		'#ffb738': (num_unstable, 'Unstable'),
-		'#bbbbbb': (num_missing, 'Missing')
-	}
+	# Map color codes with job count and type, keeping only available jobs
+	chart_segments = get_chart_segments(
+		totals['num_success'],
+		totals['num_unstable'],
+		totals['num_failure'],
+		totals['num_aborted'],
+		totals['num_missing'],
+		totals['num_error']
+	)
 
-	# Filter only available jobs
-	bg_color_list, data_list, labels_list = [], [], []
-	for key, (job_count, job_label) in jobs_dict.items():
-		if job_count != 0:
-			bg_color_list.append(key)
-			data_list.append(job_count)
-			labels_list.append(job_label)
-
-	# create chart config
-	chart_config = {
-		'type': 'doughnut',
-		'data': {
-			'labels': labels_list,
-			'datasets': [{
-				'backgroundColor': bg_color_list,
-				'data': data_list
-			}]
-		},
-		'options': {
-			'plugins': {
-				'datalabels': {
-					'display': 'true',
-					'align': 'middle',
-					'backgroundColor': '#fff',
-					'borderRadius': 20,
-					'font': {
-						'weight': 'bold',
-					}
-				},
-				'doughnutlabel': {
-					'labels': [{
-						'text': num_jobs,
-						'font': {
-							'size': 20,
-						}
-					}, {
-						'text': 'Total Jobs',
+	# render charts locally as inline SVG if configured, otherwise link to quickchart.io
+	if config.get('chart_renderer', 'quickchart') == 'svg':
+		summary['chart_svg'] = generate_doughnut_svg(chart_segments, size=500)
+		summary['charts_per_version'] = {}
+		for version, stats in stats_per_version.items():
+			version_segments = get_chart_segments(
+				stats['num_success'],
+				stats['num_unstable'],
+				stats['num_failure'],
+				stats['num_aborted'],
+				stats['num_missing'],
+				stats['num_error']
+			)
+			summary['charts_per_version'][version] = generate_doughnut_svg(version_segments, size=200)
+	else:
+		bg_color_list = [color for color, job_count, job_label in chart_segments]
+		data_list = [job_count for color, job_count, job_label in chart_segments]
+		labels_list = [job_label for color, job_count, job_label in chart_segments]
+
+		# create chart config
+		chart_config = {
+			'type': 'doughnut',
+			'data': {
+				'labels': labels_list,
+				'datasets': [{
+					'backgroundColor': bg_color_list,
+					'data': data_list
+				}]
+			},
+			'options': {
+				'plugins': {
+					'datalabels': {
+						'display': 'true',
+						'align': 'middle',
+						'backgroundColor': '#fff',
+						'borderRadius': 20,
 						'font': {
-							'size': 15,
+							'weight': 'bold',
 						}
-					}]
+					},
+					'doughnutlabel': {
+						'labels': [{
+							'text': num_jobs,
+							'font': {
+								'size': 20,
+							}
+						}, {
+							'text': 'Total Jobs',
+							'font': {
+								'size': 15,
+							}
+						}]
+					}
 				}
 			}
 		}
-	}
-	encoded_config = quote(json.dumps(chart_config))
-	summary['chart_url'] = f'https://quickchart.io/chart?c={encoded_config}'
+		encoded_config = quote(json.dumps(chart_config))
+		summary['chart_url'] = f'https://quickchart.io/chart?c={encoded_config}'
+
+	return summary, summary_per_version
+
+
+def run_report(config, blockers, preamble_file, template_file, no_email, test_email, server, header, cache=None, incremental=False, trust_job_states=False):
+
+	rows = get_report_rows(config, blockers, server, cache, incremental, trust_job_states)
+	if rows is None:
+		return None
+
+	# log and exit if no rows built - otherwise program will crash on summary generation
+	if len(rows) == 0:
+		print("No rows could be built with data for any of the jobs found with given search field. Exiting...")
+		return None
+	summary, summary_per_version = generate_report_summary(config, rows, blockers)
+
+	# save structured snapshot of the run so it can be rendered again without any API calls
+	# test runs leave the archive alone, as for the HTML report
+	if not test_email:
+		try:
+			snapshot_filename = write_snapshot(header, rows, summary, summary_per_version)
+			print('Snapshot saved as {}'.format(snapshot_filename))
+		except Exception as e:
+			print('Error saving snapshot: {}'.format(e))
+
+	deliver_report(config, header, rows, summary, summary_per_version, preamble_file, template_file, no_email, test_email, use_cache=cache is not None)
+
+
+def run_shard(config, blockers, server, header, shard, cache=None, incremental=False):
+	''' fetches the jobs of shard tuple (index, count) and saves their rows as partial result to shard_dir
+		for run_merge to combine - a shard without any jobs still saves an empty result
+	'''
+	rows = get_report_rows(config, blockers, server, cache, incremental, shard=shard)
+	if rows is None:
+		return None
+	shard_dir = config.get('shard_dir', 'shards')
+	try:
+		filename = write_partial(shard_dir, header, rows, shard)
+		print('Shard {}/{} results saved as {}'.format(shard[0], shard[1], filename))
+	except Exception as e:
+		print('Error saving shard results: {}'.format(e))
+
+
+def run_merge(config, blockers, preamble_file, template_file, no_email, test_email, header, use_cache=False):
+	''' combines the partial results of all shards in shard_dir into one report with summaries over all jobs
+		and delivers it like run_report - partial results are removed once the merged snapshot is saved,
+		test runs neither save a snapshot nor remove the partial results
+		compiled templates are only kept in the cache if use_cache is set
+	'''
+	shard_dir = config.get('shard_dir', 'shards')
+	try:
+		with phase('merge'):
+			rows, filenames = read_partials(shard_dir)
+	except Exception as e:
+		print('Error loading shard results: {}'.format(e))
+		return None
+
+	if len(rows) == 0:
+		print("No rows could be built with data for any of the jobs found with given search field. Exiting...")
+		return None
+	rows.sort(key=lambda row: row.osp_version, reverse=True)
+	summary, summary_per_version = generate_report_summary(config, rows, blockers)
+
+	# save merged snapshot, after which the partial results are no longer needed
+	if not test_email:
+		try:
+			snapshot_filename = write_snapshot(header, rows, summary, summary_per_version)
+			print('Snapshot saved as {}'.format(snapshot_filename))
+			for filename in filenames:
+				os.remove(filename)
+		except Exception as e:
+			print('Error saving snapshot: {}'.format(e))
+
+	deliver_report(config, header, rows, summary, summary_per_version, preamble_file, template_file, no_email, test_email, use_cache=use_cache)
+
+
+def deliver_report(config, header, rows, summary, summary_per_version, preamble_file, template_file, no_email, test_email, use_cache=False):
+	''' renders report from header, rows and summaries
+		saves it to 'archive' folder unless test run and emails it unless "no email" flag has been passed
+		compiled templates are only kept in the cache if use_cache is set
+	'''
 
 	# load a preamble for injection if specified
 	preamble = None
@@ -301,27 +334,27 @@ def run_report(config, blockers, preamble_file, template_file, no_email, test_em
 		with open(preamble_file, 'r') as file:
 			preamble = file.read()
 
-	# initialize jinja2 vars
-	loader = jinja2.FileSystemLoader('./templates')
-	env = jinja2.Environment(loader=loader)
+	# load template from shared environment
+	env = get_template_environment(config.get('cache_dir', '.jeeves_cache') if use_cache else None)
 	try:
 		template = env.get_template(template_file)
 	except Exception as e:
 		print("Error loading template file: {}\n{}".format(template_file, e))
 		sys.exit(1)
 
-	# generate HTML report
-	htmlcode = template.render(
-		header=header,
-		preamble=preamble,
-		rows=rows,
-		summary=summary,
-		summary_per_version=summary_per_version
-	)
+	template_vars = {
+		'header': header,
+		'preamble': preamble,
+		'rows': rows,
+		'summary': summary,
+		'summary_per_version': summary_per_version
+	}
 
-	# save HTML report to file if not test run
+	# stream HTML report to file if not test run
+	filename = None
 	if not test_email:
-		filename = generate_html_file(htmlcode)
+		with phase('render'):
+			filename = generate_html_file(template.generate(**template_vars))
 		print('HTML file generated as {}'.format(filename))
 
 	# if "no email" flag has been passed, do not execute this block
@@ -334,24 +367,19 @@ def run_report(config, blockers, preamble_file, template_file, no_email, test_em
 			else:
 				recipients = config['email_to'].split(',')
 
-			# construct email
-			msg = MIMEMultipart()
-			msg['From'] = config['email_from']
-			msg['Subject'] = config['email_subject']
-			msg['To'] = ", ".join(recipients)
-			msg.attach(MIMEText(htmlcode, 'html'))
+			# construct email from the saved report, read in chunks, or from the streamed template if it was not saved
+			with phase('render'):
+				if filename is not None:
+					with open(filename, 'rb') as file:
+						msg = generate_email(config['email_from'], recipients, config['email_subject'], iter(lambda: file.read(57 * 1024), b''))
+				else:
+					msg = generate_email(config['email_from'], recipients, config['email_subject'], (chunk.encode() for chunk in template.generate(**template_vars)))
 
 			# create SMTP session
-			with SMTP(config['smtp_host']) as smtp:
-
-				# start TLS for security
-				smtp.starttls()
-
-				# use ehlo or helo if needed
-				smtp.ehlo_or_helo_if_needed()
+			with phase('email'), open_smtp_session(config) as smtp:
 
 				# send email to all addresses
-				response = smtp.sendmail(msg['From'], recipients, msg.as_string())
+				response = smtp.sendmail(config['email_from'], recipients, msg)
 
 				# log success if all recipients recieved report, otherwise raise exception
 				if response == {}:
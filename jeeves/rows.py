@@ -0,0 +1,170 @@
+# shared model and builder of the job rows of reports and reminders
+
+import sys
+
+from jeeves.jobs import generate_failure_stage_log_urls
+from jeeves.blockers import get_other_blockers, has_blockers
+
+# results a row can have - rows reference these objects instead of holding their own copies
+RESULTS = {result: result for result in ('SUCCESS', 'UNSTABLE', 'FAILURE', 'ABORTED', 'NO_KNOWN_BUILDS', 'ERROR')}
+
+# results of jobs whose blockers are looked up
+FAILING_RESULTS = frozenset(('UNSTABLE', 'FAILURE', 'ABORTED', 'NO_KNOWN_BUILDS'))
+
+
+class JobRow:
+	''' row of a report or reminder for the last completed build of a job, rendered by the templates
+		osp_version, job_name, job_url, lcb_url, compose, second_compose, lcb_result and stage_name are strings
+		lcb_num and tempest_tests_failed are ints, build_days_ago is an int or 'N/A', any of them may be None
+		bugs, tickets and other are lists of blocker dicts, bug_ids and ticket_ids the blockers file ids behind them
+		stage_urls is a list of log urls, stage_durations and trend are dicts or None
+		covered is True if the blockers file lists any blockers for a failing job
+	'''
+	__slots__ = (
+		'osp_version',
+		'job_name',
+		'build_days_ago',
+		'job_url',
+		'lcb_num',
+		'lcb_url',
+		'compose',
+		'second_compose',
+		'lcb_result',
+		'blocker_bool',
+		'bugs',
+		'tickets',
+		'other',
+		'bug_ids',
+		'ticket_ids',
+		'covered',
+		'tempest_tests_failed',
+		'stage_name',
+		'stage_urls',
+		'stage_durations',
+		'trend'
+	)
+
+	def __init__(self, **fields):
+		for name in self.__slots__:
+			setattr(self, name, fields.get(name))
+
+	@property
+	def tempest_tests_url(self):
+		return '{}{}/testReport'.format(self.job_url, self.lcb_num)
+
+	def as_dict(self):
+		''' returns dict of all fields, as saved in snapshots
+		'''
+		return {name: getattr(self, name) for name in self.__slots__}
+
+	def __eq__(self, other):
+		return isinstance(other, JobRow) and self.as_dict() == other.as_dict()
+
+	def __repr__(self):
+		return 'JobRow({!r}, {!r})'.format(self.job_name, self.lcb_result)
+
+
+def intern_value(value):
+	''' returns interned copy of a string shared by many rows, any other value unchanged
+	'''
+	return sys.intern(value) if isinstance(value, str) else value
+
+
+def get_blocker_ids(blockers, job_name, key):
+	''' takes in blockers object, job name and either 'bz' or 'jira'
+		returns list of the ids of that kind filed for the job, without 0 placeholders
+	'''
+	return [blocker_id for blocker_id in blockers[job_name][key] if blocker_id != 0]
+
+
+def build_row(config, blockers, job_name, osp_version, jenkins_api_info, all_bugs_dict, all_tickets_dict, trend=None, remind=False):
+	''' takes in config, blockers object, job name and its OSP version, jenkins API info of the job,
+		dicts of all fetched bugs and tickets and optional build trend of the job
+		returns JobRow of the job
+		for reports, results other than the known ones are reported as 'ERROR' and blockers are only looked up for failing jobs
+		for reminders (remind is True), results are kept as they are and blockers are looked up for every job without SUCCESS
+	'''
+	lcb_result = RESULTS.get(jenkins_api_info['lcb_result'])
+	if remind:
+		lcb_result = lcb_result or intern_value(jenkins_api_info['lcb_result'])
+	elif lcb_result is None:
+		print("job {} had lcb_result {}: reporting as error job".format(job_name, jenkins_api_info['lcb_result']))
+		lcb_result = RESULTS['ERROR']
+
+	bug_ids = []
+	ticket_ids = []
+	bugs = []
+	tickets = []
+	other = []
+	covered = False
+	if lcb_result in FAILING_RESULTS or (remind and lcb_result != 'SUCCESS'):
+
+		# get all related bugs to job
+		try:
+			bug_ids = get_blocker_ids(blockers, job_name, 'bz')
+			bugs = list(map(all_bugs_dict.get, bug_ids))
+		except Exception as e:
+			print("Error fetching bugs for job {}: {}".format(job_name, e))
+
+		# get all related tickets to job
+		try:
+			ticket_ids = get_blocker_ids(blockers, job_name, 'jira')
+			tickets = list(map(all_tickets_dict.get, ticket_ids))
+		except Exception as e:
+			print("Error fetching tickets for job {}: {}".format(job_name, e))
+
+		# get any "other" artifact for job
+		try:
+			other = get_other_blockers(blockers, job_name)
+		except Exception as e:
+			print("Error fetching other blockers for job {}: {}".format(job_name, e))
+
+		# check if job is covered by any of jira/bz/other - only reports count coverage
+		if not remind:
+			covered = has_blockers(blockers, job_name)
+
+	stage_urls = []
+	if jenkins_api_info['stage_failure'] != 'N/A':
+		stage_urls = generate_failure_stage_log_urls(
+			config,
+			jenkins_api_info['stage_failure'],
+			jenkins_api_info['job_url'],
+			jenkins_api_info['lcb_num']
+		)
+
+	return JobRow(
+		osp_version=intern_value(osp_version),
+		job_name=job_name,
+		build_days_ago=jenkins_api_info['build_days_ago'],
+		job_url=jenkins_api_info['job_url'],
+		lcb_num=jenkins_api_info['lcb_num'],
+		lcb_url=jenkins_api_info['lcb_url'],
+		compose=intern_value(jenkins_api_info['compose']),
+		second_compose=intern_value(jenkins_api_info['second_compose']),
+		lcb_result=lcb_result,
+		blocker_bool=bool(bugs or tickets or other),
+		bugs=bugs,
+		tickets=tickets,
+		other=other,
+		bug_ids=bug_ids,
+		ticket_ids=ticket_ids,
+		covered=covered,
+		tempest_tests_failed=jenkins_api_info['tempest_tests_failed'],
+		stage_name=intern_value(jenkins_api_info['stage_failure']),
+		stage_urls=stage_urls,
+		stage_durations=jenkins_api_info.get('stage_durations'),
+		trend=trend
+	)
+
+
+def row_from_dict(fields):
+	''' takes in dict returned by JobRow.as_dict, e.g. loaded from a snapshot
+		returns JobRow with the shared strings interned again
+	'''
+	row = JobRow(**fields)
+	row.osp_version = intern_value(row.osp_version)
+	row.compose = intern_value(row.compose)
+	row.second_compose = intern_value(row.second_compose)
+	row.lcb_result = RESULTS.get(row.lcb_result, row.lcb_result)
+	row.stage_name = intern_value(row.stage_name)
+	return row
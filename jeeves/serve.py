@@ -0,0 +1,204 @@
+# long running mode keeping clients and fetched data warm between scheduled runs
+
+import os
+import json
+import time
+import yaml
+import queue
+import datetime
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from jeeves import metrics
+from jeeves.common import generate_header
+from jeeves.report import run_report, get_fetch_options
+from jeeves.remind import run_remind
+from jeeves.jobs import get_jenkins_jobs, get_jenkins_jobs_info_incremental, get_osp_version, update_jenkins_job_state
+from jeeves.blockers import get_bugs_dict, get_bugs_set, get_tickets_dict, get_tickets_set
+
+
+def get_next_run(entry, now):
+	''' takes in schedule entry with either 'every' (seconds) or 'at' (list of 'HH:MM' local times) and current time
+		returns time of the next run of the entry as a timestamp
+	'''
+	if 'every' in entry:
+		return now + entry['every']
+	today = datetime.datetime.fromtimestamp(now).replace(second=0, microsecond=0)
+	next_runs = []
+	for at in entry['at']:
+		hour, minute = map(int, str(at).split(':'))
+		next_run = today.replace(hour=hour, minute=minute)
+		if next_run.timestamp() <= now:
+			next_run += datetime.timedelta(days=1)
+		next_runs.append(next_run.timestamp())
+	return min(next_runs)
+
+
+def load_blockers(blocker_file, loaded=None):
+	''' takes in path of the blockers file and tuple of (mtime, blockers) loaded before
+		returns tuple of (mtime, blockers), only parsing the file again if it changed
+		keeps the previous blockers if the changed file cannot be parsed
+	'''
+	mtime = os.path.getmtime(blocker_file)
+	if loaded is not None and loaded[0] == mtime:
+		return loaded
+	try:
+		with open(blocker_file, 'r') as file:
+			return mtime, yaml.safe_load(file)
+	except Exception as e:
+		if loaded is None:
+			raise
+		print("Error loading blocker configuration data, keeping previous blockers: ", e)
+		return loaded
+
+
+def refresh(config, blockers, server, cache):
+	''' fetches jobs whose last completed build changed and expired tracker entries into the cache
+		so the next report only has to render
+	'''
+	supported_versions = list(map(str, config.get('supported_versions', ['13', '16.1', '16.2'])))
+	jobs = get_jenkins_jobs(
+		server,
+		config['job_search_fields'],
+		supported_versions,
+		max_workers=config.get('max_workers', 8),
+		folder_depth=config.get('folder_depth', 0),
+		cache=cache,
+		inventory_ttl=config.get('inventory_cache_ttl', 0)
+	)
+	job_names = [job['name'] for job in jobs if get_osp_version(job['name']) is not None]
+	get_jenkins_jobs_info_incremental(server, job_names, cache, **get_fetch_options(config))
+	if blockers:
+		get_bugs_dict(get_bugs_set(blockers), config, cache=cache)
+		get_tickets_dict(get_tickets_set(blockers), config, cache=cache)
+
+
+def parse_notification(payload):
+	''' takes in JSON payload of a build notification, either in the format of the jenkins
+		Notification plugin or a generic one with 'job_name' and 'build_number'
+		returns tuple of full job name and build number of a completed build, None for any other payload
+	'''
+	if 'job_name' in payload and 'build_number' in payload:
+		return payload['job_name'], int(payload['build_number'])
+	build = payload.get('build') or {}
+	if build.get('phase') not in ('COMPLETED', 'FINALIZED') or 'number' not in build:
+		return None
+
+	# notification plugin sends the job url relative to jenkins, e.g. job/folder/job/name/
+	parts = payload.get('url', '').strip('/').split('/')
+	job_name = '/'.join(parts[i + 1] for i in range(0, len(parts) - 1, 2) if parts[i] == 'job') or payload.get('name')
+	if not job_name:
+		return None
+	return job_name, int(build['number'])
+
+
+class TriggerHandler(BaseHTTPRequestHandler):
+	''' accepts POST /report, /remind and /refresh and queues a run in that mode
+		accepts POST /webhook with a build notification and queues an update of that job
+	'''
+
+	def do_POST(self):
+		mode = self.path.strip('/')
+		if mode == 'webhook':
+			try:
+				payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+				notification = parse_notification(payload)
+			except Exception:
+				self.send_response(400)
+				self.end_headers()
+				return
+			if notification is not None:
+				self.server.runs.put(('webhook',) + notification)
+			self.send_response(202)
+			self.end_headers()
+			return
+		if mode not in ('report', 'remind', 'refresh'):
+			self.send_response(404)
+			self.end_headers()
+			return
+		self.server.runs.put(mode)
+		self.send_response(202)
+		self.end_headers()
+		self.wfile.write('{} queued\n'.format(mode).encode())
+
+	def log_message(self, format, *args):
+		pass
+
+
+def run_serve(config, blocker_file, preamble_file, template_file, no_email, test_email, server, cache):
+	''' runs until interrupted, keeping the jenkins and tracker clients, blockers and cache open
+		refreshes changed jobs every serve_refresh_interval seconds and runs reports and reminders
+		on the serve_schedule, or when triggered with a POST to serve_port
+		build notifications update the stored state of their job as they arrive - if serve_webhooks
+		is set, reports trust these states and the refresh only reconciles missed notifications
+	'''
+	if cache is None:
+		print("Serve mode requires the cache - exiting...")
+		return None
+
+	schedule = config.get('serve_schedule', [{'mode': 'report', 'at': ['08:00']}])
+	refresh_interval = config.get('serve_refresh_interval', 300)
+	fpn = config.get('filter_param_name', None)
+	fpv = config.get('filter_param_value', None)
+	trust_job_states = config.get('serve_webhooks', False)
+	loaded = load_blockers(blocker_file)
+
+	# trigger and webhook listener - only listens on the loopback interface unless serve_host is set
+	runs = queue.Queue()
+	trigger_server = ThreadingHTTPServer((config.get('serve_host', '127.0.0.1'), config.get('serve_port', 8765)), TriggerHandler)
+	trigger_server.daemon_threads = True
+	trigger_server.runs = runs
+	threading.Thread(target=trigger_server.serve_forever, daemon=True).start()
+	print("Serving on {}:{} - POST /report, /remind or /refresh to trigger a run".format(*trigger_server.server_address[:2]))
+
+	now = time.time()
+	next_runs = [now] + [get_next_run(entry, now) for entry in schedule]
+	try:
+		while True:
+
+			# wait for a trigger or notification until the next scheduled run is due
+			due = min(next_runs)
+			try:
+				modes = [runs.get(timeout=max(0, due - time.time()))]
+			except queue.Empty:
+				modes = []
+			now = time.time()
+			if next_runs[0] <= now:
+				modes.append('refresh')
+				next_runs[0] = now + refresh_interval
+			for i, entry in enumerate(schedule, 1):
+				if next_runs[i] <= now:
+					modes.append(entry['mode'])
+					next_runs[i] = get_next_run(entry, now)
+
+			for mode in modes:
+
+				# build notifications only touch the state of their job
+				if isinstance(mode, tuple):
+					try:
+						update_jenkins_job_state(server, mode[1], mode[2], cache, filter_param_name=fpn, filter_param_value=fpv)
+					except Exception as e:
+						print("Error updating job {} from build notification: {}".format(mode[1], e))
+					continue
+
+				try:
+					loaded = load_blockers(blocker_file, loaded)
+					blockers = loaded[1]
+					metrics.reset()
+					if mode == 'refresh':
+						refresh(config, blockers, server, cache)
+					elif mode == 'report':
+						header = generate_header(config['job_search_fields'], filter_param_name=fpn, filter_param_value=fpv)
+						run_report(config, blockers, preamble_file, template_file, no_email, test_email, server, header, cache, incremental=True, trust_job_states=trust_job_states)
+					else:
+						header = generate_header(blocker_file, filter_param_name=fpn, filter_param_value=fpv, remind=True)
+						run_remind(config, blockers, server, header, cache)
+					metrics.save_metrics(config, mode)
+				except Exception as e:
+					print("Error during {} run: {}".format(mode, e))
+	except KeyboardInterrupt:
+		print("Stopping...")
+	finally:
+		trigger_server.shutdown()
+		trigger_server.server_close()
@@ -0,0 +1,67 @@
+# library functions for splitting report runs over shards and combining their partial results
+
+import os
+import re
+import glob
+import zlib
+
+from jeeves.snapshot import read_snapshot, write_snapshot
+
+
+def parse_shard(value):
+	''' takes in shard given as 'i/N', e.g. '2/4' for the second of four shards
+		returns tuple of (i, N)
+		raises ValueError if the shard is not valid
+	'''
+	match = re.fullmatch(r'(\d+)/(\d+)', value.strip())
+	if match is None or not 1 <= int(match.group(1)) <= int(match.group(2)):
+		raise ValueError('shard "{}" must be given as i/N with 1 <= i <= N, e.g. 1/4'.format(value))
+	return int(match.group(1)), int(match.group(2))
+
+
+def in_shard(job_name, shard):
+	''' takes in job name and shard tuple of (i, N)
+		returns True if the job belongs to the shard - every job belongs to exactly one of N shards,
+		the same one on every host and in every run
+	'''
+	index, count = shard
+	return zlib.crc32(job_name.encode()) % count == index - 1
+
+
+def get_partial_filename(shard_dir, shard):
+	''' returns filename of the partial result of shard tuple (i, N) in shard_dir
+	'''
+	return os.path.join(shard_dir, 'shard_{}_of_{}.jsonl.gz'.format(*shard))
+
+
+def write_partial(shard_dir, header, rows, shard):
+	''' saves header and rows of shard tuple (i, N) to shard_dir in the snapshot format
+		returns filename of the partial result
+	'''
+	os.makedirs(shard_dir, exist_ok=True)
+	return write_snapshot(header, rows, {'shard': list(shard)}, {}, filename=get_partial_filename(shard_dir, shard))
+
+
+def read_partials(shard_dir):
+	''' loads the partial results saved by write_partial in shard_dir
+		returns tuple of list of the rows of all shards and list of the partial result filenames
+		raises exception if partial results of different shard counts are found or any shard is missing
+	'''
+	filenames = sorted(glob.glob(os.path.join(shard_dir, 'shard_*_of_*.jsonl.gz')))
+	if filenames == []:
+		raise Exception('no shard results found in {}'.format(shard_dir))
+
+	rows = []
+	shards = set()
+	for filename in filenames:
+		header, shard_rows, meta, _ = read_snapshot(filename)
+		shards.add(tuple(meta['shard']))
+		rows.extend(shard_rows)
+
+	counts = sorted({count for index, count in shards})
+	if len(counts) != 1:
+		raise Exception('results of different shard counts {} found in {}'.format(counts, shard_dir))
+	missing = sorted(set(range(1, counts[0] + 1)) - {index for index, count in shards})
+	if missing:
+		raise Exception('results of shard(s) {} of {} missing in {}'.format(', '.join(map(str, missing)), counts[0], shard_dir))
+	return rows, filenames
@@ -0,0 +1,43 @@
+# library functions for saving and loading structured snapshots of report runs
+
+import os
+import gzip
+import json
+import datetime
+
+from jeeves.rows import row_from_dict
+
+
+def write_snapshot(header, rows, summary, summary_per_version, filename=None):
+	''' saves header, rows, summary and summary_per_version of a report run
+		as gzip compressed JSON lines - one metadata line followed by one line per row
+		saves to 'archive' folder unless filename is given
+		returns filename of the snapshot
+	'''
+	if filename is None:
+		os.makedirs('archive', exist_ok=True)
+		filename = './archive/snapshot_{:%Y-%m-%d_%H-%M-%S}.jsonl.gz'.format(datetime.datetime.now())
+	with gzip.open(filename, 'wt') as file:
+		meta = {
+			'header': header,
+			'summary': summary,
+			'summary_per_version': summary_per_version,
+			'num_rows': len(rows)
+		}
+		file.write(json.dumps(meta) + '\n')
+		for row in rows:
+			file.write(json.dumps(row.as_dict()) + '\n')
+	return filename
+
+
+def read_snapshot(filename):
+	''' loads a snapshot saved by write_snapshot
+		returns tuple of header, list of JobRow, summary and summary_per_version
+		raises exception if the snapshot is incomplete
+	'''
+	with gzip.open(filename, 'rt') as file:
+		meta = json.loads(file.readline())
+		rows = [row_from_dict(json.loads(line)) for line in file if line.strip()]
+	if len(rows) != meta['num_rows']:
+		raise Exception('snapshot {} is incomplete: expected {} rows, found {}'.format(filename, meta['num_rows'], len(rows)))
+	return meta['header'], rows, meta['summary'], meta['summary_per_version']
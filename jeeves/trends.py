@@ -0,0 +1,41 @@
+# library functions for analysing the recent build history of jobs
+
+from jeeves.common import percent
+
+
+def get_build_trend(results):
+	''' takes in list of build results, newest first
+		returns dict with pass rate in percent, length and result of the current streak
+		and flip rate - the share of consecutive build pairs whose result differs
+		returns None if there are no results
+	'''
+	if not results:
+		return None
+	streak = 1
+	while streak < len(results) and results[streak] == results[0]:
+		streak += 1
+	flips = sum(1 for newer, older in zip(results, results[1:]) if newer != older)
+	return {
+		'num_builds': len(results),
+		'pass_rate': percent(results.count('SUCCESS'), len(results)),
+		'streak': streak,
+		'streak_result': results[0],
+		'flip_rate': round(flips / (len(results) - 1), 2) if len(results) > 1 else 0.0
+	}
+
+
+def get_jobs_trends(all_results):
+	''' takes in dict of job name to list of build results, newest first
+		returns dict of job name to trend as returned by get_build_trend
+	'''
+	return {job_name: get_build_trend(results) for job_name, results in all_results.items()}
+
+
+def get_top_flaky(rows, count=10):
+	''' takes in list of report rows with a trend
+		returns up to count rows of jobs that changed result at least once,
+		highest flip rate first and lowest pass rate first among equal flip rates
+	'''
+	flaky = [row for row in rows if row.trend and row.trend['flip_rate'] > 0]
+	flaky.sort(key=lambda row: (-row.trend['flip_rate'], row.trend['pass_rate']))
+	return flaky[:count]
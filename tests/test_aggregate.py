@@ -0,0 +1,38 @@
+from jeeves.aggregate import *
+from jeeves.rows import JobRow
+
+
+def get_rows():
+	return [
+		JobRow(job_name='DFG-ceph-rhos-16.1-job1', osp_version='16.1', lcb_result='SUCCESS', stage_name='N/A', bug_ids=[], ticket_ids=[], covered=False),
+		JobRow(job_name='DFG-ceph-rhos-16.1-job2', osp_version='16.1', lcb_result='FAILURE', stage_name='Overcloud', bug_ids=[1, 2], ticket_ids=['T-1'], covered=True),
+		JobRow(job_name='folder/DFG-network-rhos-13-job3', osp_version='13', lcb_result='FAILURE', stage_name='Overcloud', bug_ids=[2], ticket_ids=[], covered=True),
+		JobRow(job_name='rhos-13-job4', osp_version='13', lcb_result='NO_KNOWN_BUILDS', stage_name='N/A', bug_ids=[], ticket_ids=[], covered=False)
+	]
+
+
+def test_get_dfg():
+	assert get_dfg('DFG-ceph-rhos-16.1-job') == 'DFG-ceph'
+	assert get_dfg('folder/DFG-network-rhos-13-job') == 'DFG-network'
+	assert get_dfg('rhos-13-job') is None
+
+
+def test_aggregate_rows():
+	blockers = {'DFG-ceph-rhos-16.1-job2': {'owners': ['a@example.com', 'b@example.com']}}
+	totals, groups = aggregate_rows(get_rows(), ['osp_version', 'dfg', 'owner', 'stage'], blockers)
+	assert (totals['num_jobs'], totals['num_success'], totals['num_failure'], totals['num_missing']) == (4, 1, 2, 1)
+	assert (totals['num_covered'], totals['num_bugs'], totals['bug_ids'], totals['num_tickets']) == (2, 3, {1, 2}, 1)
+	assert groups['osp_version']['13']['num_jobs'] == 2
+	assert groups['osp_version']['16.1']['num_success'] == 1
+	assert set(groups['dfg']) == {'DFG-ceph', 'DFG-network'}
+	assert set(groups['owner']) == {'a@example.com', 'b@example.com'}
+	assert groups['stage']['Overcloud']['num_failure'] == 2
+	assert summarize(groups['osp_version']['16.1'])['total_success'] == 'SUCCESS:  1/2 = 50.0%'
+
+
+def test_get_breakdown():
+	totals, groups = aggregate_rows(get_rows(), ['dfg'])
+	breakdown = get_breakdown(groups['dfg'])
+	assert [entry['group'] for entry in breakdown] == ['DFG-ceph', 'DFG-network']
+	assert (breakdown[0]['pass_rate'], breakdown[0]['coverage']) == (50.0, 100.0)
+	assert get_breakdown({'all': dict(new_stats(), num_jobs=1, num_success=1)})[0]['coverage'] is None
@@ -0,0 +1,25 @@
+from bench.fleet import generate_fleet
+from bench.servers import apply_tree, parse_tree
+from bench.startup import MODE_IMPORTS, get_commands
+
+
+def test_apply_tree():
+	data = {'jobs': [{'name': 'job1', 'color': 'blue', 'builds': [{'number': 3, 'result': None}, {'number': 2, 'result': 'SUCCESS'}, {'number': 1, 'result': 'FAILURE'}]}]}
+	tree = parse_tree('jobs[name,builds[number,result]{1,3}]')
+	assert apply_tree(data, tree) == {'jobs': [{'name': 'job1', 'builds': [{'number': 2, 'result': 'SUCCESS'}, {'number': 1, 'result': 'FAILURE'}]}]}
+
+
+def test_generate_fleet():
+	fleet = generate_fleet('http://jenkins', num_jobs=4, num_folders=2, num_builds=3, num_bugs=2, num_tickets=1, num_owners=2)
+	assert list(fleet['jobs']) == ['folder-0/DFG-bench-rhos-13-job-0', 'folder-1/DFG-bench-rhos-16.1-job-1', 'folder-0/DFG-bench-rhos-16.2-job-2', 'folder-1/DFG-bench-rhos-13-job-3']
+	assert fleet['jobs']['folder-0/DFG-bench-rhos-13-job-0']['url'] == 'http://jenkins/job/folder-0/job/DFG-bench-rhos-13-job-0/'
+	assert [build['number'] for build in fleet['jobs']['folder-0/DFG-bench-rhos-13-job-0']['builds']] == [3, 2, 1]
+	assert fleet['blockers']['folder-1/DFG-bench-rhos-13-job-3']['owners'] == ['owner1@example.com']
+	assert fleet == generate_fleet('http://jenkins', num_jobs=4, num_folders=2, num_builds=3, num_bugs=2, num_tickets=1, num_owners=2)
+
+
+def test_get_commands():
+	commands = get_commands('/repo')
+	assert commands['help'][1:] == ['/repo/jeeves.py', '--help']
+	assert set(commands) == {'help', 'config_error'} | set(MODE_IMPORTS)
+	assert commands['report'][-1].endswith('import jenkins, jeeves.cache, jeeves.transport, jeeves.report')
@@ -1,8 +1,97 @@
 from jeeves.blockers import *
 
 
-def test_get_bugs_dict():
-	pass
+def test_get_bugs_dict(monkeypatch):
+	queried = []
+
+	def mock_query_bugs(bug_ids, config):
+		queried.append(bug_ids)
+		return {1234: ('NEW', 'quoted bug'), 5678: ('POST', 'bug')}
+	monkeypatch.setattr('jeeves.blockers.query_bugs', mock_query_bugs)
+
+	# quoted ids are queried and matched as numbers, ids that are not numbers are only linked
+	bug_dict = get_bugs_dict({'1234', 5678, 'BZ1234', 0}, {'bz_url': 'https://bugzilla'})
+	assert queried == [[1234, 5678]]
+	assert bug_dict['1234']['bug_name'] == '[NEW] quoted bug'
+	assert bug_dict[5678]['bug_name'] == '[POST] bug'
+	assert bug_dict['BZ1234'] == {'bug_name': 'BZ#BZ1234', 'bug_url': 'https://bugzilla/show_bug.cgi?id=BZ1234'}
+	assert 0 not in bug_dict
+
+
+def test_close_tracker_clients():
+	closed = []
+
+	class MockJira:
+		def close(self):
+			closed.append('jira')
+
+	class MockSession:
+		def close(self):
+			closed.append('bugzilla')
+
+	class MockBugzilla:
+		def get_requests_session(self):
+			return MockSession()
+
+		def disconnect(self):
+			closed.append('disconnected')
+
+	# dropped clients are closed and connected again on next use
+	jira = get_tracker_client('https://jira', MockJira)
+	assert get_tracker_client('https://jira', MockJira) is jira
+	drop_tracker_client('https://jira')
+	assert closed == ['jira']
+	assert get_tracker_client('https://jira', MockJira) is not jira
+
+	get_tracker_client('https://bugzilla', MockBugzilla)
+	close_tracker_clients()
+	assert sorted(closed) == ['bugzilla', 'disconnected', 'jira', 'jira']
+	close_tracker_clients()
+	assert len(closed) == 4
+
+
+def test_get_tracker_info(tmp_path):
+	from jeeves.cache import JeevesCache
+	cache = JeevesCache(str(tmp_path), 'https://jenkins')
+	queried = []
+
+	def query(item_ids):
+		queried.append(list(item_ids))
+		return {item_id: ('NEW', 'summary') for item_id in item_ids}
+
+	def query_down(item_ids):
+		return {}
+
+	assert get_tracker_info([1, 2], 'https://bugzilla', query, {}) == {1: ('NEW', 'summary'), 2: ('NEW', 'summary')}
+
+	# only ids missing from the cache are queried
+	queried.clear()
+	get_tracker_info([1], 'https://bugzilla', query, {}, cache=cache)
+	get_tracker_info([1, 2], 'https://bugzilla', query, {}, cache=cache)
+	assert queried == [[1], [2]]
+
+	# expired entries are served stale when the tracker is down
+	assert get_tracker_info([1, 2], 'https://bugzilla', query_down, {'tracker_cache_ttl': -1}, cache=cache) == {1: ('NEW', 'summary'), 2: ('NEW', 'summary')}
+
+
+def test_get_bugs_info():
+	from types import SimpleNamespace
+
+	class MockBugzilla:
+		def __init__(self, failures):
+			self.failures = failures
+
+		def getbugs(self, bug_ids, include_fields=None, permissive=True):
+			if self.failures > 0:
+				self.failures -= 1
+				raise Exception('Service Unavailable')
+			return [SimpleNamespace(id=bug_id, status='NEW', summary='bug') for bug_id in bug_ids if bug_id != 999] + [None]
+
+	assert get_bugs_info(MockBugzilla(0), [123456, 999]) == {123456: ('NEW', 'bug')}
+
+	# failed chunks are retried
+	assert get_bugs_info(MockBugzilla(2), [123456], retries=2) == {123456: ('NEW', 'bug')}
+	assert get_bugs_info(MockBugzilla(3), [123456], retries=2) == {}
 
 
 def test_get_bugs_set():
@@ -18,6 +107,29 @@ def test_get_tickets_dict():
 	pass
 
 
+def test_get_tickets_info():
+	from types import SimpleNamespace
+
+	def mock_issue(key):
+		return SimpleNamespace(key=key, fields=SimpleNamespace(status='Open', summary='summary of ' + key))
+
+	class MockJira:
+		def search_issues(self, jql, fields=None, maxResults=50):
+			if 'BAD-1' in jql:
+				raise Exception('An issue with key BAD-1 does not exist')
+			return [mock_issue('RHOSINFRA-123')]
+
+		def issue(self, ticket_id, fields=None):
+			if ticket_id == 'BAD-1':
+				raise Exception('Issue does not exist')
+			return mock_issue(ticket_id)
+
+	assert get_tickets_info(MockJira(), ['RHOSINFRA-123']) == {'RHOSINFRA-123': ('Open', 'summary of RHOSINFRA-123')}
+
+	# one bad key only drops that key
+	assert get_tickets_info(MockJira(), ['RHOSINFRA-123', 'BAD-1']) == {'RHOSINFRA-123': ('Open', 'summary of RHOSINFRA-123')}
+
+
 def test_get_tickets_set():
 	mockers = {
 		'job1': {'jira': [0]},
@@ -27,6 +139,16 @@ def test_get_tickets_set():
 	assert get_tickets_set(mockers) == {'RHOSINFRA-123', 'RHOSENTDFG-456'}
 
 
+def test_get_owner_jobs():
+	mockers = {
+		'job1': {'owners': ['foo@bar.com']},
+		'job2': {'bz': [123456]},
+		'job3': {'owners': ['foo@bar.com', 'baz@bar.com']}
+	}
+	assert get_owner_jobs(mockers) == {'foo@bar.com': ['job1', 'job3'], 'baz@bar.com': ['job3']}
+	assert get_owner_jobs({}) == {}
+
+
 def test_get_other_blockers():
 	pass
 
@@ -0,0 +1,108 @@
+from jeeves.cache import *
+
+
+def test_param_values(tmp_path):
+	cache = JeevesCache(str(tmp_path), 'https://jenkins/')
+	assert cache.get_param_values('job1', 'PARAM') == {}
+	cache.set_param_values('job1', 'PARAM', {10: True, 9: None, 8: 'value'})
+	assert cache.get_param_values('job1', 'PARAM') == {10: True, 9: None, 8: 'value'}
+	assert cache.get_param_values('job2', 'PARAM') == {}
+	cache.close()
+
+	# entries persist between cache instances
+	cache = JeevesCache(str(tmp_path), 'https://jenkins')
+	assert cache.get_param_values('job1', 'PARAM') == {10: True, 9: None, 8: 'value'}
+	cache.close()
+
+
+def test_builds(tmp_path):
+	cache = JeevesCache(str(tmp_path), 'https://jenkins')
+	assert cache.get_build('job1', 5, 'info') is None
+	cache.set_build('job1', 5, 'info', {'number': 5, 'result': 'SUCCESS'})
+	cache.set_build('job1', 5, 'stages', {'stages': []})
+	assert cache.get_build('job1', 5, 'info') == {'number': 5, 'result': 'SUCCESS'}
+	assert cache.get_build('job1', 5, 'stages') == {'stages': []}
+
+	# size based eviction keeps nothing when the limit is zero
+	cache.evict(30, 0)
+	assert cache.get_build('job1', 5, 'info') is None
+	cache.close()
+
+
+def test_job_states(tmp_path):
+	cache = JeevesCache(str(tmp_path), 'https://jenkins')
+	assert cache.get_job_states(['job1']) == {}
+	cache.set_job_states({'job1': {'lcb_num': 5, 'filter': [None, None], 'info': {'lcb_result': 'SUCCESS'}}})
+	assert cache.get_job_states(['job1', 'job2']) == {'job1': {'lcb_num': 5, 'filter': [None, None], 'info': {'lcb_result': 'SUCCESS'}}}
+	assert cache.get_job_states(['job2']) == {}
+	cache.close()
+
+
+def test_tracker_entries(tmp_path):
+	cache = JeevesCache(str(tmp_path), 'https://jenkins')
+	assert cache.get_tracker_entries('https://bugzilla', [123456]) == {}
+	cache.set_tracker_entries('https://bugzilla/', {123456: ('NEW', 'bug summary')})
+	entries = cache.get_tracker_entries('https://bugzilla', [123456, 789123])
+	assert list(entries) == [123456]
+	assert entries[123456]['status'] == 'NEW'
+	assert entries[123456]['summary'] == 'bug summary'
+	assert cache.get_tracker_entries('https://jira', [123456]) == {}
+	cache.close()
+
+
+def test_inventory(tmp_path):
+	cache = JeevesCache(str(tmp_path), 'https://jenkins')
+	assert cache.get_inventory(0, 600) is None
+	cache.set_inventory(0, [{'name': 'job1', 'url': 'https://jenkins/job/job1/'}])
+	assert cache.get_inventory(0, 600) == [{'name': 'job1', 'url': 'https://jenkins/job/job1/'}]
+	assert cache.get_inventory(1, 600) is None
+	assert cache.get_inventory(0, -1) is None
+	cache.close()
+
+
+def test_http_responses(tmp_path):
+	cache = JeevesCache(str(tmp_path), 'https://jenkins')
+	assert cache.get_http_response('https://jenkins/api/json') is None
+	cache.set_http_response('https://jenkins/api/json', '"abc"', None, b'{}', 'utf-8')
+	assert cache.get_http_response('https://jenkins/api/json') == {'etag': '"abc"', 'last_modified': None, 'body': b'{}', 'encoding': 'utf-8'}
+	cache.close()
+
+
+def test_evict_by_last_access(tmp_path):
+	cache = JeevesCache(str(tmp_path), 'https://jenkins')
+	cache.set_build('job1', 5, 'info', {'number': 5})
+	cache.set_build('job1', 6, 'info', {'number': 6})
+	cache.set_param_values('job1', 'PARAM', {5: 'value'})
+	cache.set_param_values('job1', 'OTHER', {5: 'value'})
+	with cache.db:
+		cache.db.execute('UPDATE builds SET stored_at = 0, accessed_at = 0')
+		cache.db.execute('UPDATE param_index SET accessed_at = 0')
+
+	# entries read since they were stored are kept, however long ago they were stored
+	assert cache.get_build('job1', 5, 'info') == {'number': 5}
+	assert cache.get_param_values('job1', 'PARAM') == {5: 'value'}
+	cache.evict(30, 100)
+	assert cache.get_build('job1', 5, 'info') == {'number': 5}
+	assert cache.get_build('job1', 6, 'info') is None
+	assert cache.get_param_values('job1', 'PARAM') == {5: 'value'}
+	assert cache.get_param_values('job1', 'OTHER') == {}
+
+	# size based eviction also covers the param index
+	cache.evict(30, 0)
+	assert cache.get_param_values('job1', 'PARAM') == {}
+	cache.close()
+
+
+def test_cache_without_access_times(tmp_path):
+	db = sqlite3.connect(str(tmp_path / 'cache.db'))
+	db.execute('CREATE TABLE builds (jenkins_url TEXT, job_name TEXT, build_number INTEGER, kind TEXT, data TEXT, stored_at REAL, PRIMARY KEY (jenkins_url, job_name, build_number, kind))')
+	db.execute('INSERT INTO builds VALUES (?, ?, ?, ?, ?, ?)', ('https://jenkins', 'job1', 5, 'info', '{"number": 5}', time.time()))
+	db.commit()
+	db.close()
+
+	# entries of caches created by earlier versions are kept and can be read and written
+	cache = JeevesCache(str(tmp_path), 'https://jenkins')
+	assert cache.get_build('job1', 5, 'info') == {'number': 5}
+	cache.set_build('job1', 6, 'info', {'number': 6})
+	assert cache.get_build('job1', 6, 'info') == {'number': 6}
+	cache.close()
@@ -0,0 +1,20 @@
+import xml.etree.ElementTree as ET
+
+from jeeves.chart import *
+
+
+def test_get_chart_segments():
+	assert get_chart_segments(3, 0, 1, 0, 0, 0) == [('#3465a4', 3, 'Success'), ('#ef2929', 1, 'Failure')]
+	assert get_chart_segments(0, 0, 0, 0, 0, 0) == []
+
+
+def test_generate_doughnut_svg():
+	svg = generate_doughnut_svg(get_chart_segments(3, 2, 1, 0, 0, 1))
+	root = ET.fromstring(svg)
+	assert root.tag == '{http://www.w3.org/2000/svg}svg'
+	assert len(root.findall('.//{http://www.w3.org/2000/svg}path')) == 4
+	assert 'Total Jobs' in svg
+
+	# a single result is drawn as a full ring
+	svg = generate_doughnut_svg(get_chart_segments(5, 0, 0, 0, 0, 0))
+	assert len(ET.fromstring(svg).findall('.//{http://www.w3.org/2000/svg}circle')) == 1
@@ -5,8 +5,63 @@ def test_generate_header():
 	pass
 
 
-def test_generate_html_file():
-	pass
+def test_generate_html_file(tmp_path, monkeypatch):
+	monkeypatch.chdir(tmp_path)
+	filename = generate_html_file('<html></html>')
+	with open(filename, 'r') as file:
+		assert file.read() == '<html></html>'
+
+	# chunks from a streamed template are written as they come
+	filename = generate_html_file(iter(['<html>', '</html>']), remind=True)
+	assert 'reminder_' in filename
+	with open(filename, 'r') as file:
+		assert file.read() == '<html></html>'
+
+	# suffixes keep files of the same second apart
+	filenames = {generate_html_file('<html></html>', remind=True, suffix=owner) for owner in ['a@example.com', 'b/c@example.com']}
+	assert len(filenames) == 2
+	assert any(filename.endswith('_b_c@example.com.html') for filename in filenames)
+
+
+def test_open_smtp_session(monkeypatch):
+	calls = []
+
+	class MockSMTP:
+		def __init__(self, host):
+			calls.append(('connect', host))
+
+		def starttls(self):
+			calls.append(('starttls',))
+
+		def ehlo_or_helo_if_needed(self):
+			pass
+
+		def login(self, username, password):
+			calls.append(('login', username))
+
+	monkeypatch.setattr('smtplib.SMTP', MockSMTP)
+	open_smtp_session({'smtp_host': 'smtp.example.com'})
+	assert calls == [('connect', 'smtp.example.com'), ('starttls',)]
+
+	calls.clear()
+	open_smtp_session({'smtp_host': 'smtp.example.com', 'smtp_username': 'user', 'smtp_password': 'pass'})
+	assert calls == [('connect', 'smtp.example.com'), ('starttls',), ('login', 'user')]
+
+
+def test_generate_email():
+	import email
+
+	html = '<html>' + 'Jeeves report – ünïcode '.join(str(i) for i in range(500)) + '</html>'
+	data = html.encode('utf-8')
+	chunks = [data[i:i + 100] for i in range(0, len(data), 100)]
+	message = generate_email('jeeves@example.com', ['a@example.com', 'b@example.com'], 'Report', chunks)
+	assert b'\r\n' in message and b'\n' not in message.replace(b'\r\n', b'')
+
+	parsed = email.message_from_bytes(bytes(message))
+	assert parsed['To'] == 'a@example.com, b@example.com'
+	part = parsed.get_payload()[0]
+	assert part.get_content_type() == 'text/html'
+	assert part.get_payload(decode=True).decode('utf-8') == html
 
 
 def test_percent_func():
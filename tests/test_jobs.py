@@ -5,8 +5,50 @@ def test_get_jenkins_job_info():
 	pass
 
 
+class MockInventoryServer:
+	''' stand-in for a jenkins server with two top level jobs and a folder holding a third one
+	'''
+	def __init__(self):
+		self.calls = 0
+
+	def get_info(self, item='', query=None):
+		self.calls += 1
+		if item == '':
+			return {'jobs': [
+				{'name': 'DFG-ceph-rhos-16.1-job', 'url': 'https://jenkins/job/DFG-ceph-rhos-16.1-job/'},
+				{'name': 'DFG-ceph-rhos-15-job', 'url': 'https://jenkins/job/DFG-ceph-rhos-15-job/'},
+				{'name': 'folder', 'url': 'https://jenkins/job/folder/', 'jobs': [{'name': 'DFG-ceph-rhos-13-job'}]}
+			]}
+		return {'jobs': [{'name': 'DFG-ceph-rhos-13-job', 'url': 'https://jenkins/job/folder/job/DFG-ceph-rhos-13-job/'}]}
+
+
 def test_get_jenkins_jobs():
-	pass
+	server = MockInventoryServer()
+
+	# job matched by both search fields is only returned once, unsupported versions are dropped
+	jobs = get_jenkins_jobs(server, 'DFG-ceph, DFG-ceph-rhos-16', ['13', '16.1'])
+	assert [job['name'] for job in jobs] == ['DFG-ceph-rhos-16.1-job']
+	assert server.calls == 1
+
+	# descending into folders
+	jobs = get_jenkins_jobs(server, 'DFG-ceph,folder/', ['13', '16.1'], folder_depth=1)
+	assert [job['name'] for job in jobs] == ['DFG-ceph-rhos-16.1-job', 'folder/DFG-ceph-rhos-13-job']
+
+
+class MockSearchServer:
+	def get_info(self, item='', query=None):
+		return {'jobs': [
+			{'name': 'DFG-storage-rhos-16.1-rgw', 'url': 'https://jenkins/job/DFG-storage-rhos-16.1-rgw/'},
+			{'name': 'DFG-storage-rhos-16.1-rgw-upgrade', 'url': 'https://jenkins/job/DFG-storage-rhos-16.1-rgw-upgrade/'},
+			{'name': 'osp-13-DFG-network-job', 'url': 'https://jenkins/job/osp-13-DFG-network-job/'}
+		]}
+
+
+def test_get_jenkins_jobs_search():
+	# search fields match anywhere in the job name, anchors keep their meaning
+	jobs = get_jenkins_jobs(MockSearchServer(), 'rgw$,DFG-network', ['13', '16.1'])
+	assert [job['name'] for job in jobs] == ['DFG-storage-rhos-16.1-rgw', 'osp-13-DFG-network-job']
+	assert get_jenkins_jobs(MockSearchServer(), '^DFG-network', ['13', '16.1']) == []
 
 
 def test_get_osp_version():
@@ -28,3 +70,201 @@ def test_get_osp_version():
 	assert get_osp_version('DFG-enterprise-baremetal-13.0_director-3control_2compute-titancluster') == '13'
 	assert get_osp_version('DFG-upgrades-updates-from-osp13.0-to-osp16.2-passed_phase1-HA-ipv4') == '16.2'
 	assert get_osp_version('DFG-all-unified-weekly-multijob') is None
+
+
+
+class MockServer:
+	''' minimal stand-in for a jenkins server object
+		every job's last completed build is build 5 and succeeded
+	'''
+	def get_job_info(self, job_name):
+		return {'url': 'https://jenkins/job/{}/'.format(job_name), 'lastCompletedBuild': {'number': 5}, 'builds': [{'number': 5}]}
+
+	def get_info(self, item='', query=None):
+		return {'jobs': [
+			{'name': 'job1', 'url': 'https://jenkins/job/job1/', 'lastCompletedBuild': self.get_build_info('job1', 5)},
+			{'name': 'job2', 'url': 'https://jenkins/job/job2/', 'lastCompletedBuild': None}
+		]}
+
+	def get_build_info(self, job_name, number):
+		return {
+			'number': number,
+			'actions': [{'_class': 'hudson.model.ParametersAction', 'parameters': []}],
+			'timestamp': 0,
+			'url': 'https://jenkins/job/{}/{}/'.format(job_name, number),
+			'result': 'SUCCESS'
+		}
+
+
+def test_get_jenkins_jobs_info():
+	job_names = ['job{}'.format(i) for i in range(20)]
+	infos = get_jenkins_jobs_info(MockServer(), job_names, max_workers=4)
+	assert [info['job_url'] for info in infos] == ['https://jenkins/job/{}/'.format(job_name) for job_name in job_names]
+	assert all(info['lcb_result'] == 'SUCCESS' for info in infos)
+
+
+def test_get_jenkins_jobs_bulk_info():
+	bulk_info = get_jenkins_jobs_bulk_info(MockServer(), ['job1', 'job2', 'job3'])
+	assert bulk_info['job1']['lcb_result'] == 'SUCCESS'
+	assert bulk_info['job1']['lcb_num'] == 5
+	assert bulk_info['job2']['lcb_result'] == 'NO_KNOWN_BUILDS'
+	assert 'job3' not in bulk_info
+
+
+def test_get_job_folder():
+	assert get_job_folder('job1') == ('', 'job1')
+	assert get_job_folder('folder/sub/job1') == ('job/folder/job/sub', 'job1')
+
+
+class MockHistoryServer:
+	''' stand-in for a jenkins server with 100 builds of job1, newest first
+		only every tenth build has PUBLISH set to True, build 100 is still running
+	'''
+	def __init__(self):
+		self.calls = 0
+		self.numbers = list(range(100, 0, -1))
+		self.builds = []
+		for number in range(100, 0, -1):
+			self.builds.append({
+				'number': number,
+				'result': None if number == 100 else 'SUCCESS',
+				'actions': [{'_class': 'hudson.model.ParametersAction', 'parameters': [{'name': 'PUBLISH', 'value': number % 10 == 0}]}]
+			})
+
+	def get_info(self, item='', query=None):
+		self.calls += 1
+		start, end = map(int, query.rsplit('{', 1)[1].rstrip('}').split(','))
+		return {'allBuilds': self.builds[start:end]}
+
+	def get_build_info(self, job_name, number):
+		self.calls += 1
+		return self.builds[100 - number]
+
+
+def test_find_filtered_build(tmp_path):
+	from jeeves.cache import JeevesCache
+	cache = JeevesCache(str(tmp_path), 'https://jenkins')
+	server = MockHistoryServer()
+
+	# build 90 is the newest completed build with PUBLISH set, found with a single windowed request
+	build = find_filtered_build(server, 'job1', server.numbers, 99, 'PUBLISH', True, cache=cache)
+	assert build['number'] == 90
+	assert server.calls == 1
+
+	# indexed builds are not fetched again, the matching build is fetched once and then cached
+	server.calls = 0
+	build = find_filtered_build(server, 'job1', server.numbers, 99, 'PUBLISH', True, cache=cache)
+	assert build['number'] == 90
+	assert server.calls == 1
+	build = find_filtered_build(server, 'job1', server.numbers, 99, 'PUBLISH', True, cache=cache)
+	assert build['number'] == 90
+	assert server.calls == 1
+
+	# no matching build within lookback
+	assert find_filtered_build(MockHistoryServer(), 'job1', [100, 99], 99, 'PUBLISH', True, max_lookback=5) is None
+
+
+def test_trim_build_info():
+	build_info = {
+		'number': 5,
+		'result': 'SUCCESS',
+		'timestamp': 0,
+		'url': 'https://jenkins/job/job1/5/',
+		'building': False,
+		'changeSets': [{'items': []}],
+		'actions': [{}, {'_class': 'hudson.tasks.junit.TestResultAction', 'failCount': 2, 'urlName': 'testReport'}]
+	}
+	assert trim_build_info(build_info) == {
+		'number': 5,
+		'result': 'SUCCESS',
+		'timestamp': 0,
+		'url': 'https://jenkins/job/job1/5/',
+		'actions': [{'_class': 'hudson.tasks.junit.TestResultAction', 'failCount': 2}]
+	}
+
+
+def test_get_jenkins_jobs_info_incremental(tmp_path):
+	from jeeves.cache import JeevesCache
+	cache = JeevesCache(str(tmp_path), 'https://jenkins')
+
+	class CountingServer(MockServer):
+		calls = 0
+
+		def get_job_info(self, job_name):
+			self.calls += 1
+			return MockServer.get_job_info(self, job_name)
+
+	server = CountingServer()
+	infos = get_jenkins_jobs_info_incremental(server, ['job1', 'job2'], cache)
+	assert [info['lcb_result'] for info in infos] == ['SUCCESS', 'SUCCESS']
+	assert server.calls == 2
+
+	# nothing was rebuilt, so no job is fetched again
+	infos = get_jenkins_jobs_info_incremental(server, ['job1', 'job2'], cache)
+	assert [info['lcb_result'] for info in infos] == ['SUCCESS', 'SUCCESS']
+	assert server.calls == 2
+
+
+def test_update_jenkins_job_state(tmp_path):
+	from jeeves.cache import JeevesCache
+	cache = JeevesCache(str(tmp_path), 'https://jenkins')
+
+	class CountingServer(MockServer):
+		info_calls = 0
+
+		def get_info(self, item='', query=None):
+			self.info_calls += 1
+			return MockServer.get_info(self, item, query)
+
+	server = CountingServer()
+	get_jenkins_jobs_info_incremental(server, ['job1'], cache)
+	assert update_jenkins_job_state(server, 'job1', 6, cache)
+	assert not update_jenkins_job_state(server, 'job1', 5, cache)
+
+	# trusted states are used without looking up the last completed builds
+	server.info_calls = 0
+	infos = get_jenkins_jobs_info_incremental(server, ['job1'], cache, trust_states=True)
+	assert infos[0]['lcb_num'] == 6
+	assert server.info_calls == 0
+
+
+def test_get_stage_durations():
+	build_stages = {'stages': [
+		{'name': 'Provision', 'status': 'SUCCESS', 'durationMillis': 3723000},
+		{'name': 'Overcloud', 'status': 'FAILED', 'durationMillis': 61500}
+	]}
+	assert get_stage_durations(build_stages) == [
+		{'name': 'Provision', 'status': 'SUCCESS', 'duration': '1:02:03', 'duration_millis': 3723000},
+		{'name': 'Overcloud', 'status': 'FAILED', 'duration': '0:01:01', 'duration_millis': 61500}
+	]
+	assert get_stage_failure(build_stages) == 'Overcloud'
+
+
+def test_get_jenkins_jobs_stages():
+	class MockStagesServer:
+		def get_build_stages(self, job_name, number):
+			return {'stages': [{'name': 'Overcloud', 'status': 'FAILED', 'durationMillis': 1000, '_links': {}}]}
+
+	infos = [{'lcb_result': 'FAILURE', 'lcb_num': 5, 'stage_failure': 'N/A'}, {'lcb_result': 'SUCCESS', 'lcb_num': 3, 'stage_failure': 'N/A'}, False]
+	get_jenkins_jobs_stages(MockStagesServer(), ['job1', 'job2', 'job3'], infos, max_workers=2)
+	assert infos[0]['stage_failure'] == 'Overcloud'
+	assert infos[0]['stage_durations'][0]['duration'] == '0:00:01'
+	assert infos[1]['stage_failure'] == 'N/A'
+
+
+def test_get_jenkins_jobs_results():
+	class MockResultsServer:
+		def __init__(self):
+			self.queries = []
+
+		def get_info(self, item='', query=None):
+			self.queries.append((item, query))
+			return {'jobs': [
+				{'name': 'job1', 'builds': [{'number': 3, 'result': None}, {'number': 2, 'result': 'FAILURE'}, {'number': 1, 'result': 'SUCCESS'}]},
+				{'name': 'other', 'builds': []}
+			]}
+
+	server = MockResultsServer()
+	results = get_jenkins_jobs_results(server, ['folder/job1', 'folder/job2'], 3)
+	assert results == {'folder/job1': ['FAILURE', 'SUCCESS']}
+	assert server.queries == [('job/folder', '?tree=jobs[name,builds[number,result]{0,3}]')]
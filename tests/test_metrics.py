@@ -0,0 +1,30 @@
+from jeeves.metrics import *
+
+
+def test_get_endpoint():
+	assert get_endpoint('jenkins', 'https://jenkins/job/folder/job/job1/5/api/json?depth=0') == 'jenkins /job/*/job/*/{number}/api/json'
+	assert get_endpoint('jenkins', 'https://jenkins/job/folder/api/json?tree=jobs[name]') == 'jenkins /job/*/api/json?tree'
+
+
+def test_write_metrics(tmp_path):
+	reset()
+	with phase('render'):
+		pass
+	record_request('jenkins /api/json?tree', 0.02, 100)
+	record_request('jenkins /api/json?tree', 3, 300, error=True)
+	record_cache('builds', 3, 1)
+	metrics = get_metrics('report')
+	assert 'render' in metrics['phases']
+	assert metrics['requests']['jenkins /api/json?tree']['count'] == 2
+	assert metrics['requests']['jenkins /api/json?tree']['bytes'] == 400
+	assert metrics['requests']['jenkins /api/json?tree']['buckets'][LATENCY_BUCKETS.index(0.025)] == 1
+	assert metrics['requests']['jenkins /api/json?tree']['buckets'][-1] == 2
+	assert metrics['cache']['builds']['hit_rate'] == 0.75
+
+	json_filename, prom_filename = write_metrics(str(tmp_path), 'report')
+	with open(prom_filename) as file:
+		prom = file.read()
+	assert 'jeeves_api_request_duration_seconds_count{mode="report",endpoint="jenkins /api/json?tree"} 2' in prom
+	assert 'jeeves_api_request_errors{mode="report",endpoint="jenkins /api/json?tree"} 1' in prom
+	assert 'jeeves_cache_hits{mode="report",cache="builds"} 3' in prom
+	reset()
@@ -1,5 +1,58 @@
+import os
+
 from jeeves.remind import *
 
 
-def test_run_remind():
-    pass
+def get_jenkins_api_info(lcb_result):
+	return {
+		'job_url': 'https://jenkins/job/job/',
+		'lcb_num': 5,
+		'lcb_url': 'https://jenkins/job/job/5/',
+		'compose': 'RHOS-16.1-RHEL-8-20210101.n.0',
+		'second_compose': None,
+		'lcb_result': lcb_result,
+		'build_days_ago': 1,
+		'tempest_tests_failed': 3,
+		'stage_failure': 'N/A',
+		'stage_durations': None
+	}
+
+
+def setup_remind(tmp_path, monkeypatch, results):
+	''' runs reminders from tmp_path against stand-ins for jenkins, the trackers and an SMTP server that cannot be reached
+	'''
+	templates_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+	monkeypatch.chdir(tmp_path)
+	os.symlink(templates_dir, 'templates')
+	monkeypatch.setattr('jeeves.render._environment', None)
+	monkeypatch.setattr('jeeves.remind.get_jenkins_jobs_info', lambda server, job_names, **kwargs: [get_jenkins_api_info(results[job_name]) for job_name in job_names])
+	monkeypatch.setattr('jeeves.remind.get_bugs_dict', lambda bug_ids, config, cache=None: {bug_id: {'bug_name': 'BZ#{}'.format(bug_id), 'bug_url': 'https://bugzilla/{}'.format(bug_id)} for bug_id in bug_ids})
+	monkeypatch.setattr('jeeves.remind.get_tickets_dict', lambda ticket_ids, config, cache=None: {})
+
+	def mock_open_smtp_session(config):
+		raise Exception('connection refused')
+	monkeypatch.setattr('jeeves.remind.open_smtp_session', mock_open_smtp_session)
+
+
+def test_run_remind_without_smtp(tmp_path, monkeypatch):
+	setup_remind(tmp_path, monkeypatch, {'job-rhos-16.1-a': 'FAILURE', 'job-rhos-16.1-b': 'FAILURE'})
+	blockers = {
+		'job-rhos-16.1-a': {'bz': [0], 'jira': [0], 'owners': ['a@example.com']},
+		'job-rhos-16.1-b': {'bz': [0], 'jira': [0], 'owners': ['b@example.com']}
+	}
+	run_remind({'email_from': 'jeeves@example.com'}, blockers, None, {})
+
+	# every reminder that could not be sent is archived in its own file
+	assert len(os.listdir('archive')) == 2
+
+
+def test_run_remind_error_job_blockers(tmp_path, monkeypatch):
+	setup_remind(tmp_path, monkeypatch, {'job-rhos-16.1-a': 'ERROR'})
+	blockers = {'job-rhos-16.1-a': {'bz': [1234], 'jira': [0], 'owners': ['a@example.com']}}
+	run_remind({'email_from': 'jeeves@example.com'}, blockers, None, {})
+
+	# blockers of jobs with results other than the failing ones are still listed for their owners
+	with open(os.path.join('archive', os.listdir('archive')[0]), 'r') as file:
+		html = file.read()
+	assert 'BZ#1234' in html
+	assert 'No blockers have been filed' not in html
@@ -0,0 +1,8 @@
+from jeeves.render import *
+
+
+def test_get_template_environment(tmp_path):
+	env = get_template_environment(str(tmp_path))
+	assert get_template_environment() is env
+	template = env.from_string("{% from 'macros.html' import composes %}{{ composes(row) }}")
+	assert ''.join(template.generate(row={'compose': 'RHOS-16.1', 'second_compose': None})).strip() == 'RHOS-16.1'
@@ -1,5 +1,79 @@
+import os
+
 from jeeves.report import *
 
 
 def test_run_report():
-    pass
+	pass
+
+
+def test_deliver_report_cache(tmp_path, monkeypatch):
+	monkeypatch.chdir(tmp_path)
+	os.makedirs('templates')
+	with open('templates/report_template.html', 'w') as file:
+		file.write('{{ rows|length }} jobs')
+	config = {'cache_dir': str(tmp_path / 'cache')}
+
+	# without the cache no compiled templates are written
+	monkeypatch.setattr('jeeves.render._environment', None)
+	deliver_report(config, {}, [], {}, {}, False, 'report_template.html', True, False)
+	assert not os.path.exists(config['cache_dir'])
+
+	monkeypatch.setattr('jeeves.render._environment', None)
+	deliver_report(config, {}, [], {}, {}, False, 'report_template.html', True, False, use_cache=True)
+	assert os.listdir(os.path.join(config['cache_dir'], 'templates')) != []
+
+
+def test_deliver_report_email(tmp_path, monkeypatch):
+	import email
+
+	monkeypatch.chdir(tmp_path)
+	os.makedirs('templates')
+	with open('templates/report_template.html', 'w') as file:
+		file.write('<html>{{ rows|length }} jobs</html>')
+	monkeypatch.setattr('jeeves.render._environment', None)
+	sent = []
+
+	class MockSMTP:
+		def __enter__(self):
+			return self
+
+		def __exit__(self, *args):
+			pass
+
+		def sendmail(self, from_addr, to_addrs, msg):
+			sent.append((to_addrs, msg))
+			return {}
+	monkeypatch.setattr('jeeves.report.open_smtp_session', lambda config: MockSMTP())
+
+	# the saved report is sent as it was written to the archive
+	config = {'email_from': 'jeeves@example.com', 'email_to': 'a@example.com,b@example.com', 'email_subject': 'Report'}
+	deliver_report(config, {}, [], {}, {}, False, 'report_template.html', False, False)
+	to_addrs, msg = sent[0]
+	assert to_addrs == ['a@example.com', 'b@example.com']
+	part = email.message_from_bytes(bytes(msg)).get_payload()[0]
+	assert part.get_payload(decode=True).decode('utf-8') == '<html>0 jobs</html>'
+
+
+def test_run_merge_test_email(tmp_path, monkeypatch):
+	from jeeves.rows import JobRow
+	from jeeves.shard import write_partial
+
+	monkeypatch.chdir(tmp_path)
+	os.makedirs('templates')
+	with open('templates/report_template.html', 'w') as file:
+		file.write('<html>{{ rows|length }} jobs</html>')
+	monkeypatch.setattr('jeeves.render._environment', None)
+	monkeypatch.setattr('jeeves.report.open_smtp_session', lambda config: None)
+	row = JobRow(job_name='DFG-ceph-rhos-16.1-job', osp_version='16.1', lcb_result='FAILURE', bug_ids=[], ticket_ids=[], covered=False)
+	write_partial('shards', {}, [row], (1, 1))
+	config = {'chart_renderer': 'svg', 'email_from': 'jeeves@example.com', 'email_to_test': 'test@example.com', 'email_subject': 'Report'}
+
+	# test runs leave the archive and the shard results alone
+	run_merge(config, {}, False, 'report_template.html', False, True, {})
+	assert not os.path.exists('archive')
+	assert os.listdir('shards') != []
+
+	run_merge(config, {}, False, 'report_template.html', True, False, {})
+	assert any(filename.startswith('snapshot_') for filename in os.listdir('archive'))
+	assert os.listdir('shards') == []
@@ -0,0 +1,55 @@
+from jeeves.rows import *
+
+
+def get_jenkins_api_info(lcb_result, stage_failure='N/A'):
+	return {
+		'job_url': 'https://jenkins/job/job1/',
+		'lcb_num': 5,
+		'lcb_url': 'https://jenkins/job/job1/5/',
+		'compose': 'RHOS-16.1-RHEL-8-20210101.n.0',
+		'second_compose': None,
+		'lcb_result': lcb_result,
+		'build_days_ago': 1,
+		'tempest_tests_failed': 3,
+		'stage_failure': stage_failure,
+		'stage_durations': None
+	}
+
+
+def test_build_row():
+	blockers = {'job1': {'bz': [123, 0], 'jira': [0], 'other': [{'name': 'Note', 'url': 'https://note'}]}}
+	bugs_dict = {123: {'bug_name': 'BZ#123', 'bug_url': 'https://bugzilla/123'}}
+	row = build_row({}, blockers, 'job1', '16.1', get_jenkins_api_info(''.join(['FAIL', 'URE'])), bugs_dict, {})
+	assert row.lcb_result is RESULTS['FAILURE']
+	assert row.bug_ids == [123]
+	assert row.bugs == [bugs_dict[123]]
+	assert row.tickets == []
+	assert row.other == [{'other_name': 'Note', 'other_url': 'https://note'}]
+	assert row.blocker_bool and row.covered
+	assert row.tempest_tests_url == 'https://jenkins/job/job1/5/testReport'
+	assert blockers['job1']['bz'] == [123, 0]
+
+
+def test_build_row_success_and_error():
+	blockers = {'job1': {'bz': [123]}}
+	row = build_row({}, blockers, 'job1', '16.1', get_jenkins_api_info('SUCCESS'), {}, {})
+	assert (row.bugs, row.blocker_bool, row.covered) == ([], False, False)
+	row = build_row({}, blockers, 'job1', '16.1', get_jenkins_api_info('BUILDING'), {}, {})
+	assert row.lcb_result == 'ERROR'
+	assert row.bug_ids == []
+
+
+def test_row_from_dict():
+	row = build_row({}, {}, 'job1', '16.1', get_jenkins_api_info('SUCCESS'), {}, {})
+	fields = row.as_dict()
+	assert 'tempest_tests_url' not in fields
+	assert row_from_dict(dict(fields, tempest_tests_url='ignored')) == row
+	assert not hasattr(row, '__dict__')
+
+
+def test_build_row_remind():
+	blockers = {'job1': {'bz': [123], 'jira': [0], 'other': []}}
+	bugs_dict = {123: {'bug_name': 'BZ#123', 'bug_url': 'https://bugzilla/123'}}
+	row = build_row({}, blockers, 'job1', '16.1', get_jenkins_api_info('BUILDING'), bugs_dict, {}, remind=True)
+	assert row.lcb_result == 'BUILDING'
+	assert row.bugs == [bugs_dict[123]] and row.blocker_bool
@@ -0,0 +1,35 @@
+import datetime
+
+from jeeves.serve import *
+
+
+def test_get_next_run():
+	now = datetime.datetime(2021, 5, 1, 9, 30).timestamp()
+	assert get_next_run({'mode': 'report', 'every': 600}, now) == now + 600
+	assert get_next_run({'mode': 'report', 'at': ['08:00', '16:00']}, now) == datetime.datetime(2021, 5, 1, 16, 0).timestamp()
+	assert get_next_run({'mode': 'remind', 'at': ['08:00']}, now) == datetime.datetime(2021, 5, 2, 8, 0).timestamp()
+
+
+def test_load_blockers(tmp_path):
+	blocker_file = tmp_path / 'blockers.yaml'
+	blocker_file.write_text('job1:\n  bz:\n    - 123\n')
+	loaded = load_blockers(str(blocker_file))
+	assert loaded[1] == {'job1': {'bz': [123]}}
+	assert load_blockers(str(blocker_file), loaded) is loaded
+
+	# a broken file keeps the previous blockers
+	blocker_file.write_text('job1: [')
+	os.utime(str(blocker_file), (loaded[0] + 10, loaded[0] + 10))
+	assert load_blockers(str(blocker_file), loaded) is loaded
+
+
+def test_parse_notification():
+	payload = {
+		'name': 'job1',
+		'url': 'job/folder/job/job1/',
+		'build': {'full_url': 'https://jenkins/job/folder/job/job1/7/', 'number': 7, 'phase': 'COMPLETED', 'status': 'FAILURE'}
+	}
+	assert parse_notification(payload) == ('folder/job1', 7)
+	payload['build']['phase'] = 'STARTED'
+	assert parse_notification(payload) is None
+	assert parse_notification({'job_name': 'job2', 'build_number': '3'}) == ('job2', 3)
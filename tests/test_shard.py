@@ -0,0 +1,32 @@
+import pytest
+
+from jeeves.rows import JobRow
+from jeeves.shard import *
+
+
+def test_parse_shard():
+	assert parse_shard('2/4') == (2, 4)
+	for value in ['0/4', '5/4', '1', 'a/b']:
+		with pytest.raises(ValueError):
+			parse_shard(value)
+
+
+def test_in_shard():
+	job_names = ['DFG-ceph-rhos-16.1-job-{}'.format(i) for i in range(100)]
+	shards = [[job_name for job_name in job_names if in_shard(job_name, (i, 4))] for i in range(1, 5)]
+	assert sorted(sum(shards, [])) == sorted(job_names)
+	assert all(shards)
+
+
+def test_read_partials(tmp_path):
+	header = {'date': '01/01/2021 at 09:00AM ', 'source': 'DFG-ceph', 'fpn': None, 'fpv': None}
+	write_partial(str(tmp_path), header, [JobRow(job_name='job1', lcb_result='SUCCESS')], (1, 2))
+	with pytest.raises(Exception, match='shard\\(s\\) 2 of 2 missing'):
+		read_partials(str(tmp_path))
+	write_partial(str(tmp_path), header, [], (2, 2))
+	rows, filenames = read_partials(str(tmp_path))
+	assert rows == [JobRow(job_name='job1', lcb_result='SUCCESS')]
+	assert len(filenames) == 2
+	write_partial(str(tmp_path), header, [], (1, 3))
+	with pytest.raises(Exception, match='different shard counts'):
+		read_partials(str(tmp_path))
@@ -0,0 +1,11 @@
+from jeeves.rows import JobRow
+from jeeves.snapshot import *
+
+
+def test_snapshot(tmp_path):
+	header = {'date': '01/01/2021 at 09:00AM ', 'source': 'DFG-ceph', 'fpn': None, 'fpv': None}
+	rows = [JobRow(job_name='job1', lcb_result='FAILURE', bugs=[{'bug_name': 'BZ#123', 'bug_url': 'https://bugzilla/123'}])]
+	summary = {'total_jobs': 'Total number of jobs: 1', 'total_aborted': False}
+	summary_per_version = {'16.1': summary}
+	filename = write_snapshot(header, rows, summary, summary_per_version, filename=str(tmp_path / 'snapshot.jsonl.gz'))
+	assert read_snapshot(filename) == (header, rows, summary, summary_per_version)
@@ -0,0 +1,36 @@
+import requests
+
+from jeeves.cache import JeevesCache
+from jeeves.transport import *
+
+
+def test_conditional_get(tmp_path, monkeypatch):
+	status_codes = []
+
+	# stand-in for the network below python-jenkins, so the request goes through jenkins_request and _request
+	def mock_send(self, request, **kwargs):
+		response = requests.Response()
+		response.url = request.url
+		response.request = request
+		if 'crumbIssuer' in request.url:
+			response.status_code = 404
+			response.reason = 'Not Found'
+			response._content = b''
+			return response
+		if request.headers.get('If-None-Match') == '"abc"':
+			response.status_code = 304
+			response._content = b''
+		else:
+			response.status_code = 200
+			response._content = b'{"jobs": []}'
+			response.headers['ETag'] = '"abc"'
+		status_codes.append(response.status_code)
+		return response
+
+	monkeypatch.setattr(requests.Session, 'send', mock_send)
+	server = PooledJenkins('https://jenkins', cache=JeevesCache(str(tmp_path), 'https://jenkins'))
+
+	# second request is revalidated and served from the cached body
+	assert server.get_info() == {'jobs': []}
+	assert server.get_info() == {'jobs': []}
+	assert status_codes == [200, 304]
@@ -0,0 +1,21 @@
+from jeeves.rows import JobRow
+from jeeves.trends import *
+
+
+def test_get_build_trend():
+	trend = get_build_trend(['FAILURE', 'FAILURE', 'SUCCESS', 'FAILURE', 'SUCCESS'])
+	assert trend == {'num_builds': 5, 'pass_rate': 40.0, 'streak': 2, 'streak_result': 'FAILURE', 'flip_rate': 0.75}
+	assert get_build_trend(['SUCCESS'])['flip_rate'] == 0.0
+	assert get_build_trend([]) is None
+
+
+def test_get_top_flaky():
+	trends = get_jobs_trends({
+		'stable': ['FAILURE', 'FAILURE', 'FAILURE'],
+		'flaky': ['SUCCESS', 'FAILURE', 'SUCCESS'],
+		'flipped': ['SUCCESS', 'FAILURE', 'FAILURE'],
+		'new': []
+	})
+	rows = [JobRow(job_name=job_name, trend=trend) for job_name, trend in trends.items()]
+	assert [row.job_name for row in get_top_flaky(rows)] == ['flaky', 'flipped']
+	assert [row.job_name for row in get_top_flaky(rows, count=1)] == ['flaky']